@@ -15,6 +15,11 @@
 import json
 from telnetlib import Telnet
 import argparse
+import threading
+import select
+import atexit
+import time
+import re
 import utility
 import sql
 import sys
@@ -63,42 +68,264 @@ def loadConfig(confPath = 'this_device_conf.json'):
 ##
 def loadSQLite(jid, table_name = None, db_path = None):
 	global ID, NAME, TCP_IP, TCP_PORT, LOCATION, STATUS
-	if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(jid), db_path)
-	else: config = sql.getSQLite('SELECT * FROM ' + JFW_TABLE_NAME + ' WHERE id=' + str(jid), db_path)
+	if table_name: config = sql.getDeviceConfig(str(table_name), jid, db_path)
+	else: config = sql.getDeviceConfig(JFW_TABLE_NAME, jid, db_path)
 	if config:
-		if config[0]['id'] is not None: ID = config[0]['id']
-		if config[0]['name'] is not None: NAME = config[0]['name']
-		if config[0]['ip'] is not None: TCP_IP = config[0]['ip']
-		if config[0]['port'] is not None: TCP_PORT = config[0]['port']
-		if config[0]['location'] is not None: LOCATION = config[0]['location']
-		if config[0]['status'] is not None: STATUS = config[0]['status']
-		return config[0]
+		if config['id'] is not None: ID = config['id']
+		if config['name'] is not None: NAME = config['name']
+		if config['ip'] is not None: TCP_IP = config['ip']
+		if config['port'] is not None: TCP_PORT = config['port']
+		if config['location'] is not None: LOCATION = config['location']
+		if config['status'] is not None: STATUS = config['status']
+		return config
 	return {"error": "Loading table [" + JFW_TABLE_NAME + "] with ID [" + str(jid) + "] Failed"}
 
 
 
+## \brief Persistent Telnet session to a JFW box
+#
+# The connection is opened by the first command and kept open between the
+# commands, a response is read until PROMPT (if set) or until the box has been
+# quiet for QUIET_TIME seconds instead of sleeping a fixed delay.   The JFW box
+# accepts a single login, the session is closed after IDLE_TIMEOUT seconds
+# without a command so the other tools can connect
+# The session keeps the attenuator state of the box: expected, the values set
+# by the 'SAR<port> <value>' commands, and actual, the values read back in the
+# responses ('RAA', 'RA<port>' or the SAR echo), see healthCheck
+##
+class Session:
+	## \brief Session constructor, the connection is opened by the first command
+	#
+	# \param ip the ip address of the JFW box
+	# \param port the Telnet port of the JFW box
+	# \param daemon print out the info message if set False, default is True
+	##
+	def __init__(self, ip, port, daemon = True):
+		self.ip = str(ip)
+		self.port = int(port)
+		self.daemon = daemon
+		self.lock = threading.RLock()
+		self.expected = {}
+		self.actual = {}
+		self.__conn = None
+		self.__timer = None
+
+
+
+	## \brief Open (or re-open) the connection, drop the login banner
+	##
+	def connect(self):
+		with self.lock:
+			self.close()
+			if not self.daemon: utility.info('Opening Telnet session to the JFW box at [' + self.ip + ':' + str(self.port) + ']')
+			self.__conn = Telnet(self.ip, self.port, TIMEOUT)
+			self.__read(QUIET_TIME)
+
+
+
+	## \brief Close the connection, the next command opens a new one
+	##
+	def close(self):
+		with self.lock:
+			if self.__timer is not None:
+				self.__timer.cancel()
+				self.__timer = None
+			if self.__conn is not None:
+				try:
+					self.__conn.close()
+				except OSError:
+					pass
+				self.__conn = None
+
+
+
+	## \brief Check if the connection is open
+	##
+	def isConnected(self):
+		return self.__conn is not None
+
+
+
+	## \brief Send a command and read the response
+	#
+	# If the connection is lost, reconnect and send the command once more
+	#
+	# \param command the JFW command, e.g. 'SAR1 127' or 'RAA'
+	# \param delayTime the timeout in seconds waiting for the first byte of the response, default is 2
+	# \param ports (Optional) the attenuator ports expected in the response, see __read
+	# \return the response, '' if no response
+	##
+	def execute(self, command, delayTime = 2, ports = None):
+		return self.__request([command], delayTime, ports)
+
+
+
+	## \brief Send several commands and read all the responses
+	#
+	# With PIPELINE the commands are written at once and the responses are read
+	# together, otherwise the commands are sent one by one
+	#
+	# \param commands the list of JFW commands
+	# \param delayTime the timeout in seconds waiting for the first byte of the response, default is 2
+	# \param ports (Optional) the attenuator ports expected in the responses, see __read
+	# \return the responses, '' if no response
+	##
+	def executeMany(self, commands, delayTime = 2, ports = None):
+		if PIPELINE: return self.__request(commands, delayTime, ports)
+		with self.lock:
+			return ''.join(self.__request([command], delayTime, self.__expect(command, ports)) for command in commands)
+
+
+
+	## \brief Get the port expected in the response of one command sent alone, the port set by a 'SAR' command
+	##
+	def __expect(self, command, ports):
+		match = SET_PATTERN.match(command)
+		return [match.group(1)] if ports and match else None
+
+
+
+	## \brief Write the commands and read the response, reconnect once if the connection is lost
+	##
+	def __request(self, commands, delayTime, ports = None):
+		with self.lock:
+			for attempt in range(2):
+				try:
+					if self.__conn is None: self.connect()
+					self.__conn.read_very_eager() ## drop the output left by a previous command
+					self.__conn.write(''.join(command + '\r\n' for command in commands).encode('ascii'))
+					result = self.__read(delayTime, ports).decode('ascii', 'replace')
+					self.__track(commands, result)
+					if any(command.strip().upper().startswith('REBOOT') for command in commands): self.close()
+					else: self.__keepAlive()
+					return result
+				except (OSError, EOFError) as e:
+					self.close()
+					if attempt: raise OSError(str(e))
+					utility.warn('JFW session to [' + self.ip + ':' + str(self.port) + '] lost: ' + str(e) + ', reconnecting', False)
+
+
+
+	## \brief Update the attenuator state with the sent commands and their response
+	#
+	# \param commands the list of the sent commands
+	# \param result the response
+	##
+	def __track(self, commands, result):
+		for command in commands:
+			match = SET_PATTERN.match(command)
+			if match: self.expected[int(match.group(1))] = int(match.group(2))
+			elif command.strip().upper().startswith('REBOOT'):
+				self.expected = {}
+				self.actual = {}
+		for match in ATTEN_PATTERN.finditer(result):
+			self.actual[int(match.group(1))] = int(match.group(2))
+
+
+
+	## \brief Get the ports whose last read back attenuation differs from the expected one
+	#
+	# \param ports (Optional) the list of the ports to compare, default is all the expected ports
+	# \return dictionary of the port (string) to {'EXPECTED': value, 'ACTUAL': value or None if never read}
+	##
+	def diff(self, ports = None):
+		with self.lock:
+			ports = self.expected if ports is None else [int(port) for port in ports if int(port) in self.expected]
+			return dict((str(port), {'EXPECTED': self.expected[port], 'ACTUAL': self.actual.get(port)}) for port in sorted(ports) if self.actual.get(port) != self.expected[port])
+
+
+
+	## \brief Read the response until PROMPT or a QUIET_TIME gap
+	#
+	# When the ports are given, the response is read until every port has an
+	# 'Atten #<port> = <value>dB' line (or PROMPT), with timeout as the overall
+	# deadline: a long reply (e.g. 'RAA' of many ports) is not cut by a pause of
+	# the box longer than QUIET_TIME
+	#
+	# \param timeout the timeout in seconds waiting for the first byte, or for the whole response with ports
+	# \param ports (Optional) the attenuator ports expected in the response
+	# \return the bytes of the response
+	##
+	def __read(self, timeout, ports = None):
+		data = b''
+		wait = timeout
+		deadline = time.time() + timeout
+		if ports: ports = set(str(attenPort) for attenPort in ports)
+		while select.select([self.__conn], [], [], wait)[0]:
+			data += self.__conn.read_very_eager()
+			if PROMPT and data.rstrip().endswith(PROMPT.encode('ascii')): break
+			if not ports:
+				wait = QUIET_TIME
+				continue
+			if ports <= set(parseAttenuations(data.decode('ascii', 'replace'))): break
+			wait = deadline - time.time()
+			if wait <= 0: break
+		return data
+
+
+
+	## \brief (Re)start the idle timer closing the session after IDLE_TIMEOUT seconds
+	##
+	def __keepAlive(self):
+		if self.__timer is not None: self.__timer.cancel()
+		self.__timer = None
+		if not IDLE_TIMEOUT: return
+		self.__timer = threading.Timer(IDLE_TIMEOUT, self.close)
+		self.__timer.daemon = True
+		self.__timer.start()
+
+
+
+## \brief Get the shared Telnet session of a JFW box
+#
+# One session is kept per (ip, port), shared by connectJFW, healthCheck and all
+# the JFW objects of the same box
+#
+# \param ip the ip address of the JFW box, default is TCP_IP
+# \param port the Telnet port of the JFW box, default is TCP_PORT
+# \param daemon print out the info message if set False, default is True
+# \return the Session object
+##
+def getSession(ip = None, port = None, daemon = True):
+	if ip is None: ip = TCP_IP
+	if port is None: port = TCP_PORT
+	key = (str(ip), int(port))
+	with __sessionsLock:
+		session = __sessions.get(key)
+		if session is None:
+			session = Session(ip, port, daemon)
+			__sessions[key] = session
+	return session
+
+
+
+## \brief Close all the JFW sessions, registered with atexit
+##
+def closeSessions():
+	with __sessionsLock:
+		sessions = list(__sessions.values())
+	for session in sessions:
+		session.close()
+
+
+
 ## \brief Connect to remote JFW box and execute a command
 #
-# Remotely connecting to a JFW box using a Telnet connection.
+# Execute the command on the persistent Telnet session (see Session) of the JFW box
 # The IP address and Port was loaded by loadConfig/loadSQLite function
 #
 # \param command either using the CLI with -e option or input as a parameter
-# \param delayTime a delay time waiting response from telnet connection, default is 2
+# \param delayTime the timeout in seconds waiting for the response, default is 2
 # \param daemon define if the program will print the reuslt or not, default is False
 # \return result the return value from command executed remotely
 ##
 ## NOTE: due to legacy firmware version, set the Atten with command: SAR<port> <value>
 def connectJFW(command, delayTime = 2, daemon = False):
 	if not daemon: utility.info("###################### " + Fore.YELLOW + 'JFW Control' + Style.RESET_ALL + " #####################")
-	MESSAGE = (command + '\r\n').encode('ascii')
 	try:
 		if not daemon: utility.info('Send command: [' + command + '] to the JFW box at [' + str(TCP_IP) + ':' + str(TCP_PORT) + ']')
-		tn = Telnet(TCP_IP, int(TCP_PORT))
-		tn.write(MESSAGE)
-		utility.sleep(delayTime, daemon = True)
-		result = tn.read_very_eager().decode('ascii')
+		result = getSession(TCP_IP, TCP_PORT).execute(command, delayTime)
 		if not daemon: utility.info('Response:\n' + result)
-		tn.close()
 	except Exception as e:
 		utility.error(str(e) + ' - Connection to ' + str(TCP_IP) + ':' + str(TCP_PORT) + ' Failed!')
 		result = str(e) + ' - JFW does not allow multiple login on the same device!'
@@ -106,25 +333,110 @@ def connectJFW(command, delayTime = 2, daemon = False):
 
 
 
+## \brief Parse the attenuations of a 'RAA' (or 'RA<port>') response
+#
+# \param data the response of the JFW box
+# \return dictionary of the attenuator port to the attenuation, both strings
+##
+def parseAttenuations(data):
+	return dict((match.group(1), match.group(2)) for match in ATTEN_PATTERN.finditer(data))
+
+
+
+## \brief Set many attenuators of a JFW box at once
+#
+# The 'SAR<port> <value>' commands are sent in one go on the session of the box
+# (pipelined, see PIPELINE) and verified with a single 'RAA' read at the end, the
+# echo of the commands and the 'RAA' reply are read until every set port is in
+# the response or for delayTime seconds (see Session.execute)
+#
+# Example: setAttenuations({1: 127, 2: 30, 16: 0})
+#
+# \param attenuations dictionary of the attenuator port to the attenuation (dB)
+# \param ip the ip address of the JFW box, default is TCP_IP
+# \param port the Telnet port of the JFW box, default is TCP_PORT
+# \param delayTime the timeout in seconds waiting for the response, default is 2
+# \param verify read back all the attenuators and compare if set True, default is True
+# \param daemon define if the program will print the reuslt or not, default is False
+# \return dictionary of the ports not verified to their read back attenuation (None if not read), empty if all done
+##
+def setAttenuations(attenuations, ip = None, port = None, delayTime = 2, verify = True, daemon = False):
+	session = getSession(ip, port)
+	commands = ['SAR' + str(attenPort) + ' ' + str(int(value)) for attenPort, value in sorted(attenuations.items(), key = lambda item: int(item[0]))]
+	if not daemon: utility.info('Setting ' + str(len(commands)) + ' attenuator(s) of the JFW box at [' + session.ip + ':' + str(session.port) + ']')
+	try:
+		with session.lock:
+			session.executeMany(commands, delayTime, attenuations)
+			if not verify: return {}
+			readback = parseAttenuations(session.execute('RAA', delayTime, attenuations))
+	except Exception as e:
+		utility.error(str(e) + ' - Connection to ' + session.ip + ':' + str(session.port) + ' Failed!', False)
+		return dict((str(attenPort), None) for attenPort in attenuations)
+	failed = {}
+	for attenPort, value in attenuations.items():
+		read = readback.get(str(attenPort))
+		if read is None or int(read) != int(value): failed[str(attenPort)] = read
+	if failed: utility.warn('JFW box at [' + session.ip + ':' + str(session.port) + '] attenuator(s) not set: ' + str(failed), False)
+	elif not daemon: utility.info('All ' + str(len(commands)) + ' attenuator(s) verified')
+	return failed
+
+
+
+## \brief Reset many attenuators of a JFW box to RESET_VALUE at once, see setAttenuations
+#
+# \param ports (Optional) the list of the attenuator ports, default is all the ports read with 'RAA'
+# \param ip the ip address of the JFW box, default is TCP_IP
+# \param port the Telnet port of the JFW box, default is TCP_PORT
+# \param delayTime the timeout in seconds waiting for the response, default is 2
+# \param daemon define if the program will print the reuslt or not, default is False
+# \return dictionary of the ports not reset to their read back attenuation (None if not read), empty if all done
+##
+def resetAll(ports = None, ip = None, port = None, delayTime = 2, daemon = False):
+	if ports is None:
+		try:
+			ports = list(parseAttenuations(getSession(ip, port).execute('RAA', delayTime)))
+		except Exception as e:
+			utility.error(str(e) + ' - Connection to ' + str(ip or TCP_IP) + ':' + str(port or TCP_PORT) + ' Failed!', False)
+			return {}
+	return setAttenuations(dict((attenPort, RESET_VALUE) for attenPort in ports), ip, port, delayTime, True, daemon)
+
+
+
 ## \brief Health Check function for checking Attenuator Port(s) status
 #
 # Remotely execute a read status command to a JFW box
 # By default it is checking all attenuates, by explictly sending command to perform
 # a single check on a certain port
+# The read back is compared with the attenuator state kept by the session of
+# the box (see Session): only the ports which differ from the values last set
+# are reported (and set again with fix).   The ports never set are taken as
+# expected at their first read
 #
 # \param command default is RAA READ ALL ATTENUATES
 # \param daemon default is False will print out the read results
-# \return result if anything goes wrong with the port, return False
+# \param fix set the differing ports back to their expected value if set True, default is False
+# \param ip the ip address of the JFW box, default is TCP_IP
+# \param port the Telnet port of the JFW box, default is TCP_PORT
+# \return dictionary of the differing ports to {'EXPECTED', 'ACTUAL'}, empty if all the ports are as expected
 ##
-def healthCheck(command = 'RAA', daemon = False):
+def healthCheck(command = 'RAA', daemon = False, fix = False, ip = None, port = None):
 	if not daemon: utility.info("################ " + Fore.YELLOW + 'JFW Health Check' + Style.RESET_ALL + " ###############")
-	data = connectJFW(command, 2, True)
-	result = {}
-	for line in data.split('\n'):
-		keys = utility.regex(line, 'Atten\s*#*(\d+)\s*=*\s*(\d+)..')
-		if keys:
-			if not daemon: utility.info("Attenuator #" + keys[0] + " - " + keys[1] + "dB")
-			result[keys[0]] = keys[1]
+	session = getSession(ip, port)
+	try:
+		with session.lock:
+			readback = parseAttenuations(session.execute(command, 2))
+			for attenPort, value in readback.items():
+				session.expected.setdefault(int(attenPort), int(value))
+			result = session.diff(None if command.strip().upper() == 'RAA' else readback)
+	except Exception as e:
+		utility.error(str(e) + ' - Connection to ' + session.ip + ':' + str(session.port) + ' Failed!', False)
+		return session.diff()
+	for attenPort, state in result.items():
+		if not daemon: utility.warn("Attenuator #" + attenPort + " - " + str(state['ACTUAL']) + "dB, expected " + str(state['EXPECTED']) + "dB", False)
+	if result and fix:
+		failed = setAttenuations(dict((attenPort, state['EXPECTED']) for attenPort, state in result.items()), session.ip, session.port, 2, True, daemon)
+		result = dict((attenPort, result[attenPort]) for attenPort in failed)
+	if not daemon and not result: utility.info("All " + str(len(readback)) + " attenuator(s) as expected")
 	return result
 
 
@@ -261,12 +573,11 @@ class JFW:
 	# \return True if no error found, else False
 	##
 	def loadSQLite(self, jfw_id, table_name = None, db_path = None):
-		try:
-			if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(jfw_id), db_path)[0]
-			else: config = sql.getSQLite('SELECT * FROM ' + self.MY_JFW_TABLE_NAME + ' WHERE id=' + str(jfw_id), db_path)[0]
-		except Exception as e:
-			utility.warn("JFW loadSQLite failed: " + str(e), track = False)
-			config = {"error" : str(e)}
+		if table_name: config = sql.getDeviceConfig(str(table_name), jfw_id, db_path)
+		else: config = sql.getDeviceConfig(self.MY_JFW_TABLE_NAME, jfw_id, db_path)
+		if not config:
+			utility.warn("JFW loadSQLite failed: ID [" + str(jfw_id) + "] not found", track = False)
+			config = {"error" : "ID [" + str(jfw_id) + "] not found"}
 		return self.__loadConfig(json = config)
 
 
@@ -292,25 +603,20 @@ class JFW:
 
 	## \brief Connect to remote JFW box and execute a command
 	#
-	# Remotely connecting to a JFW box using a Telnet connection.
+	# Execute the command on the persistent Telnet session (see Session) of the JFW box
 	# The IP address and Port was loaded by loadConfig/loadSQLite function
 	#
 	# \param command either using the CLI with -e option or input as a parameter
-	# \param delayTime a delay time waiting response from telnet connection, default is 2
+	# \param delayTime the timeout in seconds waiting for the response, default is 2
 	# \param daemon define if the program will print the reuslt or not, default is False
 	# \return result the return value from command executed remotely
 	##
 	def execute(self, command, delayTime = 2, daemon = False):
 		if not daemon: utility.info("###################### " + Fore.YELLOW + 'JFW Control' + Style.RESET_ALL + " #####################")
-		MESSAGE = (command + '\r\n').encode('ascii')
 		try:
 			if not daemon: utility.info('Send command: [' + command + '] to the JFW box at [' + str(self.MY_TCP_IP) + ':' + str(self.MY_TCP_PORT) + ']')
-			tn = Telnet(self.MY_TCP_IP, int(self.MY_TCP_PORT))
-			tn.write(MESSAGE)
-			utility.sleep(delayTime, daemon = True)
-			result = tn.read_very_eager().decode('ascii')
+			result = self.getSession().execute(command, delayTime)
 			if not daemon: utility.info('Response:\n' + result)
-			tn.close()
 		except Exception as e:
 			utility.error(str(e) + ' - Connection to ' + str(self.MY_TCP_IP) + ':' + str(self.MY_TCP_PORT) + ' Failed!')
 			result = str(e) + ' - JFW does not allow multiple login on the same device!'
@@ -318,26 +624,53 @@ class JFW:
 
 
 
-	## \brief Health Check function for checking Attenuator Port(s) status
+	## \brief Get the shared Telnet session of this JFW box, see getSession
+	##
+	def getSession(self):
+		return getSession(self.MY_TCP_IP, self.MY_TCP_PORT, self.MY_DAEMON)
+
+
+
+	## \brief Set many attenuators of this JFW box at once, see setAttenuations
 	#
-	# Remotely execute a read status command to a JFW box
-	# By default it is checking all attenuates, by explictly sending command to perform
-	# a single check on a certain port
+	# \param attenuations dictionary of the attenuator port to the attenuation (dB)
+	# \param verify read back all the attenuators and compare if set True, default is True
+	# \return dictionary of the ports not verified to their read back attenuation, empty if all done
+	##
+	def setAttenuations(self, attenuations, verify = True):
+		return setAttenuations(attenuations, self.MY_TCP_IP, self.MY_TCP_PORT, 2, verify, self.MY_DAEMON)
+
+
+
+	## \brief Reset many attenuators of this JFW box to RESET_VALUE at once, see resetAll
+	#
+	# \param ports (Optional) the list of the attenuator ports, default is all the ports read with 'RAA'
+	# \return dictionary of the ports not reset to their read back attenuation, empty if all done
+	##
+	def resetAll(self, ports = None):
+		return resetAll(ports, self.MY_TCP_IP, self.MY_TCP_PORT, 2, self.MY_DAEMON)
+
+
+
+	## \brief Health Check function for checking Attenuator Port(s) status, see healthCheck
 	#
 	# \param command default is RAA READ ALL ATTENUATES
 	# \param daemon default is False will print out the read results
-	# \return result if anything goes wrong with the port, return False
+	# \param fix set the differing ports back to their expected value if set True, default is False
+	# \return dictionary of the differing ports to {'EXPECTED', 'ACTUAL'}, empty if all the ports are as expected
 	##
-	def healthCheck(self, command = 'RAA', daemon = False):
-		if not daemon: utility.info("################ " + Fore.YELLOW + 'JFW Health Check' + Style.RESET_ALL + " ###############")
-		data = self.execute(command, 2, True)
-		result = {}
-		for line in data.split('\n'):
-			keys = utility.regex(line, 'Atten\s*#*(\d+)\s*=*\s*(\d+)..')
-			if keys:
-				if not daemon: utility.info("Attenuator #" + keys[0] + " - " + keys[1] + "dB")
-				result[keys[0]] = keys[1]
-		return result
+	def healthCheck(self, command = 'RAA', daemon = False, fix = False):
+		return healthCheck(command, daemon, fix, self.MY_TCP_IP, self.MY_TCP_PORT)
+
+
+
+	## \brief Get the attenuations last read back from this JFW box, {port: dB}
+	def getAttenuations(self):
+		return dict(self.getSession().actual)
+
+	## \brief Get the attenuations last set on this JFW box, {port: dB}
+	def getExpected(self):
+		return dict(self.getSession().expected)
 
 
 
@@ -351,9 +684,10 @@ def main():
 	global JFW_TABLE_NAME
 	parser = argparse.ArgumentParser(description='Tools for controlling JFW box')
 	parser.add_argument('--REBOOT', dest='REBOOT', action='store_true', help='Reboot the JFW system, has a 20 seconds delay after reboot')
-	parser.add_argument('-d', '--delay', nargs='?', const=2, metavar='Seconds', type=int, help='Set the system delay time waiting for JFW box responding, default 2 seconds')
+	parser.add_argument('-d', '--delay', nargs='?', const=2, metavar='Seconds', type=int, help='Set the timeout waiting for JFW box responding, default 2 seconds')
 	parser.add_argument('-e', '--execute', metavar='Command', nargs='+', help='Execute the remote command on JFW box')
 	parser.add_argument('-H', '--health', dest='HEALTH', action='store_true', help='Health check all attenuates status')
+	parser.add_argument('-r', '--reset', dest='RESET', action='store_true', help='Reset all attenuates to ' + str(RESET_VALUE) + ' and verify them with one RAA read')
 	parser.add_argument('-s', '--sql', metavar='SQLite_File_Path', help='Load the SQLite database path instead of configuration json file. Using parameter None or null to use default database')
 	parser.add_argument('-n', '--name', metavar='SQLite_Table_Name', help='Define the name of the table to be load when loading the SQLite')
 	parser.add_argument('-i', '--id', metavar='JFW_ID#', type=int, help='The id number of the JFW device in SQLite database, default is 1')
@@ -372,6 +706,7 @@ def main():
 	if args.REBOOT:
 		connectJFW('REBOOT', delayTime)
 		utility.sleep(20, daemon = True)
+	if args.RESET: resetAll(delayTime = delayTime)
 	if args.HEALTH: healthCheck()
 	if args.execute: connectJFW(' '.join(args.execute), delayTime)
 
@@ -381,6 +716,14 @@ def main():
 #
 # \param TCP_IP the ip address of the remote device
 # \param TCP_PORT the port of the remote device
+# \param TIMEOUT the seconds to wait when connecting to a JFW box
+# \param QUIET_TIME the seconds without data ending a response
+# \param PROMPT the prompt ending a response, None to end a response on QUIET_TIME only
+# \param IDLE_TIMEOUT the seconds without command before a session is closed, 0 to keep it open
+# \param PIPELINE write many commands at once (see Session.executeMany), False to send them one by one
+# \param RESET_VALUE the attenuation (dB) set by resetAll
+# \param ATTEN_PATTERN the attenuator read back pattern of the responses, 'Atten #<port> = <value>dB', a value without the dB suffix (truncated) is not matched
+# \param SET_PATTERN the attenuator set command pattern, 'SAR<port> <value>'
 # \function loadConfig() load the default configuration when loading this module
 ##
 ###################### Load Config File #########################
@@ -391,7 +734,18 @@ TCP_PORT = 3001                                 # Default Value #
 LOCATION = ''                                   # Default Value #
 STATUS = 0                                      # Default Value #
 JFW_TABLE_NAME = "jfw"                          # Default Value #
+TIMEOUT = 10                                    # Default Value #
+QUIET_TIME = 0.2                                # Default Value #
+PROMPT = None                                   # Default Value #
+IDLE_TIMEOUT = 30                               # Default Value #
+PIPELINE = True                                 # Default Value #
+RESET_VALUE = 127                               # Default Value #
 #################################################################
+ATTEN_PATTERN = re.compile(r'Atten\s*#*(\d+)\s*=*\s*(\d+)\s*dB')
+SET_PATTERN = re.compile(r'\s*SAR?(\d+)\s+(\d+)', re.IGNORECASE)
+__sessions = {}
+__sessionsLock = threading.Lock()
+atexit.register(closeSessions)
 
 
 ## \brief Load the default configuration from SAuto framework
@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+
+## \file measurement.py
+# \brief Time-series store of the MXA EVM/RSRP measurements
+#
+# This modules stores the readings of mxa.getEVMResult in the measurement table
+# (created by schema migration 3, see sql_migration.py) and provides the trend
+# queries across runs: the readings of a time range, windowed averages and
+# percentiles per device (MXA id) and vendor.   The measurement table can also
+# live in a companion SQLite file, create it with: ./sql.py -m -s <companion.sqlite>
+# and pass its path as db_path
+#
+# Example:
+#     result = mxa.getEVMResult(10)
+#     measurement.recordEVMResult(result, device_id = mxa.ID, vendor_id = 4)
+#     measurement.windowAverage(1, vendor_id = 4, window = 3600, start = time.time() - 86400)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import sql
+import utility
+import math
+import time
+import threading
+
+
+
+## \brief Recorder class, buffer the readings and append them in batches
+#
+# The readings are kept in memory and written with a single sql.insertMany
+# transaction every BATCH_SIZE readings, or when flush is called
+##
+class Recorder:
+    ## \brief Create the recorder
+    #
+    # \param db_path (Optional) the SQLite database path, default is sql.sqlite_file
+    # \param batch the number of readings written at a time, default is BATCH_SIZE
+    # \param daemon print out the info message if set False, the default is True
+    ##
+    def __init__(self, db_path = None, batch = None, daemon = True):
+        self.db_path = db_path
+        self.batch = batch or BATCH_SIZE
+        self.daemon = daemon
+        self.__rows = []
+        self.__lock = threading.Lock()
+
+
+
+    ## \brief Append one reading, written when the batch is full
+    #
+    # \param device_id the id of the MXA
+    # \param vendor_id (Optional) the id of the vendor
+    # \param evm (Optional) the RS EVM in %rms
+    # \param rsrp (Optional) the RS received power in dBm
+    # \param pci (Optional) the PCI read by the MXA
+    # \param timestamp (Optional) the epoch seconds of the reading, default is now
+    ##
+    def append(self, device_id, vendor_id = None, evm = None, rsrp = None, pci = None, timestamp = None):
+        row = {'timestamp': time.time() if timestamp is None else float(timestamp), 'device_id': device_id, 'vendor_id': vendor_id,
+               'pci': toNumber(pci, int), 'evm': toNumber(evm), 'rsrp': toNumber(rsrp)}
+        with self.__lock:
+            self.__rows.append(row)
+            full = len(self.__rows) >= self.batch
+        if full: self.flush()
+
+
+
+    ## \brief Write the buffered readings in one transaction
+    #
+    # \return the number of readings written, None if error (the readings are kept)
+    ##
+    def flush(self):
+        with self.__lock:
+            rows = self.__rows
+            self.__rows = []
+        if not rows: return 0
+        count = sql.insertMany(TABLE_NAME, rows, self.db_path, self.daemon)
+        if count is None:
+            utility.warn('Failed to write ' + str(len(rows)) + ' measurement(s), kept in buffer', False)
+            with self.__lock:
+                self.__rows = rows + self.__rows
+        return count
+
+
+
+## \brief Store the result of mxa.getEVMResult / MXA.getEVMResult
+#
+# Every (EVM, RSRP, PCI) reading of the result lists is stored as one row, all in
+# one transaction.   Each reading is stored with its own time from TIME_LIST, a
+# result without TIME_LIST (or a given timestamp) stores one time for all readings
+#
+# \param result the dictionary returned by getEVMResult
+# \param device_id the id of the MXA
+# \param vendor_id (Optional) the id of the vendor
+# \param timestamp (Optional) the epoch seconds stored for all the readings, default is the TIME_LIST of the result, or now
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is True
+# \return the number of readings written, None if error
+##
+def recordEVMResult(result, device_id, vendor_id = None, timestamp = None, db_path = None, daemon = True):
+    evmList = result.get('EVM_LIST', [])
+    rspwList = result.get('RSPW_LIST', [])
+    pciList = result.get('PCI_LIST', [])
+    timeList = result.get('TIME_LIST', []) if timestamp is None else []
+    counter = max(len(evmList), len(rspwList), len(pciList))
+    if timestamp is None: timestamp = time.time()
+    rows = ({'timestamp': float(timeList[i]) if i < len(timeList) else float(timestamp), 'device_id': device_id, 'vendor_id': vendor_id,
+             'pci': toNumber(pciList[i], int) if i < len(pciList) else None,
+             'evm': toNumber(evmList[i]) if i < len(evmList) else None,
+             'rsrp': toNumber(rspwList[i]) if i < len(rspwList) else None} for i in range(counter))
+    return sql.insertMany(TABLE_NAME, rows, db_path, daemon)
+
+
+
+## \brief Convert a reading (e.g. a NumPy scalar) to a Python number for SQLite
+#
+# SQLite stores the NumPy scalars as BLOB, the values are stored as int or float
+#
+# \param value the reading
+# \param kind the type of the stored value, default is float
+# \return the Python number, None if the value is None or NaN
+##
+def toNumber(value, kind = float):
+    if value is None: return None
+    value = float(value)
+    if math.isnan(value): return None
+    return kind(value)
+
+
+
+## \brief Build the WHERE clause and the parameters of a device/vendor/time range
+##
+def __where(device_id, vendor_id, start, end):
+    where = 'device_id=?'
+    params = [device_id]
+    if vendor_id is not None:
+        where += ' AND vendor_id=?'
+        params.append(vendor_id)
+    if start is not None:
+        where += ' AND timestamp>=?'
+        params.append(start)
+    if end is not None:
+        where += ' AND timestamp<?'
+        params.append(end)
+    return where, params
+
+
+
+## \brief Check the column name, only the measured columns can be aggregated
+##
+def __column(column):
+    if column not in COLUMNS: raise ValueError('Unknown measurement column [' + str(column) + '], use one of ' + str(COLUMNS))
+    return column
+
+
+
+## \brief Get the readings of a device in a time range, oldest first
+#
+# \param device_id the id of the MXA
+# \param vendor_id (Optional) the id of the vendor, default is all vendors
+# \param start (Optional) the epoch seconds of the range start (included)
+# \param end (Optional) the epoch seconds of the range end (excluded)
+# \param db_path (Optional) the SQLite database path
+# \param rowType the type of the returned rows, see sql.rowFactory
+# \return list of the measurement rows
+##
+def getMeasurements(device_id, vendor_id = None, start = None, end = None, db_path = None, rowType = None):
+    where, params = __where(device_id, vendor_id, start, end)
+    return sql.query('SELECT * FROM ' + TABLE_NAME + ' WHERE ' + where + ' ORDER BY timestamp', params, db_path, rowType = rowType)
+
+
+
+## \brief Average a measured column per fixed time window
+#
+# The windows are aligned on multiples of window seconds since the epoch, the
+# aggregation runs in SQLite on the (device_id, vendor_id, timestamp) index
+#
+# Example: windowAverage(1, window = 3600) - the hourly average EVM of MXA 1
+#
+# \param device_id the id of the MXA
+# \param column the measured column, 'evm' (default), 'rsrp' or 'pci'
+# \param window the length of a window in seconds, default is 3600
+# \param vendor_id (Optional) the id of the vendor, default is all vendors
+# \param start (Optional) the epoch seconds of the range start (included)
+# \param end (Optional) the epoch seconds of the range end (excluded)
+# \param db_path (Optional) the SQLite database path
+# \return list of {'window': window start, 'count': readings, 'avg', 'min', 'max'}, oldest first
+##
+def windowAverage(device_id, column = 'evm', window = 3600, vendor_id = None, start = None, end = None, db_path = None):
+    column = __column(column)
+    where, params = __where(device_id, vendor_id, start, end)
+    command = ('SELECT CAST(timestamp / ? AS INTEGER) * ? AS window, COUNT(' + column + ') AS count, AVG(' + column + ') AS avg, '
+               'MIN(' + column + ') AS min, MAX(' + column + ') AS max FROM ' + TABLE_NAME + ' WHERE ' + where + ' GROUP BY 1 ORDER BY 1')
+    return sql.query(command, [window, window] + params, db_path)
+
+
+
+## \brief Get the percentile(s) of a measured column
+#
+# The percentiles are linearly interpolated between the closest ranks (same as
+# numpy.percentile default), the NULL readings are ignored
+#
+# Example: percentile(1, [50, 95]) - the median and 95th percentile EVM of MXA 1
+#
+# \param device_id the id of the MXA
+# \param q the percentile, or list of percentiles, between 0 and 100
+# \param column the measured column, 'evm' (default), 'rsrp' or 'pci'
+# \param vendor_id (Optional) the id of the vendor, default is all vendors
+# \param start (Optional) the epoch seconds of the range start (included)
+# \param end (Optional) the epoch seconds of the range end (excluded)
+# \param db_path (Optional) the SQLite database path
+# \return the percentile value (or list of values), None if there is no reading
+##
+def percentile(device_id, q = 50, column = 'evm', vendor_id = None, start = None, end = None, db_path = None):
+    column = __column(column)
+    where, params = __where(device_id, vendor_id, start, end)
+    rows = sql.query('SELECT ' + column + ' FROM ' + TABLE_NAME + ' WHERE ' + where + ' AND ' + column + ' IS NOT NULL ORDER BY ' + column, params, db_path, rowType = sql.ROW_TUPLE)
+    values = [row[0] for row in rows]
+    if isinstance(q, (list, tuple)): return [__interpolate(values, p) for p in q]
+    return __interpolate(values, q)
+
+
+
+## \brief Linear interpolation of the percentile p of the sorted values
+##
+def __interpolate(values, p):
+    if not values: return None
+    rank = (len(values) - 1) * min(max(float(p), 0.0), 100.0) / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+
+## \brief Delete the readings older than the given epoch seconds
+#
+# \param before the epoch seconds, readings with an older timestamp are deleted
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is True
+##
+def purge(before, db_path = None, daemon = True):
+    sql.deleteSQLite(TABLE_NAME, 'timestamp<?', db_path, daemon, (before,))
+
+
+
+## \brief Global shared variables
+#
+# \param BATCH_SIZE the number of readings written at a time by Recorder
+# \param TABLE_NAME the measurement table name
+# \param COLUMNS the measured columns which can be aggregated
+##
+########################### Load Config File ############################
+BATCH_SIZE = 100                      # Default Value #
+#########################################################################
+TABLE_NAME = 'measurement'
+COLUMNS = ('evm', 'rsrp', 'pci')
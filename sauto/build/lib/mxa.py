@@ -16,8 +16,17 @@ import json
 from telnetlib import Telnet
 import socket
 import argparse
+import threading
+import atexit
+import asyncio
+import math
+import bisect
+import time
+import re
+import numpy as np
 import utility
 import sql
+import topology
 import sys
 import jfw
 import rf_matrix
@@ -36,7 +45,7 @@ from colorama import Fore, Style
 # \return config JSON object of MXA loaded from file
 ##
 def loadConfig(confPath = 'this_device_conf.json'):
-	global ID, NAME, TCP_IP, TELNET_PORT, LOCATION, JFW_PORT, MXA_PORT, MXA_TABLE_NAME, STATUS
+	global ID, NAME, TCP_IP, TELNET_PORT, SOCKET_PORT, TRANSPORT, LOCATION, JFW_PORT, MXA_PORT, MXA_TABLE_NAME, STATUS
 	config = utility.loadConfig(confPath)
 	if 'error' not in config:
 		if 'ID' in config['MXA']: ID = config['MXA']['ID']
@@ -44,6 +53,7 @@ def loadConfig(confPath = 'this_device_conf.json'):
 		if 'TCP_IP' in config['MXA']: TCP_IP = config['MXA']['TCP_IP']
 		if 'TELNET_PORT' in config['MXA']: TELNET_PORT = config['MXA']['TELNET_PORT']
 		if 'SOCKET_PORT' in config['MXA']: SOCKET_PORT = config['MXA']['SOCKET_PORT']
+		if 'TRANSPORT' in config['MXA']: TRANSPORT = config['MXA']['TRANSPORT']
 		if 'LOCATION' in config['MXA']: LOCATION = config['MXA']['LOCATION']
 		if 'JFW_PORT' in config['MXA']: JFW_PORT = config['MXA']['JFW_PORT']
 		if 'MXA_PORT' in config['MXA']: MXA_PORT = config['MXA']['MXA_PORT']
@@ -68,52 +78,586 @@ def loadConfig(confPath = 'this_device_conf.json'):
 ##
 def loadSQLite(mxa_id, table_name = None, db_path = None):
 	global ID, NAME, TCP_IP, TELNET_PORT, LOCATION, JFW_PORT, MXA_PORT, STATUS
-	if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(mxa_id), db_path)
-	else: config = sql.getSQLite('SELECT * FROM ' + MXA_TABLE_NAME + ' WHERE id=' + str(mxa_id), db_path)
+	if table_name: config = sql.getDeviceConfig(str(table_name), mxa_id, db_path)
+	else: config = sql.getDeviceConfig(MXA_TABLE_NAME, mxa_id, db_path)
 	if config:
-		if config[0]['id'] is not None: ID = config[0]['id']
-		if config[0]['name'] is not None: NAME = config[0]['name']
-		if config[0]['ip'] is not None: TCP_IP = config[0]['ip']
-		if config[0]['port'] is not None: TELNET_PORT = config[0]['port']
-		if config[0]['location'] is not None: LOCATION = config[0]['location']
-		if config[0]['jfw_port'] is not None: JFW_PORT = config[0]['jfw_port']
-		if config[0]['mxa_port'] is not None: MXA_PORT = config[0]['mxa_port']
-		if config[0]['status'] is not None: STATUS = config[0]['status']
-		return config[0]
+		if config['id'] is not None: ID = config['id']
+		if config['name'] is not None: NAME = config['name']
+		if config['ip'] is not None: TCP_IP = config['ip']
+		if config['port'] is not None: TELNET_PORT = config['port']
+		if config['location'] is not None: LOCATION = config['location']
+		if config['jfw_port'] is not None: JFW_PORT = config['jfw_port']
+		if config['mxa_port'] is not None: MXA_PORT = config['mxa_port']
+		if config['status'] is not None: STATUS = config['status']
+		return config
 	return {"error": "Loading table [" + MXA_TABLE_NAME + "] with ID [" + str(mxa_id) + "] Failed"}
 
 
 
+## \brief SCPI session class, one persistent connection to a MXA box
+#
+# Two transports are supported:
+#   'socket' - raw SCPI socket (SOCKET_PORT, 5025), newline terminated responses, no echo or prompt
+#   'telnet' - SCPI Telnet console (TELNET_PORT, 5023), the response is read between the echo and the 'SCPI>' prompt
+# The connection is opened once and reused for every command sent to the same analyzer (ip, port).
+# A command failing on a dropped connection is sent again on a new connection.
+# The session lock serializes the commands of all the threads using the analyzer
+# NOTE: use getSession to get the shared session of an analyzer
+##
+class Session:
+	## \brief Session constructor, the connection is opened by the first command
+	#
+	# \param ip the ip address of the MXA
+	# \param port the SCPI port of the MXA, the socket or the Telnet port
+	# \param transport 'socket' or 'telnet', default is 'telnet'
+	# \param daemon print out the info message if set False, default is True
+	##
+	def __init__(self, ip, port, transport = 'telnet', daemon = True):
+		self.ip = str(ip)
+		self.port = int(port)
+		self.transport = transport
+		self.daemon = daemon
+		self.lock = threading.RLock()
+		self.tableNames = None
+		self.tableIndex = {}
+		self.state = {}
+		self.__conn = None
+		self.__buffer = bytearray()
+
+
+
+	## \brief Open (or re-open) the connection, read the SCPI banner of the Telnet console
+	##
+	def connect(self):
+		with self.lock:
+			self.close()
+			self.invalidate()
+			if not self.daemon: utility.info('Opening SCPI ' + self.transport + ' session to the MXA box at [' + self.ip + ':' + str(self.port) + ']')
+			if self.transport == 'socket':
+				self.__conn = socket.create_connection((self.ip, self.port), TIMEOUT)
+				self.__conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+				self.__buffer = bytearray()
+			else:
+				self.__conn = Telnet(self.ip, self.port, TIMEOUT)
+				self.__conn.read_until(b'SCPI>', TIMEOUT)
+
+
+
+	## \brief Close the connection, the next command opens a new one
+	##
+	def close(self):
+		with self.lock:
+			if self.__conn is not None:
+				try:
+					self.__conn.close()
+				except OSError:
+					pass
+				self.__conn = None
+
+
+
+	## \brief Drop the cached EVM table column names and the shadow instrument state
+	#
+	# Called on (re)connect and before any command changing the measurement mode
+	# or the instrument state (see MODE_COMMANDS)
+	##
+	def invalidate(self):
+		with self.lock:
+			self.tableNames = None
+			self.tableIndex = {}
+			self.state = {}
+
+
+
+	## \brief Cache the EVM table column names and the name to index map of the current mode
+	#
+	# \param names the list of the column names
+	##
+	def setTableNames(self, names):
+		with self.lock:
+			self.tableNames = names
+			self.tableIndex = dict((name, index) for index, name in enumerate(names))
+
+
+
+	## \brief Check if the connection is open
+	##
+	def isConnected(self):
+		return self.__conn is not None
+
+
+
+	## \brief Send a command and read the response
+	#
+	# The response is read as soon as it is complete (newline for the socket, the
+	# 'SCPI>' prompt for Telnet) instead of waiting a fixed delay.   A command which
+	# is not a query is sent with ';*OPC?' (when OPC_SYNC is set), so it returns once
+	# the analyzer has completed it.   If the connection is lost, reconnect and send
+	# the command once more.   If the response times out, the connection is closed
+	# (dropping the late response) and '' is returned
+	#
+	# \param command the SCPI command
+	# \param delayTime the timeout in seconds waiting for the response, default is 5
+	# \return the response without the command echo and the prompt, '' if no response
+	##
+	def execute(self, command, delayTime = 5):
+		query = '?' in command
+		if not query and OPC_SYNC: command += ';*OPC?'
+		with self.lock:
+			if (self.tableNames is not None or self.state) and isModeCommand(command): self.invalidate()
+			elif self.state:
+				for part in splitResponse(command):
+					if '?' not in part: self.state.pop(stateKey(part), None)
+			for attempt in range(2):
+				try:
+					if self.__conn is None: self.connect()
+					result = self.__send(command, query or OPC_SYNC, delayTime)
+					return result if query else ''
+				except socket.timeout:
+					self.close()
+					utility.warn('SCPI command [' + command + '] to [' + self.ip + ':' + str(self.port) + '] timed out after ' + str(delayTime) + ' seconds', False)
+					return ''
+				except (OSError, EOFError) as e:
+					self.close()
+					if attempt: raise OSError(str(e))
+					utility.warn('SCPI session to [' + self.ip + ':' + str(self.port) + '] lost: ' + str(e) + ', reconnecting', False)
+
+
+
+	## \brief Send several commands with as few writes as possible
+	#
+	# The commands are joined with ';' (see joinCommands) in chunks of at most
+	# BATCH_LENGTH characters, each chunk is one round trip
+	#
+	# \param commands the list of SCPI commands
+	# \param delayTime the timeout in seconds waiting for the response of a chunk, default is 5
+	# \return the list of the responses of the queries, in order
+	##
+	def executeBatch(self, commands, delayTime = 5):
+		replies = []
+		for chunk in joinCommands(commands, BATCH_LENGTH):
+			response = self.execute(chunk, delayTime)
+			if '?' in chunk: replies += splitResponse(response)
+		return replies
+
+
+
+	## \brief Send setter commands, skipping the ones which would not change the instrument state
+	#
+	# The session keeps a shadow copy of the last value written by every setter
+	# header (see stateKey).   A command writing the value already in the shadow is
+	# not sent, the others are sent in one batch and recorded.   The shadow is
+	# dropped on (re)connect, recall, *RST and mode change (see MODE_COMMANDS),
+	# and a raw command sent with execute drops the headers it writes
+	# With verify, the written headers are read back in one batch and a value which
+	# does not match is reported and dropped from the shadow, so it is written again
+	#
+	# \param commands the list of SCPI setter commands, e.g. ['FREQ:CENT 2110 MHz', 'POW:ATT 10']
+	# \param delayTime the timeout in seconds waiting for the completion, default is 5
+	# \param verify read back the written values if set True, default is VERIFY_STATE
+	# \return the number of commands sent
+	##
+	def write(self, commands, delayTime = 5, verify = None):
+		if verify is None: verify = VERIFY_STATE
+		with self.lock:
+			pending = []
+			for command in commands:
+				key, value = stateKey(command), stateValue(command)
+				if SHADOW_STATE and self.state.get(key) == value: continue
+				pending.append((command, key, value))
+			if not pending: return 0
+			self.executeBatch([command for command, key, value in pending], delayTime)
+			if not self.isConnected(): return len(pending) ## timed out, the state is unknown
+			for command, key, value in pending:
+				self.state[key] = value
+			if verify: self.verify([key for command, key, value in pending], delayTime)
+			return len(pending)
+
+
+
+	## \brief Read back the given setter headers and compare them with the shadow state
+	#
+	# \param keys the list of the setter headers, see stateKey, default is all the shadowed headers
+	# \param delayTime the timeout in seconds waiting for the response, default is 5
+	# \return the list of the headers which did not match, they are dropped from the shadow
+	##
+	def verify(self, keys = None, delayTime = 5):
+		with self.lock:
+			keys = [key for key in (self.state if keys is None else keys) if key in self.state]
+			if not keys: return []
+			replies = self.executeBatch([key + '?' for key in keys], delayTime)
+			replies += [''] * (len(keys) - len(replies))
+			mismatch = []
+			for key, reply in zip(keys, replies):
+				if not sameValue(self.state[key], reply):
+					utility.warn('MXA [' + self.ip + '] ' + key + ' is [' + reply.strip() + '], expected [' + self.state[key] + ']', False)
+					self.state.pop(key, None)
+					mismatch.append(key)
+			return mismatch
+
+
+
+	## \brief Send a query returning an IEEE 488.2 definite-length block and read the raw bytes
+	#
+	# The block '#<n><length><data>' is read straight into a preallocated buffer
+	# with recv_into, the data is never decoded to text.   Only the socket transport
+	# carries binary data, the Telnet console would mangle it
+	#
+	# \param command the SCPI query, e.g. ':FORM REAL,32;:TRAC:DATA? TRACE1'
+	# \param delayTime the timeout in seconds waiting for the response, default is 5
+	# \return the bytearray of the block data, None if the response timed out
+	##
+	def queryBlock(self, command, delayTime = 5):
+		if self.transport != 'socket': raise ValueError('Binary block transfer needs the socket transport, [' + self.ip + ':' + str(self.port) + '] uses ' + str(self.transport))
+		with self.lock:
+			if (self.tableNames is not None or self.state) and isModeCommand(command): self.invalidate()
+			for attempt in range(2):
+				try:
+					if self.__conn is None: self.connect()
+					self.__send(command, False, delayTime)
+					return self.__readBlock()
+				except socket.timeout:
+					self.close()
+					utility.warn('SCPI block query [' + command + '] to [' + self.ip + ':' + str(self.port) + '] timed out after ' + str(delayTime) + ' seconds', False)
+					return None
+				except (OSError, EOFError) as e:
+					self.close()
+					if attempt: raise OSError(str(e))
+					utility.warn('SCPI session to [' + self.ip + ':' + str(self.port) + '] lost: ' + str(e) + ', reconnecting', False)
+
+
+
+	## \brief Read one IEEE 488.2 block and the newline ending the response from the socket
+	#
+	# \return the bytearray of the block data
+	##
+	def __readBlock(self):
+		header = self.__readExact(2)
+		if header[:1] != b'#':
+			line = bytes(header) if header.endswith(b'\n') else bytes(header) + self.__readLine()
+			raise ValueError('Not a SCPI block response: ' + repr(line[:80]))
+		digits = int(header[1:2])
+		if digits == 0: return bytearray(self.__readLine()) ## indefinite length, ends with the newline
+		length = int(self.__readExact(digits))
+		data = self.__readExact(length)
+		self.__readLine()
+		return data
+
+
+
+	## \brief Read exactly size bytes from the socket into a new bytearray
+	#
+	# The bytes already buffered are copied first, the rest is received in place
+	# through a memoryview of the result
+	#
+	# \param size the number of bytes to read
+	# \return the bytearray of size bytes
+	##
+	def __readExact(self, size):
+		data = bytearray(size)
+		view = memoryview(data)
+		count = min(len(self.__buffer), size)
+		view[:count] = self.__buffer[:count]
+		del self.__buffer[:count]
+		while count < size:
+			received = self.__conn.recv_into(view[count:], min(size - count, RECV_SIZE))
+			if not received: raise EOFError('socket connection closed')
+			count += received
+		view.release()
+		return data
+
+
+
+	## \brief Write the command and read the response on the open connection
+	#
+	# \param command the SCPI command
+	# \param reply True if the command returns a response
+	# \param timeout the timeout in seconds waiting for the response
+	# \return the response, '' if no response
+	##
+	def __send(self, command, reply, timeout):
+		if self.transport == 'socket':
+			del self.__buffer[:]
+			self.__conn.settimeout(timeout)
+			self.__conn.sendall((command + '\n').encode('ascii'))
+			if not reply: return ''
+			return self.__readLine().decode('ascii').strip()
+		self.__conn.read_very_eager() ## drop the output left by a previous command
+		self.__conn.write((command + '\r\n').encode('ascii'))
+		if not reply: return ''
+		data = self.__conn.read_until(b'SCPI>', timeout)
+		if not data.endswith(b'SCPI>'): raise socket.timeout('no SCPI> prompt')
+		lines = data.decode('ascii').replace('SCPI>', '').replace('\r', '').split('\n')
+		return ''.join(line.strip() for line in lines if line.strip() and line.strip() != command)
+
+
+
+	## \brief Read one newline terminated response from the socket
+	#
+	# \return the bytes of the line without the newline
+	##
+	def __readLine(self):
+		start = 0
+		while True:
+			index = self.__buffer.find(b'\n', start)
+			if index >= 0:
+				line = bytes(self.__buffer[:index])
+				del self.__buffer[:index + 1]
+				return line
+			start = len(self.__buffer)
+			data = self.__conn.recv(RECV_SIZE)
+			if not data: raise EOFError('socket connection closed')
+			self.__buffer += data
+
+
+
+## \brief Get the shared SCPI session of a MXA box
+#
+# One session is kept per (ip, port), shared by connectMXA, the get/set helpers
+# and all the MXA objects of the same analyzer
+# When port is not given, the transport is selected by selectTransport and the
+# port is SOCKET_PORT for 'socket' or TELNET_PORT for 'telnet'
+#
+# \param ip the ip address of the MXA, default is TCP_IP
+# \param port the SCPI port of the MXA, default is selected with the transport
+# \param daemon print out the info message if set False, default is True
+# \param transport 'socket' or 'telnet', default is selectTransport(TRANSPORT, SOCKET_PORT)
+# \return the Session object
+##
+def getSession(ip = None, port = None, daemon = True, transport = None):
+	if ip is None: ip = TCP_IP
+	if transport is None: transport = selectTransport(TRANSPORT, SOCKET_PORT if port is None else None)
+	if port is None: port = SOCKET_PORT if transport == 'socket' else TELNET_PORT
+	key = (str(ip), int(port))
+	with __sessionsLock:
+		session = __sessions.get(key)
+		if session is None:
+			session = Session(ip, port, transport, daemon)
+			__sessions[key] = session
+	return session
+
+
+
+## \brief Select the SCPI transport of a MXA box
+#
+# \param transport the configured transport, 'socket', 'telnet' or None for automatic
+# \param socketPort the configured SCPI socket port
+# \return 'socket' if configured, or automatic with a socket port, otherwise 'telnet'
+##
+def selectTransport(transport = None, socketPort = None):
+	if transport: return str(transport).lower()
+	if socketPort: return 'socket'
+	return 'telnet'
+
+
+
+## \brief SCPI batch class, collect commands and send them in one round trip
+#
+# Example:
+#     replies = MXA().batch().add('INST:SEL LTE').add('FREQ:CENT 2000 MHz').add('POW:ATT?').execute()
+#     replies == ['10']
+##
+class Batch:
+	## \brief Batch constructor
+	#
+	# \param session the Session the commands are sent to
+	# \param delayTime the timeout in seconds waiting for the response, default is 5
+	##
+	def __init__(self, session, delayTime = 5):
+		self.session = session
+		self.delayTime = delayTime
+		self.commands = []
+
+
+
+	## \brief Add a command to the batch
+	#
+	# \param command the SCPI command
+	# \return the batch itself, so the calls can be chained
+	##
+	def add(self, command):
+		self.commands.append(command)
+		return self
+
+
+
+	## \brief Send the commands and clear the batch
+	#
+	# \return the list of the responses of the queries, in order
+	##
+	def execute(self):
+		commands = self.commands
+		self.commands = []
+		return self.session.executeBatch(commands, self.delayTime)
+
+
+
+## \brief Join SCPI commands with ';' into as few command lines as possible
+#
+# After ';' a SCPI header is relative to the subsystem of the previous command,
+# so every command except the common commands (*RST, *OPC?, ...) is sent from the
+# root with a leading ':'
+#
+# \param commands the list of SCPI commands
+# \param length the maximum length of a command line, default is no limit
+# \return the list of command lines
+##
+def joinCommands(commands, length = None):
+	lines = []
+	line = ''
+	for command in commands:
+		command = command.strip()
+		if not command: continue
+		if command[0] not in ':*': command = ':' + command
+		if line and length and len(line) + 1 + len(command) > length:
+			lines.append(line)
+			line = ''
+		line = line + ';' + command if line else command
+	if line: lines.append(line)
+	return lines
+
+
+
+## \brief Split the response of several queries joined with ';'
+#
+# The ';' inside a quoted string is not a separator
+#
+# \param response the response string
+# \return the list of the responses
+##
+def splitResponse(response):
+	replies = []
+	start = 0
+	quoted = False
+	for index, char in enumerate(response):
+		if char == '"': quoted = not quoted
+		elif char == ';' and not quoted:
+			replies.append(response[start:index])
+			start = index + 1
+	replies.append(response[start:])
+	return replies
+
+
+
+## \brief Get the shadow state key of a SCPI command, its header in short form
+#
+# Example: 'EVM:DLINk:SYNC:ANTenna:NUMBer ANT2' and ':EVM:DLIN:SYNC:ANT:NUMB ANT4' have the key 'EVM:DLIN:SYNC:ANT:NUMB'
+#
+# \param command the SCPI command
+# \return the upper case header with every node in short form (see shortForm), whatever the case of the command
+##
+def stateKey(command):
+	header = command.strip().split(' ', 1)[0].lstrip(':').upper()
+	return ':'.join(shortForm(node) for node in header.split(':'))
+
+
+
+## \brief Get the SCPI short form of an upper case header node
+#
+# The short form is the first four letters of the keyword, or the first three
+# when the fourth one is a vowel, the numeric suffix and the '?' are kept
+# Example: 'FREQUENCY' -> 'FREQ', 'ATTENUATION' -> 'ATT', 'DATA4' -> 'DATA4'
+#
+# \param node the header node in upper case
+# \return the short form of the node
+##
+def shortForm(node):
+	match = __KEYWORD.match(node)
+	keyword, suffix = match.group(1), match.group(2)
+	if len(keyword) > 4: keyword = keyword[:3] if keyword[3] in 'AEIOU' else keyword[:4]
+	return keyword + suffix
+
+
+
+## \brief Check if a SCPI command line changes the measurement mode or the instrument state
+#
+# The header of every ';' separated command is compared with MODE_COMMANDS
+# (a mode command header or one of its sub nodes, e.g. 'INST' matches 'INST:SEL')
+#
+# \param command the SCPI command line
+# \return True if one of the commands is a mode command
+##
+def isModeCommand(command):
+	for part in splitResponse(command):
+		key = stateKey(part)
+		if any(key == mode or key.startswith(mode + ':') for mode in MODE_COMMANDS): return True
+	return False
+
+
+
+## \brief Get the shadow state value of a SCPI command, its upper case argument
+##
+def stateValue(command):
+	return ' '.join(command.strip().split(' ', 1)[1:]).upper().replace('"', '').strip()
+
+
+
+## \brief Compare a written value with the value read back from the MXA
+#
+# The numbers are compared with their unit ('2110 MHz' and '2.11E+09'), the
+# booleans as 0/1 and the other values as upper case text
+#
+# \param written the written value, see stateValue
+# \param read the response of the query
+# \return True if the values match
+##
+def sameValue(written, read):
+	written, read = written.strip().upper(), read.strip().upper().replace('"', '')
+	if written == read: return True
+	if __BOOLEANS.get(written, written) == __BOOLEANS.get(read, read): return True
+	parts = written.split()
+	try:
+		expected = float(parts[0]) * (__UNITS.get(parts[1], 1) if len(parts) > 1 else 1)
+		return math.isclose(expected, float(read), rel_tol = 1e-9, abs_tol = 1e-9)
+	except (ValueError, IndexError):
+		return False
+
+
+
+## \brief Get a Batch of the current MXA (loaded by loadConfig/loadSQLite)
+#
+# \param delayTime the timeout in seconds waiting for the response, default is 5
+# \return the Batch object
+##
+def batch(delayTime = 5):
+	return Batch(getSession(), delayTime)
+
+
+
+## \brief Close all the SCPI sessions, registered with atexit
+##
+def closeSessions():
+	with __sessionsLock:
+		sessions = list(__sessions.values())
+		__sessions.clear()
+	for session in sessions:
+		session.close()
+
+
+
 ## \brief Connect to remote MXA box and execute a command
 #
-# Remotely connecting to a MXA box using a Telnet connection.
-# The IP address and Port was loaded by loadConfig/loadSQLite function
+# Execute the command on the persistent SCPI session (see Session) of the MXA box
+# The IP address and Port was loaded by loadConfig/loadSQLite function, the raw
+# socket transport is used when a SOCKET_PORT is configured, see selectTransport
 #
 # \param command either using the CLI with -e option or input as a parameter
-# \param delayTime a delay time waiting response from telnet connection, default is 5
+# \param delayTime the timeout in seconds waiting for the response (or the completion of a setter), default is 5
 # \param daemon define if the program will print the reuslt or not, default is False
 # \return result the return value from command executed remotely
 ##
-## NOTE: MXA may have experiencing heavy traffic and may need to increse the delay time
-## NOTE: read_until() seems not working properly to track the return
+## NOTE: MXA may have experiencing heavy traffic and may need to increse the timeout
 def connectMXA(command, delayTime = 5, daemon = False):
 	if not daemon: utility.info("##################### " + Fore.YELLOW + "MXA Control" + Style.RESET_ALL + " ######################")
 	try:
-		if not daemon: utility.info('Send command: [' + command + '] to the MXA box at [' + str(TCP_IP) + ':' + str(TELNET_PORT) + ']')
-		tn = Telnet(TCP_IP, int(TELNET_PORT))
-		##tn.write(('\r\n').encode('ascii'))
-		tn.read_until(b'SCPI>')
-		tn.write((command + '\r\n').encode('ascii'))
-		utility.sleep(delayTime, True)
-		result = (utility.regexParser(tn.read_very_eager().decode('ascii'), ' (.*)\r\nSCPI.*', daemon)).replace('SCPI> ', '').replace(command, '').replace('\r\n', '')
+		session = getSession()
+		if not daemon: utility.info('Send command: [' + command + '] to the MXA box at [' + session.ip + ':' + str(session.port) + ']')
+		result = session.execute(command, delayTime)
 		if result:
 			if not daemon: utility.info('Response:\n' + result)
-		else:
-			result = ''
 	except OSError:
-		utility.error('Connection to ' + str(TCP_IP) + ':' + str(TELNET_PORT) + ' Failed!')
+		utility.error('Connection to ' + session.ip + ':' + str(session.port) + ' Failed!')
 		exit(1)
-	tn.close()
 	return result
 
 
@@ -131,43 +675,126 @@ def healthCheck():
 
 ## \brief Reset the attenuation on MXA
 #
-# Load MXA list from SQLite database baed on name, reset attenuations
+# Load MXA routes from the topology view (see topology.py) based on name, reset attenuations
 #
 # \param name The string name of the MXA
 # \param daemon Print out info message if set False, default is False
 ##
 def resetMXA(name = None, db_path = None, daemon = False):
-	if name: mxaList = sql.getSQLite('SELECT * FROM rf_matrix_db WHERE output_device = "' + name + '"', db_path = db_path)
-	else: mxaList = sql.getSQLite('SELECT * FROM rf_matrix_db WHERE output_device = "' + NAME + '"', db_path = db_path)
-	for mxa in mxaList:
-		if mxa['jfw_id'] and mxa['jfw_port']:
-			jfw.loadSQLite(str(mxa['jfw_id']), db_path = db_path)
-			jfw.connectJFW('SAR' + str(mxa['jfw_port']) + ' 127')
-		else:
-			rf_matrix_box = sql.getSQLite('SELECT * FROM rf_matrix WHERE id=' + str(mxa['rf_matrix_id']), db_path = db_path)[0]
-			rf_matrix.loadSQLite(str(rf_matrix_box['id']), db_path = db_path)
-			if 'QRB' in rf_matrix_box['name']: rf_matrix.resetQRBAtten(portB = mxa['port'], daemon = daemon)
-			elif 'RFM' in rf_matrix_box['name']: jfw.connectJFW('SAR' + str(JFW_PORT) + ' 127')
+	if name: mxaList = topology.getTopology(db_path).routesTo(name)
+	else: mxaList = topology.getTopology(db_path).routesTo(NAME)
+	resetRoutes(mxaList, JFW_PORT, db_path, daemon)
 	return mxaList
 
 
 
+## \brief Reset the attenuations of the given routes
+#
+# The JFW attenuators are grouped per JFW box, every box is reset with one
+# pipelined jfw.setAttenuations call and verified with one 'RAA' read
+#
+# \param routes the list of the routes, see topology.Topology.routesTo
+# \param jfwPort the JFW port of the MXA, used by the routes through a RFM matrix
+# \param db_path the SQLite database path
+# \param daemon Print out info message if set False, default is False
+##
+def resetRoutes(routes, jfwPort, db_path = None, daemon = False):
+	boxes = {}
+	for route in routes:
+		if route['jfw_id'] and route['jfw_port']:
+			box = route['jfw'] or {}
+			key = (box.get('ip') or jfw.TCP_IP, box.get('port') or jfw.TCP_PORT)
+			boxes.setdefault(key, {})[route['jfw_port']] = jfw.RESET_VALUE
+		elif route['matrix']:
+			rf_matrix.loadSQLite(str(route['matrix']['id']), db_path = db_path)
+			if 'QRB' in route['matrix']['name']:
+				if not daemon: utility.info("Reseting QRB [" + route['matrix']['name'] + "]...")
+				rf_matrix.resetQRBAtten(portB = route['port'], daemon = daemon)
+			elif 'RFM' in route['matrix']['name']: boxes.setdefault((jfw.TCP_IP, jfw.TCP_PORT), {})[jfwPort] = jfw.RESET_VALUE
+	for (ip, port), attenuations in boxes.items():
+		if not daemon: utility.info("Reseting JFW [" + str(ip) + ':' + str(port) + "] port(s) " + str(sorted(attenuations)) + "...")
+		jfw.setAttenuations(attenuations, ip, port, daemon = True)
+
+
+
 ## \brief Reading the current MXA LTE report from remote MXA
 #
-# Remotely connecting to MXA and send 'CALC:EVM:DATA4:TABL:NAM?' and 'CALC:EVM:DATA4:TABL:STR?' command
-# retrun the key-value pair based on NAM and STR result
+# Remotely connecting to MXA and send 'CALC:EVM:DATA4:TABL:STR?' command (and 'CALC:EVM:DATA4:TABL:NAM?'
+# if the names are not cached, see readTable), retrun the key-value pair based on NAM and STR result
 #
 # \param daemon Print out info message if set False, default is False
 # \return result A dictionary of key-value pairs
 ##
 def getMXAResult(daemon = False):
 	if not daemon: utility.info("############# " + Fore.YELLOW + "Reading MXA Report" + Style.RESET_ALL + " #############")
-	name = (connectMXA('CALC:EVM:DATA4:TABL:NAM?', daemon = True).replace('"', '')).split(',')
-	value = (connectMXA('CALC:EVM:DATA4:TABL:STR?', daemon = True).replace('"', '')).split(',')
-	result = {}
-	for i in range(0, len(name)):
-		result[name[i]] = value[i]
-	return result
+	name, value = readTable(getSession())
+	return dict(zip(name, value))
+
+
+
+## \brief Read the names and the values of the EVM table
+#
+# The column names only change with the measurement mode, they are cached on the
+# session (see Session.setTableNames) so only 'CALC:EVM:DATA4:TABL:STR?' is sent.
+# Without cached names (or if the number of values does not match) both are read
+# in one batch
+#
+# \param session the Session of the MXA to read
+# \param delayTime the timeout in seconds waiting for the response, default is 5
+# \return (names, values) the lists of the column names and the values
+##
+def readTable(session, delayTime = 5):
+	with session.lock:
+		names = session.tableNames
+		if names is not None:
+			values = session.execute('CALC:EVM:DATA4:TABL:STR?', delayTime).replace('"', '').split(',')
+			if len(values) == len(names): return names, values
+		replies = session.executeBatch(['CALC:EVM:DATA4:TABL:NAM?', 'CALC:EVM:DATA4:TABL:STR?'], delayTime)
+		replies += [''] * (2 - len(replies))
+		names = replies[0].replace('"', '').split(',')
+		values = replies[1].replace('"', '').split(',')
+		if len(values) == len(names): session.setTableNames(names)
+		return names, values
+
+
+
+## \brief Read a trace of the MXA into a NumPy array
+#
+# On the socket transport the trace is transferred as 32 bits little-endian
+# floats ('FORM REAL,32' and 'FORM:BORD SWAP') in an IEEE 488.2 block, and the
+# array is a view on the received buffer (no copy, no text conversion).   The
+# format is set back to ASCII in the same message, after the query, so the other
+# readings are not affected.   The Telnet console cannot carry binary data, the
+# trace is then read in ASCII
+#
+# \param session the Session of the MXA to read
+# \param trace the trace number, default is 1
+# \param command (Optional) the SCPI query of the trace data, default is 'TRAC:DATA? TRACE<trace>'
+#        e.g. 'FETC:EVM2?' for a measurement specific trace
+# \param delayTime the timeout in seconds waiting for the response, default is 30
+# \return the float32 numpy array of the trace, None if the trace could not be read
+##
+def readTrace(session, trace = 1, command = None, delayTime = 30):
+	if command is None: command = 'TRAC:DATA? TRACE' + str(trace)
+	if session.transport == 'socket':
+		data = session.queryBlock(joinCommands(['FORM REAL,32', 'FORM:BORD SWAP', command, 'FORM ASC'])[0], delayTime)
+		if data is None: return None
+		return np.frombuffer(data, dtype = '<f4')
+	text = session.executeBatch(['FORM ASC', command], delayTime)
+	if not text or not text[0]: return None
+	return np.array(text[0].split(','), dtype = np.float32)
+
+
+
+## \brief Read a trace of the MXA at TCP_IP, see readTrace
+#
+# \param trace the trace number, default is 1
+# \param command (Optional) the SCPI query of the trace data, default is 'TRAC:DATA? TRACE<trace>'
+# \param delayTime the timeout in seconds waiting for the response, default is 30
+# \return the float32 numpy array of the trace, None if the trace could not be read
+##
+def getTrace(trace = 1, command = None, delayTime = 30):
+	return readTrace(getSession(), trace, command, delayTime)
 
 
 
@@ -176,56 +803,432 @@ def getMXAResult(daemon = False):
 # Remotely connecting to MXA box and send 'CALC:EVM:DATA4:TABL:STR?' command to read
 # the EVM results with the current settings on the MXA box
 # A counter parameter is to provided to calculate an average result within multiple
-# data read
+# data read.   The readings are parsed and averaged with EVMResult, a value which
+# is not measured ('---') is skipped and the average is over the valid readings
 #
 # \param counter an iteration counter to read and calculate average result of EVM and RS Pow default is 10
 # \daemon define if the program will print the result of not, default is False
-# \return a dictionary of EVM_AVG and RSPW_AVG values, value is None if not readable
+# \param asResult return the EVMResult object instead of the dictionary if set True, default is False
+# \return a dictionary of EVM_AVG and RSPW_AVG values (see EVMResult.getInfo), value is None if not readable
 ##
-def getEVMResult(counter = 10, daemon = False):
+def getEVMResult(counter = 10, daemon = False, asResult = False):
 	if not daemon: utility.info("############# " + Fore.YELLOW + "Reading MXA EVM Results" + Style.RESET_ALL + " #############")
-	evmList = []
-	rspwList = []
-	pciList = []
-	evmAvg = 0.0
-	rspwAvg = 0.0
-	pci = -1
+	return readEVMResult(getSession(), counter, daemon, asResult)
+
+
+
+## \brief Read the EVM results of the MXA of the given session, see getEVMResult
+#
+# \param session the Session of the MXA to read
+# \param counter an iteration counter to read and calculate average result of EVM and RS Pow default is 10
+# \param daemon define if the program will print the result of not, default is False
+# \param asResult return the EVMResult object instead of the dictionary if set True, default is False
+# \return a dictionary of EVM_AVG and RSPW_AVG values (see EVMResult.getInfo), value is None if not readable
+##
+def readEVMResult(session, counter = 10, daemon = False, asResult = False):
+	result = EVMResult()
 	for i in range(counter):
-		utility.info("[Iteration " + str(i+1) + "]")
-		mxaRead = getMXAResult(daemon = True)
-		evmRead = str(mxaRead['RSEVM']) ## str(connectMXA('CALC:EVM:DATA4:TABL:STR? "RSEVM"', 5, True))
-		## utility.debug("Test evm: " + evmRead, False)
-		evmRead = float(''.join(j for j in evmRead if j.isdigit() or j == '.' or j == '-'))
-		if not evmRead:
-			utility.error('Failed to read remote MXA at [' + TCP_IP + ']', False)
+		if not daemon: utility.info("[Iteration " + str(i+1) + "]")
+		name, value = readTable(session)
+		sample = result.append(value, name)
+		if isFailedSample(sample):
+			utility.error('Failed to read remote MXA at [' + session.ip + ']', False)
 			break
-		evmList.append(evmRead)
-		evmAvg += evmRead
-		if str(mxaRead['RSRP']) == '---': rspwRead = str(mxaRead['RSTP'])
-		else: rspwRead = str(mxaRead['RSRP']) ## str(connectMXA('CALC:EVM:DATA4:TABL:STR? "RSRP"', 5, True))
-		## utility.debug("Test rstp: " + rspwRead, False)
-		rspwRead = float(''.join(j for j in rspwRead if j.isdigit() or j == '.' or j == '-'))
-		if not rspwRead:
-			utility.error('Failed to read remote MXA at [' + TCP_IP + ']', False)
-			break
-		rspwList.append(rspwRead)
-		rspwAvg += rspwRead
-		pciRead = int(''.join(i for i in str(mxaRead['CellId']) if i.isdigit()))
-		pciList.append(pciRead)
-		if pci == -1:
-			pci = pciRead
-		else:
-			if pci != pciRead:
-				pci = -2
-				utility.warn('MXA not getting consistent PCI value, read [' + str(pciRead) + ']', False)
-
 		if not daemon:
-			utility.info("PCI: " + str(pci))
-			utility.info("RS EVM: " + str(evmRead) + " %rms")
-			utility.info("RS Rx. Power(Avg): " + str(rspwRead) + " dBm")
-	evmAvg /= counter
-	rspwAvg /= counter
-	return {'EVM_LIST': evmList, 'RSPW_LIST': rspwList, 'PCI_LIST': pciList, 'EVM_AVG': evmAvg, 'RSPW_AVG': rspwAvg, 'PCI': pci}
+			utility.info("PCI: " + str(sample['PCI']))
+			utility.info("RS EVM: " + str(sample['EVM']) + " %rms")
+			utility.info("RS Rx. Power(Avg): " + str(sample['RSPW']) + " dBm")
+	if asResult: return result
+	return result.getInfo()
+
+
+
+## \brief EVM result class, the EVM table readings in NumPy arrays
+#
+# The 'CALC:EVM:DATA4:TABL:STR?' payloads are parsed into a float row as they are
+# appended and stacked into a (readings x columns) array when the values are used,
+# the readings which are not measured ('---') or not a number are NaN.   The
+# statistics are computed on the valid (not NaN) readings only
+#
+# Example:
+#     result = getEVMResult(1000, True, asResult = True)
+#     result.stats('RSEVM')['MEDIAN'], result.percentile('RSEVM', 95), result.evm()
+##
+class EVMResult:
+	## \brief EVMResult constructor
+	#
+	# \param names (Optional) the EVM table column names, default is taken from the first append
+	##
+	def __init__(self, names = None):
+		self.names = list(names) if names else None
+		self.index = dict((name, i) for i, name in enumerate(self.names)) if self.names else {}
+		self.__rows = []
+		self.__times = []
+		self.__table = np.empty((0, len(self.names) if self.names else 0))
+
+
+
+	## \brief Append the values of one reading
+	#
+	# The values are parsed once into a float row, the sample is taken from that row
+	# and table() stacks the rows without parsing them again
+	#
+	# \param values the list of the value strings, or the raw 'TABL:STR?' payload
+	# \param names (Optional) the column names of the values, when they differ from the result columns
+	# \return the sample {'TIME', 'EVM', 'RSPW', 'PCI'} of this reading, None for a value not read
+	##
+	def append(self, values, names = None):
+		if isinstance(values, str): values = values.replace('"', '').split(',')
+		if self.names is None:
+			self.names = list(names) if names else ['C' + str(i) for i in range(len(values))]
+			self.index = dict((name, i) for i, name in enumerate(self.names))
+			self.__table = np.empty((0, len(self.names)))
+		if names and list(names) != self.names:
+			row = dict(zip(names, values))
+			values = [row.get(name, '---') for name in self.names]
+		values = list(values[:len(self.names)]) + ['---'] * (len(self.names) - len(values))
+		tokens = ','.join(values).replace('"', '').replace('---', 'nan').split(',')
+		try:
+			row = np.array(tokens, dtype = float)
+		except ValueError:
+			row = np.fromiter((self.__number(token) for token in tokens), float, len(tokens))
+		self.__rows.append(row)
+		self.__times.append(time.time())
+		return self.__sample(row)
+
+
+
+	## \brief Get the sample of the reading just appended
+	#
+	# The RS power is RSRP, or RSTP when RSRP is not measured
+	#
+	# \param row the float row of the reading
+	# \return the sample {'TIME', 'EVM', 'RSPW', 'PCI'}, None for a value not read
+	##
+	def __sample(self, row):
+		value = lambda name: None if name not in self.index or math.isnan(row[self.index[name]]) else float(row[self.index[name]])
+		rspw = value('RSRP')
+		pci = value('CellId')
+		return {'TIME': self.__times[-1], 'EVM': value('RSEVM'), 'RSPW': rspw if rspw is not None else value('RSTP'), 'PCI': int(pci) if pci is not None else None}
+
+
+
+	## \brief Stack the pending readings and return the table
+	#
+	# \return the (readings x columns) float array
+	##
+	def table(self):
+		if self.__rows:
+			self.__table = np.concatenate((self.__table, np.array(self.__rows)))
+			self.__rows = []
+		return self.__table
+
+
+
+	## \brief Convert one token to float, NaN if not a number
+	def __number(self, token):
+		try:
+			return float(token)
+		except ValueError:
+			return float('nan')
+
+
+
+	## \brief Get the number of readings
+	def __len__(self):
+		return len(self.__rows) + len(self.__table)
+
+
+
+	## \brief Get the readings of a column
+	#
+	# \param name the column name, e.g. 'RSEVM'
+	# \return the float array of the column, all NaN if the column does not exist
+	##
+	def column(self, name):
+		table = self.table()
+		if name not in self.index: return np.full(len(table), np.nan)
+		return table[:, self.index[name]]
+
+
+
+	## \brief Get the RS EVM readings (%rms)
+	def evm(self):
+		return self.column('RSEVM')
+
+
+
+	## \brief Get the RS power readings (dBm), RSRP or RSTP when RSRP is not measured
+	def rspw(self):
+		rsrp = self.column('RSRP')
+		return np.where(np.isnan(rsrp), self.column('RSTP'), rsrp)
+
+
+
+	## \brief Get the PCI readings
+	def pci(self):
+		return self.column('CellId')
+
+
+
+	## \brief Get the percentile(s) of the valid readings of a column
+	#
+	# \param name the column name, or an array of readings (e.g. evm())
+	# \param q the percentile, or list of percentiles, between 0 and 100
+	# \return the percentile value(s), NaN if there is no valid reading
+	##
+	def percentile(self, name, q):
+		values = self.column(name) if isinstance(name, str) else name
+		values = values[~np.isnan(values)]
+		if not len(values): return np.full(np.shape(q), np.nan) if np.ndim(q) else float('nan')
+		return np.percentile(values, q)
+
+
+
+	## \brief Get the statistics of the valid readings of a column
+	#
+	# \param name the column name, or an array of readings (e.g. evm())
+	# \return a dictionary of COUNT, AVG, MEDIAN, STDDEV, MIN and MAX, None values if there is no valid reading
+	##
+	def stats(self, name):
+		values = self.column(name) if isinstance(name, str) else name
+		values = values[~np.isnan(values)]
+		if not len(values): return {'COUNT': 0, 'AVG': None, 'MEDIAN': None, 'STDDEV': None, 'MIN': None, 'MAX': None}
+		return {'COUNT': len(values), 'AVG': float(values.mean()), 'MEDIAN': float(np.median(values)), 'STDDEV': float(values.std(ddof = 1)) if len(values) > 1 else 0.0,
+			'MIN': float(values.min()), 'MAX': float(values.max())}
+
+
+
+	## \brief Get the result dictionary, same keys as the former getEVMResult
+	#
+	# The lists have one entry per reading, in order, so index i of EVM_LIST,
+	# RSPW_LIST, PCI_LIST and TIME_LIST (the epoch seconds the reading was
+	# appended) is the same reading; a value not read is None
+	# PCI is -1 when no PCI is read, -2 when the readings are not consistent
+	#
+	# \return dictionary of EVM_LIST, RSPW_LIST, PCI_LIST, TIME_LIST, EVM_AVG, RSPW_AVG, PCI, plus the MEDIAN/STDDEV and COUNT
+	##
+	def getInfo(self):
+		evm = self.evm()
+		rspw = self.rspw()
+		pci = self.pci()
+		evmStats = self.stats(evm)
+		rspwStats = self.stats(rspw)
+		unique = np.unique(pci[~np.isnan(pci)].astype(int))
+		return {'EVM_LIST': toList(evm), 'RSPW_LIST': toList(rspw), 'PCI_LIST': toList(pci, int), 'TIME_LIST': list(self.__times),
+			'EVM_AVG': evmStats['AVG'], 'RSPW_AVG': rspwStats['AVG'], 'PCI': int(unique[0]) if len(unique) == 1 else (-1 if not len(unique) else -2),
+			'EVM_MEDIAN': evmStats['MEDIAN'], 'EVM_STDDEV': evmStats['STDDEV'], 'RSPW_MEDIAN': rspwStats['MEDIAN'], 'RSPW_STDDEV': rspwStats['STDDEV'],
+			'COUNT': len(self)}
+
+
+
+## \brief Convert a float array to a list of Python numbers, None for NaN
+#
+# \param values the float array
+# \param kind the type of the list values, default is float
+# \return the list, same length as values
+##
+def toList(values, kind = float):
+	return [None if math.isnan(value) else kind(value) for value in values.tolist()]
+
+
+
+## \brief Running statistics class, Welford's online mean and variance
+#
+# Keep the count, mean, variance, min and max of a stream of values in O(1)
+# memory, the None and NaN values are skipped
+##
+class RunningStats:
+	## \brief RunningStats constructor
+	def __init__(self):
+		self.count = 0
+		self.mean = 0.0
+		self.min = None
+		self.max = None
+		self.__m2 = 0.0
+
+
+
+	## \brief Add a value to the statistics
+	#
+	# \param value the new value, skipped if None or NaN
+	##
+	def add(self, value):
+		if value is None or value != value: return
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.__m2 += delta * (value - self.mean)
+		if self.min is None or value < self.min: self.min = value
+		if self.max is None or value > self.max: self.max = value
+
+
+
+	## \brief Get the sample variance, 0.0 with less than two values
+	def variance(self):
+		return self.__m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+
+	## \brief Get the sample standard deviation
+	def stddev(self):
+		return math.sqrt(self.variance())
+
+
+
+	## \brief Get the standard error of the mean, infinite with less than two values
+	def stderr(self):
+		return self.stddev() / math.sqrt(self.count) if self.count > 1 else float('inf')
+
+
+
+	## \brief Get the statistics in a dictionary
+	def getInfo(self):
+		return {'COUNT': self.count, 'AVG': self.mean, 'STDDEV': self.stddev(), 'MIN': self.min, 'MAX': self.max}
+
+
+
+## \brief Check if a sample is a failed reading, neither the EVM nor the RS power is read
+#
+# A sample with only one of the two values (e.g. EVM not measured yet) is a valid reading,
+# the same rule is used by readEVMResult and EVMStream
+#
+# \param sample the dictionary returned by EVMResult.append
+# \return True if the reading failed, otherwise False
+##
+def isFailedSample(sample):
+	return sample['EVM'] is None and sample['RSPW'] is None
+
+
+
+## \brief EVM stream class, continuous EVM acquisition
+#
+# Poll the EVM table of a MXA and yield every parsed sample (see EVMResult.append) as
+# it arrives, while the running statistics of the EVM and the RS power are kept
+# in O(1) memory (see RunningStats).   The stream runs until one of the stop
+# conditions is met: count samples, duration seconds, until(sample, stream)
+# returns True, the standard error of the EVM mean is below tolerance, or stop()
+# is called.   Without any condition it runs until stopped
+#
+# Example:
+#     stream = MXA().stream(duration = 3600, tolerance = 0.01)
+#     for sample in stream: print(sample['EVM'])
+#     stream.getInfo()['EVM_AVG']
+#     async for sample in MXA().stream(count = 100): ...
+##
+class EVMStream:
+	## \brief EVMStream constructor
+	#
+	# \param session the Session of the MXA
+	# \param count (Optional) stop after count samples
+	# \param duration (Optional) stop after duration seconds
+	# \param interval the seconds between two polls, default is 0
+	# \param until (Optional) a function until(sample, stream), stop when it returns True
+	# \param tolerance (Optional) stop when the standard error of the EVM mean is below tolerance
+	# \param minCount the minimum number of samples before checking the tolerance, default is 10
+	# \param delayTime the timeout in seconds waiting for a sample, default is 5
+	# \param daemon print out the samples if set False, default is True
+	##
+	def __init__(self, session, count = None, duration = None, interval = 0, until = None, tolerance = None, minCount = 10, delayTime = 5, daemon = True):
+		self.session = session
+		self.count = count
+		self.duration = duration
+		self.interval = interval
+		self.until = until
+		self.tolerance = tolerance
+		self.minCount = minCount
+		self.delayTime = delayTime
+		self.daemon = daemon
+		self.stats = {'EVM': RunningStats(), 'RSPW': RunningStats()}
+		self.counter = 0
+		self.failures = 0
+		self.pci = -1
+		self.last = None
+		self.__start = None
+		self.__stopped = False
+
+
+
+	## \brief Stop the stream after the current sample
+	def stop(self):
+		self.__stopped = True
+
+
+
+	## \brief Check the stop conditions
+	#
+	# \return True if the stream is done
+	##
+	def isDone(self):
+		if self.__stopped: return True
+		if self.count is not None and self.counter >= self.count: return True
+		if self.duration is not None and self.__start is not None and time.time() - self.__start >= self.duration: return True
+		if self.until is not None and self.last is not None and self.until(self.last, self): return True
+		if self.tolerance is not None and self.stats['EVM'].count >= self.minCount and self.stats['EVM'].stderr() <= self.tolerance: return True
+		return False
+
+
+
+	## \brief Read and parse one sample, update the statistics
+	##
+	def __poll(self):
+		if self.__start is None: self.__start = time.time()
+		elif self.interval: time.sleep(self.interval)
+		name, value = readTable(self.session, self.delayTime)
+		sample = EVMResult(name).append(value)
+		self.counter += 1
+		self.last = sample
+		if isFailedSample(sample):
+			self.failures += 1
+			utility.warn('Failed to read remote MXA at [' + self.session.ip + ']', False)
+		self.stats['EVM'].add(sample['EVM'])
+		self.stats['RSPW'].add(sample['RSPW'])
+		if sample['PCI'] is not None:
+			if self.pci == -1: self.pci = sample['PCI']
+			elif self.pci != sample['PCI'] and self.pci != -2:
+				self.pci = -2
+				utility.warn('MXA not getting consistent PCI value, read [' + str(sample['PCI']) + ']', False)
+		if not self.daemon: utility.info('[Sample ' + str(self.counter) + '] PCI: ' + str(sample['PCI']) + ' RS EVM: ' + str(sample['EVM']) + ' %rms RS Rx. Power: ' + str(sample['RSPW']) + ' dBm')
+		return sample
+
+
+
+	## \brief Iterate the samples
+	def __iter__(self):
+		while not self.isDone():
+			yield self.__poll()
+
+
+
+	## \brief Asynchronous iteration, each poll runs in the default executor
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		if self.isDone(): raise StopAsyncIteration
+		return await asyncio.get_event_loop().run_in_executor(None, self.__poll)
+
+
+
+	## \brief Get the summary of the stream, same keys as getEVMResult without the lists
+	#
+	# \return a dictionary of the running statistics
+	##
+	def getInfo(self):
+		evm = self.stats['EVM']
+		rspw = self.stats['RSPW']
+		return {'EVM_AVG': evm.mean, 'EVM_STDDEV': evm.stddev(), 'EVM_MIN': evm.min, 'EVM_MAX': evm.max,
+			'RSPW_AVG': rspw.mean, 'RSPW_STDDEV': rspw.stddev(), 'RSPW_MIN': rspw.min, 'RSPW_MAX': rspw.max,
+			'PCI': self.pci, 'COUNT': self.counter, 'FAILURES': self.failures}
+
+
+
+## \brief Stream the EVM of the current MXA (loaded by loadConfig/loadSQLite), see EVMStream
+#
+# \return the EVMStream object
+##
+def streamEVM(count = None, duration = None, interval = 0, until = None, tolerance = None, minCount = 10, delayTime = 5, daemon = True):
+	return EVMStream(getSession(), count, duration, interval, until, tolerance, minCount, delayTime, daemon)
 
 
 
@@ -249,10 +1252,7 @@ def getCID():
 ##
 def setCID(cid, daemon = False):
 	if not daemon: utility.info('[MXA] Setting Cell ID to [' + str(cid) + ']')
-	if str(cid).isdigit():
-		connectMXA('EVM:DLINk:SYNC:CID:AUTO OFF', 5, True)
-		connectMXA('EVM:DLINk:SYNC:CID ' + str(cid), 5, True)
-	else: connectMXA('EVM:DLINk:SYNC:CID:AUTO ON', 5, True)
+	getSession().write(configCommands(cid = cid))
 
 
 
@@ -277,7 +1277,7 @@ def getFrequency():
 ##
 def setFrequency(freq, unit = 'MHz', daemon = False):
 	if not daemon: utility.info('[MXA] Setting Center Frequency to [' + str(freq) + ' ' + unit + ']')
-	connectMXA('FREQ:CENT ' + str(freq) + ' ' + unit, 5, True)
+	getSession().write(configCommands(freq = freq, unit = unit))
 
 
 
@@ -302,7 +1302,7 @@ def getRang():
 ##
 def setRang(rang, daemon = False):
 	if not daemon: utility.info('[MXA] Setting Attenuator Range to [' + str(rang) + ']')
-	connectMXA('POW:RANG ' + str(rang), 5, True)
+	getSession().write(configCommands(rang = rang))
 
 
 
@@ -326,7 +1326,7 @@ def getAtten():
 ##
 def setAtten(atten, daemon = False):
 	if not daemon: utility.info('[MXA] Setting Physical Attenuator to [' + str(atten) + ']')
-	connectMXA('POW:ATT ' + str(atten), 5, True)
+	getSession().write(configCommands(atten = atten))
 
 
 
@@ -340,7 +1340,7 @@ def setAtten(atten, daemon = False):
 ##
 def setSyncType(sType, daemon = False):
 	if not daemon: utility.info('[MXA] Setting decode Sync Type to [' + str(sType) + ']')
-	connectMXA('EVM:DLINk:SYNC:TYPE ' + str(sType), 5, True)
+	getSession().write(configCommands(sType = sType))
 
 
 
@@ -378,8 +1378,7 @@ def getNumOfCRSPorts():
 ##
 def setNumOfCRSPorts(ant, daemon = False):
 	if not daemon: utility.info('[MXA] Setting Number of C-RS Ports to [' + str(ant) + ']')
-	if str(ant).isdigit(): ant = 'ANT' + str(ant)
-	connectMXA('EVM:DLINk:SYNC:ANTenna:NUMBer ' + str(ant), 5, True)
+	getSession().write(configCommands(ant = ant))
 
 
 
@@ -406,120 +1405,231 @@ def getRefCRSPort():
 def setRefCRSPort(port, daemon = False):
 	if str(port).isdigit(): port = 'P' + str(port)
 	if not daemon: utility.info('[MXA] Setting the Reference C-RS Port [' + str(port) + '] to use')
-	if 'AUTO' in str(port) or 'Auto' in str(port) or 'auto' in str(port): connectMXA('EVM:DLINk:SYNC:ANTenna:PORT:AUTO ON', 5, True)
-	else:
-		connectMXA('EVM:DLIN:SYNC:ANT:PORT:AUTO OFF', 5, True)
-		connectMXA('EVM:DLIN:SYNC:ANT:PORT ' + str(port), 5, True)
+	getSession().write(configCommands(port = port))
+
+
+
+## \brief E-UTRA operating bands (3GPP TS 36.101 table 5.7.3-1)
+#
+# (band, duplex, name, F_DL_low, N_Offs-DL, N_DL max, F_UL_low, N_Offs-UL, N_UL max)
+# in MHz and channel numbers, the uplink is None for the downlink only (SDL) bands
+# The frequency of a channel N is F_low + 0.1 * (N - N_Offs)
+##
+BANDS = (
+	############################### FDD ###############################
+	(1, 'FDD', '2100', 2110, 0, 599, 1920, 18000, 18599),
+	(2, 'FDD', '1900 PCS', 1930, 600, 1199, 1850, 18600, 19199),
+	(3, 'FDD', '1800+', 1805, 1200, 1949, 1710, 19200, 19949),
+	(4, 'FDD', 'AWS-1', 2110, 1950, 2399, 1710, 19950, 20399),
+	(5, 'FDD', '850', 869, 2400, 2649, 824, 20400, 20649),
+	(6, 'FDD', 'UMTS only', 875, 2650, 2749, 830, 20650, 20749),
+	(7, 'FDD', '2600', 2620, 2750, 3449, 2500, 20750, 21449),
+	(8, 'FDD', '900 GSM', 925, 3450, 3799, 880, 21450, 21799),
+	(9, 'FDD', '1800', 1844.9, 3800, 4149, 1749.9, 21800, 22149),
+	(10, 'FDD', 'AWS-1+', 2110, 4150, 4749, 1710, 22150, 22749),
+	(11, 'FDD', '1500 Lower', 1475.9, 4750, 4949, 1427.9, 22750, 22949),
+	(12, 'FDD', '700 a', 729, 5010, 5179, 699, 23010, 23179),
+	(13, 'FDD', '700 c', 746, 5180, 5279, 777, 23180, 23279),
+	(14, 'FDD', '700 PS', 758, 5280, 5379, 788, 23280, 23379),
+	(17, 'FDD', '700 b', 734, 5730, 5849, 704, 23730, 23849),
+	(18, 'FDD', '800 Lower', 860, 5850, 5999, 815, 23850, 23999),
+	(19, 'FDD', '800 Upper', 875, 6000, 6149, 830, 24000, 24149),
+	(20, 'FDD', '800 DD', 791, 6150, 6449, 832, 24150, 24449),
+	(21, 'FDD', '1500 Upper', 1495.9, 6450, 6599, 1447.9, 24450, 24599),
+	(22, 'FDD', '3500', 3510, 6600, 7399, 3410, 24600, 25399),
+	(23, 'FDD', '2000 S-band', 2180, 7500, 7699, 2000, 25500, 25699),
+	(24, 'FDD', '1600 L-band', 1525, 7700, 8039, 1626.5, 25700, 26039),
+	(25, 'FDD', '1900+', 1930, 8040, 8689, 1850, 26040, 26689),
+	(26, 'FDD', '850+', 859, 8690, 9039, 814, 26690, 27039),
+	(27, 'FDD', '800 SMR', 852, 9040, 9209, 807, 27040, 27209),
+	(28, 'FDD', '700 APT', 758, 9210, 9659, 703, 27210, 27659),
+	(29, 'SDL', '700 d', 717, 9660, 9769, None, None, None),
+	(30, 'FDD', '2300 WCS', 2350, 9770, 9869, 2305, 27660, 27759),
+	(31, 'FDD', '450', 462.5, 9870, 9919, 452.5, 27760, 27809),
+	(32, 'SDL', '1500 L-band', 1452, 9920, 10359, None, None, None),
+	############################### TDD ###############################
+	(33, 'TDD', 'TD 1900', 1900, 36000, 36199, 1900, 36000, 36199),
+	(34, 'TDD', 'TD 2000', 2010, 36200, 36349, 2010, 36200, 36349),
+	(35, 'TDD', 'TD PCS Lower', 1850, 36350, 36949, 1850, 36350, 36949),
+	(36, 'TDD', 'TD PCS Upper', 1930, 36950, 37549, 1930, 36950, 37549),
+	(37, 'TDD', 'TD PCS Center gap', 1910, 37550, 37749, 1910, 37550, 37749),
+	(38, 'TDD', 'TD 2600', 2570, 37750, 38249, 2570, 37750, 38249),
+	(39, 'TDD', 'TD 1900+', 1880, 38250, 38649, 1880, 38250, 38649),
+	(40, 'TDD', 'TD 2300', 2300, 38650, 39649, 2300, 38650, 39649),
+	(41, 'TDD', 'TD 2500', 2496, 39650, 41589, 2496, 39650, 41589),
+	(42, 'TDD', 'TD 3500', 3400, 41590, 43589, 3400, 41590, 43589),
+	(43, 'TDD', 'TD 3700', 3600, 43590, 45589, 3600, 43590, 45589),
+	(44, 'TDD', 'TD 700', 703, 45590, 46589, 703, 45590, 46589),
+	(45, 'TDD', 'TD 1500', 1447, 46590, 46789, 1447, 46590, 46789),
+	(46, 'TDD', 'TD Unlicensed', 5150, 46790, 54539, 5150, 46790, 54539),
+	(47, 'TDD', 'TD V2X', 5855, 54540, 55239, 5855, 54540, 55239),
+	(48, 'TDD', 'TD 3600', 3550, 55240, 56739, 3550, 55240, 56739),
+	(49, 'TDD', 'TD 3600r', 3550, 56740, 58239, 3550, 56740, 58239),
+	(50, 'TDD', 'TD 1500+', 1432, 58240, 59089, 1432, 58240, 59089),
+	(51, 'TDD', 'TD 1500-', 1427, 59090, 59139, 1427, 59090, 59139),
+	(52, 'TDD', 'TD 3300', 3300, 59140, 60139, 3300, 59140, 60139),
+)
+
+
+
+## \brief Compile BANDS into the channel ranges sorted by EARFCN
+#
+# A TDD band has one range used by both links ('DL/UL')
+#
+# \return list of the range dictionaries, sorted by the first EARFCN
+##
+def __compileChannels():
+	channels = []
+	for band, duplex, name, dlLow, dlOffset, dlLast, ulLow, ulOffset, ulLast in BANDS:
+		links = [('DL/UL' if duplex == 'TDD' else 'DL', dlLow, dlOffset, dlLast)]
+		if duplex == 'FDD': links.append(('UL', ulLow, ulOffset, ulLast))
+		for link, low, offset, last in links:
+			channels.append({'BAND': band, 'LINK': link, 'DUPLEX': duplex, 'NAME': name, 'OFFSET': offset, 'LAST': last, 'F_LOW': low,
+				'F_HIGH': round(low + 0.1 * (last - offset), 1), 'BANDWIDTH': round(0.1 * (last - offset + 1), 1),
+				'SPACING': round(dlLow - ulLow, 1) if duplex == 'FDD' else 0})
+	channels.sort(key = lambda channel: channel['OFFSET'])
+	return channels
+
+
+
+## \brief Compile the channel ranges into frequency segments for the frequency lookup
+#
+# The bands overlap in frequency, the sorted boundaries split the spectrum in
+# segments and every segment keeps the ranges covering its start
+#
+# \return (boundaries, candidates) the sorted boundary frequencies and the list of ranges of each segment
+##
+def __compileSegments(channels):
+	boundaries = sorted(set([channel['F_LOW'] for channel in channels] + [channel['F_HIGH'] for channel in channels]))
+	candidates = [sorted([channel for channel in channels if channel['F_LOW'] <= start <= channel['F_HIGH']], key = lambda channel: channel['BAND']) for start in boundaries]
+	return boundaries, candidates
+
+
+
+## \brief Get the channel range of the given EARFCN with a bisect lookup
+#
+# \param earfcn EARFCN value
+# \return the range dictionary, None if the EARFCN is not in any band
+##
+def __findChannel(earfcn):
+	index = bisect.bisect_right(__CHANNEL_STARTS, earfcn) - 1
+	if index < 0 or earfcn > __CHANNELS[index]['LAST']: return None
+	return __CHANNELS[index]
+
+
+
+## \brief Get the band information of an EARFCN
+#
+# \param earfcn EARFCN value
+# \return dictionary of EARFCN, FREQUENCY (MHz), BAND, LINK ('DL', 'UL' or 'DL/UL'), DUPLEX ('FDD', 'TDD' or 'SDL'),
+#         NAME, F_LOW/F_HIGH (MHz) of the link, BANDWIDTH (MHz) of the link and SPACING (MHz) between DL and UL,
+#         None if the EARFCN is not in any band
+##
+def earfcnInfo(earfcn):
+	earfcn = int(earfcn)
+	channel = __findChannel(earfcn)
+	if channel is None: return None
+	info = dict(channel)
+	info['EARFCN'] = earfcn
+	info['FREQUENCY'] = round(channel['F_LOW'] + 0.1 * (earfcn - channel['OFFSET']), 1)
+	return info
 
 
 
 ## \brief convert EARFCN to frequency
 #
-# convert the input earfcn value to frequency (MHz)
+# convert the input earfcn value to frequency (MHz), the band is found with a
+# bisect lookup in the compiled BANDS table, see earfcnInfo for the band details
 #
 # \param earfcn EARFCN value
 # \param daemon print the info message if set False, default value is False
-# \return frequency (MHz)
+# \return frequency (MHz), None if the EARFCN is not in any band
 ##
-## TODO TODO TODO return frequency, technology, and BW
 def earfcnToFrequency(earfcn, daemon = False):
-	offset = 0
-	frequencyLow = 0
 	earfcn = int(earfcn)
-	############################### FDD ###############################
-	if 0 <= earfcn <= 599: offset = 0; frequencyLow = 2110;                 ## 2100
-	elif 18000 <= earfcn <= 18599: offset = 18000; frequencyLow = 1920;
-	elif 600 <= earfcn <= 1199: offset = 600; frequencyLow = 1930;          ## 1900 PCS
-	elif 18600 <= earfcn <= 19199: offset = 18600; frequencyLow = 1850;
-	elif 1200 <= earfcn <= 1949: offset = 1200; frequencyLow = 1805;        ## 1800+
-	elif 19200 <= earfcn <= 19949: offset = 19200; frequencyLow = 1710;
-	elif 1950 <= earfcn <= 2399: offset = 1950; frequencyLow = 2110;        ## AWS-1
-	elif 19950 <= earfcn <= 20399: offset = 19950; frequencyLow = 1710;
-	elif 2400 <= earfcn <= 2649: offset = 2400; frequencyLow = 869;         ## 850
-	elif 20400 <= earfcn <= 20649: offset = 20400; frequencyLow = 824;
-	elif 2650 <= earfcn <= 2749: offset = 2650; frequencyLow = 875;         ## UMTS only
-	elif 20650 <= earfcn <= 20749: offset = 20650; frequencyLow = 830;
-	elif 2750 <= earfcn <= 3449: offset = 2750; frequencyLow = 2620;        ## 2600
-	elif 20750 <= earfcn <= 21449: offset = 20750; frequencyLow = 2500;
-	elif 3450 <= earfcn <= 3799: offset = 3450; frequencyLow = 925;         ## 900 GSM
-	elif 21450 <= earfcn <= 21799: offset = 21450; frequencyLow = 880;
-	elif 3800 <= earfcn <= 4149: offset = 3800; frequencyLow = 1844.9;      ## 1800
-	elif 21800 <= earfcn <= 22149: offset = 21800; frequencyLow = 1749.9;
-	elif 4150 <= earfcn <= 4749: offset = 4150; frequencyLow = 2110;        ## AWS-1+
-	elif 22150 <= earfcn <= 22749: offset = 22150; frequencyLow = 1710;
-	elif 4750 <= earfcn <= 4949: offset = 4750; frequencyLow = 1475.9;      ## 1500 Lower
-	elif 22750 <= earfcn <= 22999: offset = 22750; frequencyLow = 1427.9;
-	elif 5010 <= earfcn <= 5179: offset = 5010; frequencyLow = 729;         ## 700 a
-	elif 23010 <= earfcn <= 23179: offset = 23010; frequencyLow = 699;
-	elif 5180 <= earfcn <= 5279: offset = 5180; frequencyLow = 746;         ## 700 c
-	elif 23180 <= earfcn <= 23279: offset = 23180; frequencyLow = 777;
-	elif 5280 <= earfcn <= 5379: offset = 5280; frequencyLow = 758;         ## 700 PS
-	elif 23280 <= earfcn <= 23379: offset = 23280; frequencyLow = 788;
-	## Downlink
-	elif 5730 <= earfcn <= 5849: offset = 5730; frequencyLow = 734;         ## 700 b
-	elif 23730 <= earfcn <= 23849: offset = 23730; frequencyLow = 704;
-	elif 5850 <= earfcn <= 5999: offset = 5850; frequencyLow = 860;         ## 800 Lower
-	elif 23850 <= earfcn <= 23999: offset = 23850; frequencyLow = 815;
-	elif 6000 <= earfcn <= 6149: offset = 6000; frequencyLow = 875;         ## 800 Upper
-	elif 24000 <= earfcn <= 24149: offset = 24000; frequencyLow = 830;
-	elif 6150 <= earfcn <= 6449: offset = 6150; frequencyLow = 791;         ## 800 DD
-	elif 24150 <= earfcn <= 24449: offset = 24150; frequencyLow = 832;
-	elif 6450 <= earfcn <= 6599: offset = 6450; frequencyLow = 1495.9;      ## 1500 Upper
-	elif 24450 <= earfcn <= 24599: offset = 24450; frequencyLow = 1447.9;
-	elif 6600 <= earfcn <= 7399: offset = 6600; frequencyLow = 3510;        ## 3500
-	elif 24600 <= earfcn <= 25399: offset = 24600; frequencyLow = 3410;
-	elif 7500 <= earfcn <= 7699: offset = 7500; frequencyLow = 2180;        ## 2000 S-band
-	elif 25500 <= earfcn <= 25699: offset = 25500; frequencyLow = 2000;
-	elif 7700 <= earfcn <= 8039: offset = 7700; frequencyLow = 1525;        ## 1600 L-band
-	elif 25700 <= earfcn <= 26039: offset = 25700; frequencyLow = 1626.5;
-	elif 8040 <= earfcn <= 8689: offset = 8040; frequencyLow = 1930;        ## 1900+
-	elif 26040 <= earfcn <= 26689: offset = 26040; frequencyLow = 1850;
-	elif 8690 <= earfcn <= 9039: offset = 8690; frequencyLow = 859;         ## 850+
-	elif 26690 <= earfcn <= 27039: offset = 26690; frequencyLow = 814;
-	elif 9040 <= earfcn <= 9209: offset = 9040; frequencyLow = 852;         ## 800 SMR
-	elif 27040 <= earfcn <= 27209: offset = 27040; frequencyLow = 807;
-	elif 9210 <= earfcn <= 9659: offset = 9210; frequencyLow = 758;         ## 700 APT
-	elif 27210 <= earfcn <= 27659: offset = 27210; frequencyLow = 703;
-	elif 9660 <= earfcn <= 9769: offset = 9960; frequencyLow = 717;         ## 700 d
-	## Downlink only
-	elif 9770 <= earfcn <= 9869: offset = 9770; frequencyLow = 2350;        ## 2300 WCS
-	elif 27660 <= earfcn <= 27759: offset = 27660; frequencyLow = 2305;
-	elif 9870 <= earfcn <= 9919: offset = 9870; frequencyLow = 462.5;       ## 450
-	elif 27760 <= earfcn <= 27809: offset = 27760; frequencyLow = 452.5;
-	elif 9920 <= earfcn <= 10359: offset = 9920; frequencyLow = 1452;       ## 1500 L-band
-	## Downlink only
-
-	############################### TDD ###############################
-	elif 36000 <= earfcn <= 36199: offset = 36000; frequencyLow = 1900;     ## TD 1900
-	elif 36200 <= earfcn <= 36349: offset = 36200; frequencyLow = 2010;     ## TD 2000
-	elif 36350 <= earfcn <= 36949: offset = 36350; frequencyLow = 1850;     ## TD PCS Lower
-	elif 36950 <= earfcn <= 37549: offset = 36950; frequencyLow = 1930;     ## TD PCS Upper
-	elif 37550 <= earfcn <= 37749: offset = 37550; frequencyLow = 1910;     ## TD PCS Center gap
-	elif 37750 <= earfcn <= 38249: offset = 37750; frequencyLow = 2570;     ## TD 2600
-	elif 38250 <= earfcn <= 38649: offset = 38250; frequencyLow = 1880;     ## TD 1900+
-	elif 38650 <= earfcn <= 39649: offset = 38650; frequencyLow = 2300;     ## TD 2300
-	elif 39650 <= earfcn <= 41589: offset = 39650; frequencyLow = 2496;     ## TD 2500
-	elif 41590 <= earfcn <= 43589: offset = 41590; frequencyLow = 3400;     ## TD 3500
-	elif 43590 <= earfcn <= 45589: offset = 43590; frequencyLow = 3600;     ## TD 3700
-	elif 45590 <= earfcn <= 46589: offset = 45590; frequencyLow = 703;      ## TD 700
-	elif 46590 <= earfcn <= 46789: offset = 46590; frequencyLow = 1447;     ## TD 1500
-	elif 46790 <= earfcn <= 54539: offset = 46790; frequencyLow = 4150;     ## TD Unlicensed
-	elif 54540 <= earfcn <= 55239: offset = 54540; frequencyLow = 5855;     ## TD V2X
-	elif 55240 <= earfcn <= 56739: offset = 55240; frequencyLow = 3550;     ## TD 3600
-	elif 56740 <= earfcn <= 58239: offset = 56740; frequencyLow = 3550;     ## TD 3600r
-	elif 58240 <= earfcn <= 59089: offset = 58240; frequencyLow = 1432;     ## TD 1500+
-	elif 59090 <= earfcn <= 59139: offset = 59090; frequencyLow = 1427;     ## TD 1500-
-	elif 59140 <= earfcn <= 60139: offset = 59140; frequencyLow = 3300;     ## TD 3300
-
-	frequency = frequencyLow + 0.1 * (earfcn - offset)
+	channel = __findChannel(earfcn)
+	if channel is None:
+		utility.warn("EARFCN [" + str(earfcn) + "] is not in any E-UTRA band", False)
+		return None
+	frequency = round(channel['F_LOW'] + 0.1 * (earfcn - channel['OFFSET']), 1)
 	if not daemon: utility.info("EARFCN [" + str(earfcn) + "] has frequency: " + str(frequency))
 	return frequency
 
 
 
-## TODO TODO
-def frequencyToEarfcn():
-	return 1
+## \brief convert an array of EARFCN to frequencies in one call
+#
+# Example: the downlink frequencies of all the vendors
+#     rows = sql.query('SELECT DLEARFCN FROM vendor', rowType = sql.ROW_TUPLE)
+#     frequencies = earfcnToFrequencies([row[0] for row in rows])
+#
+# \param earfcns list or numpy array of EARFCN values
+# \return numpy float array of the frequencies (MHz), NaN where the EARFCN is not in any band (or None)
+##
+def earfcnToFrequencies(earfcns):
+	earfcns = np.asarray(earfcns, dtype = float)
+	valid = ~np.isnan(earfcns)
+	values = np.where(valid, earfcns, -1).astype(np.int64)
+	index = np.searchsorted(__CHANNEL_ARRAY['start'], values, side = 'right') - 1
+	valid &= index >= 0
+	index = np.clip(index, 0, None)
+	valid &= values <= __CHANNEL_ARRAY['last'][index]
+	frequencies = __CHANNEL_ARRAY['low'][index] + 0.1 * (values - __CHANNEL_ARRAY['start'][index])
+	return np.where(valid, np.round(frequencies, 1), np.nan)
+
+
+
+## \brief Get the band information of every band and link carrying the given frequency
+#
+# \param frequency the frequency (MHz)
+# \param link (Optional) keep only 'DL' or 'UL' (a TDD band carries both), default is both links
+# \return list of dictionaries (see earfcnInfo) sorted by band, empty list if not found
+##
+def frequencyInfo(frequency, link = None):
+	frequency = float(frequency)
+	index = bisect.bisect_right(__SEGMENT_BOUNDARIES, frequency) - 1
+	if index < 0: return []
+	result = []
+	for channel in __SEGMENT_CHANNELS[index]:
+		if frequency > channel['F_HIGH'] or (link is not None and link not in channel['LINK']): continue
+		info = dict(channel)
+		info['EARFCN'] = channel['OFFSET'] + int(round((frequency - channel['F_LOW']) * 10))
+		info['FREQUENCY'] = round(channel['F_LOW'] + 0.1 * (info['EARFCN'] - channel['OFFSET']), 1)
+		result.append(info)
+	return result
+
+
+
+## \brief convert frequency to EARFCN
+#
+# The bands overlap, the lowest band carrying the frequency is used unless band
+# is given, see frequencyInfo for all the candidates
+#
+# \param frequency the frequency (MHz)
+# \param band (Optional) the E-UTRA band number
+# \param link 'DL' (default) or 'UL', ignored by the TDD bands
+# \param daemon print the info message if set False, default value is False
+# \return EARFCN, None if the frequency is not in the band(s)
+##
+def frequencyToEarfcn(frequency, band = None, link = 'DL', daemon = False):
+	for info in frequencyInfo(frequency, link):
+		if band is None or info['BAND'] == int(band):
+			if not daemon: utility.info("Frequency [" + str(frequency) + "] has EARFCN: " + str(info['EARFCN']) + " (band " + str(info['BAND']) + " " + info['LINK'] + ")")
+			return info['EARFCN']
+	utility.warn("Frequency [" + str(frequency) + "] MHz is not in " + ("band " + str(band) if band is not None else "any E-UTRA band") + " " + str(link), False)
+	return None
+
+
+
+__CHANNELS = __compileChannels()
+__CHANNEL_STARTS = [channel['OFFSET'] for channel in __CHANNELS]
+__CHANNEL_ARRAY = {
+	'start': np.array(__CHANNEL_STARTS, dtype = np.int64),
+	'last': np.array([channel['LAST'] for channel in __CHANNELS], dtype = np.int64),
+	'low': np.array([channel['F_LOW'] for channel in __CHANNELS], dtype = float),
+}
+__SEGMENT_BOUNDARIES, __SEGMENT_CHANNELS = __compileSegments(__CHANNELS)
+
 
 
 ## \brief recall a pre-registered states on MXA and switch all configurations
@@ -533,7 +1643,7 @@ def frequencyToEarfcn():
 ##
 def recall(reg, daemon = False):
 	if not daemon: utility.info('[MXA] Recall Registered status [' + str(reg) + ']')
-	connectMXA('*RCL ' + str(reg), 5, True)
+	connectMXA('*RCL ' + str(reg), MODE_TIMEOUT, True)
 
 
 
@@ -550,7 +1660,57 @@ def recall(reg, daemon = False):
 ##
 def setMode(mode, daemon = False):
 	if not daemon: utility.info('[MXA] Setting MXA mode to [' + str(mode) + ']')
-	connectMXA('INST:SEL ' + str(mode), 5, True)
+	getSession().write(configCommands(mode = mode), MODE_TIMEOUT)
+
+
+
+## \brief Configure the MXA measurement in one batch
+#
+# Send the given settings (the None ones are skipped) in one or two round trips
+# instead of one per setter.   The mode is switched first, the batch waits up to
+# MODE_TIMEOUT seconds when the mode is changed
+#
+# Example: configure(mode = 'LTE', freq = 2110, atten = 10, sType = 'RS', ant = 2)
+#
+# \param mode the MXA mode, see setMode
+# \param freq the center frequency, see setFrequency
+# \param unit the unit of the center frequency, default is 'MHz'
+# \param rang the attenuator range, see setRang
+# \param atten the physical attenuator, see setAtten
+# \param sType the decode Sync Type, see setSyncType
+# \param ant the number of C-RS ports, see setNumOfCRSPorts
+# \param cid the cell id, 'AUTO' for automatic detection, see setCID
+# \param port the reference C-RS port, 'AUTO' for automatic detection, see setRefCRSPort
+# \param daemon print out info message if set False, default is False
+# \param verify read back the written values if set True, default is VERIFY_STATE
+# \return the number of commands sent, the settings already in place are skipped (see Session.write)
+##
+def configure(mode = None, freq = None, unit = 'MHz', rang = None, atten = None, sType = None, ant = None, cid = None, port = None, daemon = False, verify = None):
+	commands = configCommands(mode, freq, unit, rang, atten, sType, ant, cid, port)
+	if not daemon: utility.info('[MXA] Configuring ' + str(commands))
+	return getSession().write(commands, MODE_TIMEOUT if mode is not None else 5, verify)
+
+
+
+## \brief Build the SCPI commands of the given settings, see configure
+#
+# \return the list of SCPI commands
+##
+def configCommands(mode = None, freq = None, unit = 'MHz', rang = None, atten = None, sType = None, ant = None, cid = None, port = None):
+	commands = []
+	if mode is not None: commands.append('INST:SEL ' + str(mode))
+	if freq is not None: commands.append('FREQ:CENT ' + str(freq) + ' ' + unit)
+	if rang is not None: commands.append('POW:RANG ' + str(rang))
+	if atten is not None: commands.append('POW:ATT ' + str(atten))
+	if sType is not None: commands.append('EVM:DLINk:SYNC:TYPE ' + str(sType))
+	if ant is not None: commands.append('EVM:DLINk:SYNC:ANTenna:NUMBer ' + ('ANT' + str(ant) if str(ant).isdigit() else str(ant)))
+	if cid is not None:
+		if str(cid).isdigit(): commands += ['EVM:DLINk:SYNC:CID:AUTO OFF', 'EVM:DLINk:SYNC:CID ' + str(cid)]
+		else: commands.append('EVM:DLINk:SYNC:CID:AUTO ON')
+	if port is not None:
+		if 'AUTO' in str(port).upper(): commands.append('EVM:DLINk:SYNC:ANTenna:PORT:AUTO ON')
+		else: commands += ['EVM:DLINk:SYNC:ANTenna:PORT:AUTO OFF', 'EVM:DLINk:SYNC:ANTenna:PORT ' + ('P' + str(port) if str(port).isdigit() else str(port))]
+	return commands
 
 
 
@@ -566,12 +1726,14 @@ class MXA:
 	MY_TCP_IP = '10.155.226.218'
 	MY_TELNET_PORT = 5023
 	MY_SOCKET_PORT = 5025
+	MY_TRANSPORT = None
 	MY_LOCATION = ''
 	MY_JFW_PORT = 24
 	MY_MXA_PORT = 1
 	MY_MXA_TABLE_NAME = 'mxa'
 	MY_STATUS = 0
 	MY_DAEMON = False
+	MY_VERIFY = None
 
 	## \brief MXA constructor
 	def __init__(self, config = None, defaultConfigFile = 'this_device_conf.json', daemon = False):
@@ -606,7 +1768,9 @@ class MXA:
 		if 'TELNET_PORT' in config: self.MY_TELNET_PORT = config['TELNET_PORT']
 		elif 'port' in config: self.MY_TELNET_PORT = config['port']
 		if 'SOCKET_PORT' in config: self.MY_SOCKET_PORT = config['SOCKET_PORT']
-		elif 'socket_port' in config: self.MY_SOCKET_PORT = config['socketport']
+		elif 'socket_port' in config: self.MY_SOCKET_PORT = config['socket_port']
+		if 'TRANSPORT' in config: self.MY_TRANSPORT = config['TRANSPORT']
+		elif 'transport' in config: self.MY_TRANSPORT = config['transport']
 		if 'LOCATION' in config: self.MY_LOCATION = config['LOCATION']
 		elif 'location' in config: self.MY_LOCATION = config['location']
 		if 'JFW_PORT' in config: self.MY_JFW_PORT = config['JFW_PORT']
@@ -629,12 +1793,11 @@ class MXA:
 	# \return True if no error found, else False
 	##
 	def loadSQLite(self, mxa_id, table_name = None, db_path = None):
-		try:
-			if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(mxa_id), db_path)[0]
-			else: config = sql.getSQLite('SELECT * FROM ' + self.MY_MXA_TABLE_NAME + ' WHERE id=' + str(mxa_id), db_path)[0]
-		except Exception as e:
-			utility.warn("MXA loadSQLite failed: " + str(e), track = False)
-			config = {"error" : str(e)}
+		if table_name: config = sql.getDeviceConfig(str(table_name), mxa_id, db_path)
+		else: config = sql.getDeviceConfig(self.MY_MXA_TABLE_NAME, mxa_id, db_path)
+		if not config:
+			utility.warn("MXA loadSQLite failed: ID [" + str(mxa_id) + "] not found", track = False)
+			config = {"error" : "ID [" + str(mxa_id) + "] not found"}
 		return self.__loadConfig(json = config)
 
 
@@ -679,6 +1842,10 @@ class MXA:
 	def getSocketPort(self):
 		return self.MY_SOCKET_PORT
 
+	## \brief Get the SCPI transport, 'socket' or 'telnet'
+	def getTransport(self):
+		return selectTransport(self.MY_TRANSPORT, self.MY_SOCKET_PORT)
+
 	## \brief Get Location
 	def getLocation(self):
 		return self.MY_LOCATION
@@ -709,6 +1876,7 @@ class MXA:
 			'TCP_IP' : self.MY_TCP_IP,
 			'TELNET_PORT' : self.MY_TELNET_PORT,
 			'SOCKET_PORT' : self.MY_SOCKET_PORT,
+			'TRANSPORT' : self.getTransport(),
 			'LOCATION' : self.MY_LOCATION,
 			'JFW_PORT' : self.MY_JFW_PORT,
 			'MXA_PORT' : self.MY_MXA_PORT,
@@ -722,13 +1890,17 @@ class MXA:
 	def setDaemon(self, daemon = None):
 		if isinstance(daemon, bool): self.MY_DAEMON = daemon
 
+	## \brief Set the verify mode of the setters, None to use VERIFY_STATE (see Session.write)
+	def setVerify(self, verify = None):
+		if verify is None or isinstance(verify, bool): self.MY_VERIFY = verify
+
 	## \brief Set Provided Configuration
 	#
 	# \return self.getInfo()
 	##
-	def setConfig(self, ID = None, Name = None, IP = None, Telnet_Port = None, Socket_Port = None, Location = None, JFW_Port = None, MXA_Port = None, Table_Name = None, Status = None):
+	def setConfig(self, ID = None, Name = None, IP = None, Telnet_Port = None, Socket_Port = None, Location = None, JFW_Port = None, MXA_Port = None, Table_Name = None, Status = None, Transport = None):
 		if isinstance(ID, int): self.MY_ID = ID
-		if isinstance(NAME, str): self.MY_NAME = NAME
+		if isinstance(Name, str): self.MY_NAME = Name
 		if isinstance(IP, str): self.MY_TCP_IP = IP
 		if isinstance(Telnet_Port, int): self.MY_TELNET_PORT = Telnet_Port
 		if isinstance(Socket_Port, int): self.MY_SOCKET_PORT = Socket_Port
@@ -737,6 +1909,7 @@ class MXA:
 		if isinstance(MXA_Port, int): self.MY_MXA_PORT = MXA_Port
 		if isinstance(Table_Name, str): self.MY_MXA_TABLE_NAME = Table_Name
 		if isinstance(Status, int): self.MY_STATUS = Status
+		if isinstance(Transport, str): self.MY_TRANSPORT = Transport
 		return self.getInfo()
 
 	########### --- End of Setter and Getter --- ############
@@ -745,74 +1918,179 @@ class MXA:
 
 	## \brief Connect to remote MXA box and execute a command
 	#
-	# Remotely connecting to a MXA box using a Telnet connection.
+	# Execute the command on the persistent SCPI session (see Session) of the MXA box
 	# The IP address and Port was loaded by loadConfig/loadSQLite function
 	#
 	# \param command either using the CLI with -e option or input as a parameter
-	# \param delayTime a delay time waiting response from telnet connection, default is 5
+	# \param delayTime the timeout in seconds waiting for the response (or the completion of a setter), default is 5
 	# \return result the return value from command executed remotely
 	##
-	## NOTE: MXA may have experiencing heavy traffic and may need to increse the delay time
+	## NOTE: MXA may have experiencing heavy traffic and may need to increse the timeout
 	def execute(self, command, delayTime = 5, daemon = False):
 		if not daemon: utility.info("##################### " + Fore.YELLOW + "MXA Control" + Style.RESET_ALL + " ######################")
 		try:
-			if not daemon: utility.info('Send command: [' + command + '] to the MXA box at [' + str(self.MY_TCP_IP) + ':' + str(self.MY_TELNET_PORT) + ']')
-			tn = Telnet(self.MY_TCP_IP, int(self.MY_TELNET_PORT))
-			tn.read_until(b'SCPI>')
-			tn.write((command + '\r\n').encode('ascii'))
-			utility.sleep(delayTime, True)
-			result = (utility.regexParser(tn.read_very_eager().decode('ascii'), ' (.*)\r\nSCPI.*', self.MY_DAEMON)).replace('SCPI> ', '').replace(command, '').replace('\r\n', '')
+			session = self.getSession()
+			if not daemon: utility.info('Send command: [' + command + '] to the MXA box at [' + session.ip + ':' + str(session.port) + ']')
+			result = session.execute(command, delayTime)
 			if result:
 				if not daemon: utility.info('Response:\n' + result)
-			else:
-				result = ''
 		except OSError:
-			utility.error('Connection to ' + str(self.MY_TCP_IP) + ':' + str(self.MY_TELNET_PORT) + ' Failed!')
+			utility.error('Connection to ' + session.ip + ':' + str(session.port) + ' Failed!')
 			exit(1)
-		tn.close()
 		return result
 
 
 
+	## \brief Get the shared SCPI session of this MXA, see getSession
+	#
+	# The raw socket transport on MY_SOCKET_PORT is used when a socket port is
+	# configured, unless MY_TRANSPORT is set to 'telnet'
+	##
+	def getSession(self):
+		transport = self.getTransport()
+		if transport == 'socket': return getSession(self.MY_TCP_IP, self.MY_SOCKET_PORT, self.MY_DAEMON, transport)
+		return getSession(self.MY_TCP_IP, self.MY_TELNET_PORT, self.MY_DAEMON, transport)
+
+
+
+	## \brief Get a Batch of this MXA, see Batch
+	#
+	# \param delayTime the timeout in seconds waiting for the response, default is 5
+	# \return the Batch object
+	##
+	def batch(self, delayTime = 5):
+		return Batch(self.getSession(), delayTime)
+
+
+
+	## \brief Configure the MXA measurement in one batch, see configure
+	#
+	# The settings already in place on the MXA are not sent again (see Session.write)
+	#
+	# \return the number of commands sent
+	##
+	def configure(self, mode = None, freq = None, unit = 'MHz', rang = None, atten = None, sType = None, ant = None, cid = None, port = None):
+		commands = configCommands(mode, freq, unit, rang, atten, sType, ant, cid, port)
+		if not self.MY_DAEMON: utility.info('[MXA] Configuring ' + str(commands))
+		return self.getSession().write(commands, MODE_TIMEOUT if mode is not None else 5, self.MY_VERIFY)
+
+
+
+	## \brief Set the MXA mode, see setMode
+	def setMode(self, mode):
+		return self.configure(mode = mode)
+
+	## \brief Set the center frequency, see setFrequency
+	def setFrequency(self, freq, unit = 'MHz'):
+		return self.configure(freq = freq, unit = unit)
+
+	## \brief Set the attenuator range, see setRang
+	def setRang(self, rang):
+		return self.configure(rang = rang)
+
+	## \brief Set the physical attenuator, see setAtten
+	def setAtten(self, atten):
+		return self.configure(atten = atten)
+
+	## \brief Set the decode Sync Type, see setSyncType
+	def setSyncType(self, sType):
+		return self.configure(sType = sType)
+
+	## \brief Set the Number of C-RS Ports, see setNumOfCRSPorts
+	def setNumOfCRSPorts(self, ant):
+		return self.configure(ant = ant)
+
+	## \brief Set the Reference C-RS Port, see setRefCRSPort
+	def setRefCRSPort(self, port):
+		return self.configure(port = port)
+
+	## \brief Set the Cell ID, see setCID
+	def setCID(self, cid):
+		return self.configure(cid = cid)
+
+
+
+	## \brief Recall a pre-registered state, the shadow state is dropped, see recall
+	#
+	# \param reg register number of pre-configured status
+	##
+	def recall(self, reg):
+		if not self.MY_DAEMON: utility.info('[MXA] Recall Registered status [' + str(reg) + ']')
+		self.getSession().execute('*RCL ' + str(reg), MODE_TIMEOUT)
+
+
+
+	## \brief Get a copy of the shadow instrument state, {setter header: last written value}
+	def getState(self):
+		return dict(self.getSession().state)
+
+	## \brief Drop the shadow instrument state, the next setters are all sent
+	def invalidateState(self):
+		self.getSession().invalidate()
+
+
+
+	## \brief Stream the EVM of this MXA, see EVMStream
+	#
+	# \return the EVMStream object
+	##
+	def stream(self, count = None, duration = None, interval = 0, until = None, tolerance = None, minCount = 10, delayTime = 5):
+		return EVMStream(self.getSession(), count, duration, interval, until, tolerance, minCount, delayTime, self.MY_DAEMON)
+
+
+
 	## \brief Reset the attenuation on MXA
 	#
-	# Load MXA list from SQLite database baed on name, reset attenuations
+	# Load MXA routes from the topology view (see topology.py) based on name, reset
+	# attenuations with one batch per JFW box (see resetRoutes)
 	#
 	# \param db_path Using a certain SQLite database path, if set None, default is loading from the this_device_conf.json file
 	##
 	def reset(self, db_path = None):
 		if not self.MY_DAEMON: utility.info("##################### " + Fore.YELLOW + "Reset MXA" + Style.RESET_ALL + " ######################")
-		mxaList = sql.getSQLite('SELECT * FROM rf_matrix_db WHERE output_device = "' + self.MY_NAME + '"', db_path = db_path)
-		for mxa in mxaList:
-			if mxa['jfw_id'] and mxa['jfw_port']:
-				jfw.loadSQLite(str(mxa['jfw_id']), db_path = db_path)
-				jfw.connectJFW('SAR' + str(mxa['jfw_port']) + ' 127', daemon = True)
-				if not self.MY_DAEMON: utility.info("Reseting JFW [" + str(jfw.ID) + "]...")
-			else:
-				rf_matrix_box = sql.getSQLite('SELECT * FROM rf_matrix WHERE id=' + str(mxa['rf_matrix_id']), db_path = db_path)[0]
-				rf_matrix.loadSQLite(str(rf_matrix_box['id']), db_path = db_path)
-				if 'QRB' in rf_matrix_box['name']:
-					if not self.MY_DAEMON: utility.info("Reseting QRB [" + rf_matrix_box['name'] + "]...")
-					rf_matrix.resetQRBAtten(portB = mxa['port'], daemon = True)
-				elif 'RFM' in rf_matrix_box['name']: jfw.connectJFW('SAR' + str(self.MY_JFW_PORT) + ' 127', daemon = True)
+		resetRoutes(topology.getTopology(db_path).routesTo(self.MY_NAME), self.MY_JFW_PORT, db_path, self.MY_DAEMON)
 
 
 
 	## \brief Reading the current MXA LTE report from remote MXA
 	#
-	# Remotely connecting to MXA and send 'CALC:EVM:DATA4:TABL:NAM?' and 'CALC:EVM:DATA4:TABL:STR?' command
-	# retrun the key-value pair based on NAM and STR result
+	# Remotely connecting to MXA and send 'CALC:EVM:DATA4:TABL:STR?' command (and 'CALC:EVM:DATA4:TABL:NAM?'
+	# if the names are not cached, see readTable), retrun the key-value pair based on NAM and STR result
 	#
 	# \return result A dictionary of key-value pairs
 	##
 	def getMXAResult(self):
 		if not self.MY_DAEMON: utility.info("############# " + Fore.YELLOW + "Reading MXA Report" + Style.RESET_ALL + " #############")
-		name = (self.execute('CALC:EVM:DATA4:TABL:NAM?', daemon = True).replace('"', '')).split(',')
-		value = (self.execute('CALC:EVM:DATA4:TABL:STR?', daemon = True).replace('"', '')).split(',')
-		result = {}
-		for i in range(0, len(name)):
-			result[name[i]] = value[i]
-		return result
+		name, value = readTable(self.getSession())
+		return dict(zip(name, value))
+
+
+
+	## \brief Read the EVM results of this MXA, see getEVMResult
+	#
+	# \param counter an iteration counter to read and calculate average result of EVM and RS Pow default is 10
+	# \param asResult return the EVMResult object instead of the dictionary if set True, default is False
+	# \return a dictionary of EVM_AVG and RSPW_AVG values (see EVMResult.getInfo), value is None if not readable
+	##
+	def getEVMResult(self, counter = 10, asResult = False):
+		if not self.MY_DAEMON: utility.info("############# " + Fore.YELLOW + "Reading MXA [" + str(self.MY_NAME) + "] EVM Results" + Style.RESET_ALL + " #############")
+		return readEVMResult(self.getSession(), counter, self.MY_DAEMON, asResult)
+
+
+
+	## \brief Read a spectrum or constellation trace of this MXA, see readTrace
+	#
+	# The trace is transferred in binary when the MXA uses the socket transport
+	#
+	# \param trace the trace number, default is 1
+	# \param command (Optional) the SCPI query of the trace data, default is 'TRAC:DATA? TRACE<trace>'
+	# \param delayTime the timeout in seconds waiting for the response, default is 30
+	# \return the float32 numpy array of the trace, None if the trace could not be read
+	##
+	def getTrace(self, trace = 1, command = None, delayTime = 30):
+		session = self.getSession()
+		if not self.MY_DAEMON: utility.info('[MXA] Reading trace [' + (command or 'TRACE' + str(trace)) + '] from [' + session.ip + ':' + str(session.port) + '] over ' + session.transport)
+		return readTrace(session, trace, command, delayTime)
 
 
 
@@ -844,7 +2122,7 @@ class MXA:
 def main():
 	global MXA_TABLE_NAME
 	parser = argparse.ArgumentParser(description='Tools for controlling JFW box')
-	parser.add_argument('-d', '--delay', nargs='?', const=5, metavar='Seconds', type=int, help='Set the system delay time waiting for JFW box responding, default 5 seconds')
+	parser.add_argument('-d', '--delay', nargs='?', const=5, metavar='Seconds', type=int, help='Set the timeout waiting for the MXA box responding, default 5 seconds')
 	parser.add_argument('-e', '--execute', metavar='Command', nargs='+', help='Execute the remote command on JFW box')
 	parser.add_argument('-s', '--sql', metavar='SQLite File Path', help='Load the SQLite database path instead of configuration json file. Using parameter None or null to use the default database')
 	parser.add_argument('-n', '--name', metavar='SQLite Table Name', help='Define the name of the table to be used when loading the SQLite')
@@ -870,6 +2148,15 @@ def main():
 # \param TCP_IP the ip address of the remote device
 # \param TELNET_PORT the telnet port of the remote device
 # \param SOCKET_PORT the TCP socket port of the remote device
+# \param TRANSPORT the SCPI transport, 'socket', 'telnet' or None to use the socket when SOCKET_PORT is set
+# \param TIMEOUT the seconds to wait when connecting or reading a SCPI session
+# \param RECV_SIZE the number of bytes read from the SCPI socket at a time
+# \param OPC_SYNC send the commands which are not queries with ';*OPC?' and wait for the completion
+# \param MODE_TIMEOUT the timeout in seconds of the recall and mode switching commands
+# \param BATCH_LENGTH the maximum length of a command line sent by a batch
+# \param SHADOW_STATE skip the setters writing the value already set (see Session.write)
+# \param VERIFY_STATE read back the values written by the setters (see Session.write)
+# \param MODE_COMMANDS the command headers (short form) which change the measurement mode or the instrument state, matched with their sub nodes
 # \function loadConfig() load the default configuration from json when loading this module
 ##
 ###################### Load Config File #########################
@@ -883,7 +2170,22 @@ MXA_PORT = 1                                    # Default Value #
 STATUS = 0                                      # Default Value #
 SOCKET_PORT = 5025                              # Default Value #
 MXA_TABLE_NAME = 'mxa'                          # Default Value #
+TRANSPORT = None                                # Default Value #
+TIMEOUT = 10                                    # Default Value #
+RECV_SIZE = 65536                               # Default Value #
+OPC_SYNC = True                                 # Default Value #
+MODE_TIMEOUT = 30                               # Default Value #
+BATCH_LENGTH = 1024                             # Default Value #
+SHADOW_STATE = True                             # Default Value #
+VERIFY_STATE = False                            # Default Value #
 #################################################################
+MODE_COMMANDS = ('INST', '*RCL', '*RST', 'MMEM:LOAD:STAT', 'SYST:PRES')
+__KEYWORD = re.compile(r'([A-Z*]*)(.*)')
+__BOOLEANS = {'ON': '1', 'OFF': '0'}
+__UNITS = {'HZ': 1, 'KHZ': 1e3, 'MHZ': 1e6, 'GHZ': 1e9}
+__sessions = {}
+__sessionsLock = threading.Lock()
+atexit.register(closeSessions)
 
 
 ## \brief Load the default configuration from SAuto framework
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+## \file orchestrator.py
+# \brief Run measurement jobs on several MXA analyzers in parallel
+#
+# This modules drives a list of MXA objects (see mxa.MXA) from a pool of worker
+# threads.   Every MXA object talks to its analyzer through its own shared SCPI
+# session (see mxa.getSession), so the jobs do not use the mxa module globals.
+# A job holds the session lock of its analyzer while it runs: the jobs of
+# different analyzers run concurrently, the jobs of the same analyzer (e.g. two
+# rows of the mxa table with the same ip) run one after the other.   The results
+# are returned as each device completes
+#
+# Example:
+#     devices = orchestrator.loadMXAs(daemon = True)
+#     for device, result, error in orchestrator.Orchestrator().run(devices, 'getEVMResult', 10):
+#         print(device.getName(), result['EVM_AVG'] if error is None else error)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import sql
+import utility
+import mxa
+import asyncio
+import atexit
+import threading
+import concurrent.futures
+
+
+
+## \brief Orchestrator class, a pool of worker threads running jobs on MXA objects
+class Orchestrator:
+    ## \brief Start the worker pool
+    #
+    # \param workers the number of worker threads, default is WORKERS
+    # \param daemon print out the info message if set False, the default is True
+    ##
+    def __init__(self, workers = None, daemon = True):
+        self.daemon = daemon
+        self.__pool = concurrent.futures.ThreadPoolExecutor(max_workers = workers or WORKERS, thread_name_prefix = 'mxa-job')
+
+
+
+    ## \brief Submit a job for every device
+    #
+    # \param devices the list of MXA objects
+    # \param job the name of a MXA method (e.g. 'getEVMResult'), or a function called as job(device, *args, **kwargs)
+    # \param args, kwargs the arguments of the job
+    # \return dictionary of concurrent.futures.Future to the device
+    ##
+    def submit(self, devices, job, *args, **kwargs):
+        futures = {}
+        for device in devices:
+            futures[self.__pool.submit(self.__run, device, job, args, kwargs)] = device
+        return futures
+
+
+
+    ## \brief Run a job on one device, holding the session lock of its analyzer
+    ##
+    def __run(self, device, job, args, kwargs):
+        session = device.getSession()
+        with session.lock:
+            if not self.daemon: utility.info('[Orchestrator] Running [' + (job if isinstance(job, str) else job.__name__) + '] on MXA [' + str(device.getName()) + '] at [' + session.ip + ':' + str(session.port) + ']')
+            if isinstance(job, str): return getattr(device, job)(*args, **kwargs)
+            return job(device, *args, **kwargs)
+
+
+
+    ## \brief Run a job on every device and yield the results as each device completes
+    #
+    # A failing job does not stop the others, its exception is yielded as error
+    #
+    # \param devices the list of MXA objects
+    # \param job the name of a MXA method (e.g. 'getEVMResult'), or a function called as job(device, *args, **kwargs)
+    # \param args, kwargs the arguments of the job
+    # \return generator of (device, result, error), error is None if the job succeeded
+    ##
+    def run(self, devices, job, *args, **kwargs):
+        futures = self.submit(devices, job, *args, **kwargs)
+        for future in concurrent.futures.as_completed(futures):
+            yield self.__result(futures[future], future)
+
+
+
+    ## \brief asyncio version of run, an async generator to use with 'async for' inside a running event loop
+    #
+    # \return async generator of (device, result, error), error is None if the job succeeded
+    ##
+    async def arun(self, devices, job, *args, **kwargs):
+        futures = self.submit(devices, job, *args, **kwargs)
+        async def wait(future):
+            await asyncio.wait([asyncio.wrap_future(future)])
+            return future
+        for waiter in asyncio.as_completed([wait(future) for future in futures]):
+            future = await waiter
+            yield self.__result(futures[future], future)
+
+
+
+    ## \brief Get the (device, result, error) tuple of a done future
+    ##
+    def __result(self, device, future):
+        error = future.exception()
+        if error is not None:
+            utility.error('[Orchestrator] Job on MXA [' + str(device.getName()) + '] at [' + str(device.getIP()) + '] failed: ' + str(error), False)
+            return device, None, error
+        return device, future.result(), None
+
+
+
+    ## \brief Stop the worker pool
+    #
+    # \param wait block until the running jobs are done, default is True
+    ##
+    def close(self, wait = True):
+        self.__pool.shutdown(wait = wait)
+
+
+
+## \brief Create the MXA objects of the rows of the mxa table
+#
+# \param ids (Optional) the list of the MXA ids, default is all the rows
+# \param table_name (Optional) the MXA table name, default is mxa.MXA_TABLE_NAME
+# \param db_path (Optional) the SQLite database path
+# \param daemon the daemon flag of the MXA objects, the default is True
+# \return list of MXA objects, ordered by id
+##
+def loadMXAs(ids = None, table_name = None, db_path = None, daemon = True):
+    table_name = table_name or mxa.MXA_TABLE_NAME
+    rows = sql.query('SELECT * FROM ' + table_name + ' ORDER BY id', (), db_path)
+    if ids is not None:
+        ids = set(int(i) for i in ids)
+        rows = [row for row in rows if row['id'] in ids]
+    return [mxa.MXA(config = dict(row), daemon = daemon) for row in rows]
+
+
+
+## \brief Run a job on every device with the shared orchestrator, see Orchestrator.run
+#
+# \return generator of (device, result, error), error is None if the job succeeded
+##
+def runAll(devices, job, *args, **kwargs):
+    return getOrchestrator().run(devices, job, *args, **kwargs)
+
+
+
+## \brief Get the shared Orchestrator, created on the first call
+##
+def getOrchestrator():
+    global __orchestrator
+    with __orchestratorLock:
+        if __orchestrator is None: __orchestrator = Orchestrator()
+        return __orchestrator
+
+
+
+## \brief Stop the shared Orchestrator, registered with atexit
+##
+def closeAll(wait = True):
+    global __orchestrator
+    with __orchestratorLock:
+        instance = __orchestrator
+        __orchestrator = None
+    if instance is not None: instance.close(wait)
+
+
+
+## \brief Global shared variables
+#
+# \param WORKERS the default number of worker threads, jobs beyond it wait for a free worker
+##
+########################### Load Config File ############################
+WORKERS = 8                           # Default Value #
+#########################################################################
+__orchestrator = None
+__orchestratorLock = threading.Lock()
+atexit.register(closeAll)
@@ -18,6 +18,9 @@ import argparse
 import utility
 import sql
 import sys
+import threading
+import atexit
+import time
 import pexpect
 from colorama import Fore
 from colorama import Style
@@ -173,15 +176,15 @@ def loadConfig(confPath = 'this_device.conf.json'):
 ##
 def loadSQLite(rid, table_name = None, db_path = None):
 	global ID, NAME, TCP_IP, TCP_PORT, BUFFER_SIZE, STATUS
-	if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(rid), db_path)
-	else: config = sql.getSQLite('SELECT * FROM ' + RF_MATRIX_TABLE_NAME + ' WHERE id=' + str(rid), db_path)
+	if table_name: config = sql.getDeviceConfig(str(table_name), rid, db_path)
+	else: config = sql.getDeviceConfig(RF_MATRIX_TABLE_NAME, rid, db_path)
 	if config:
-		if config[0]['id'] is not None: ID = config[0]['id']
-		if config[0]['name'] is not None: NAME = config[0]['name']
-		if config[0]['ip'] is not None: TCP_IP = config[0]['ip']
-		if config[0]['port'] is not None: TCP_PORT = config[0]['port']
-		if config[0]['status'] is not None: STATUS = config[0]['status']
-		return config[0]
+		if config['id'] is not None: ID = config['id']
+		if config['name'] is not None: NAME = config['name']
+		if config['ip'] is not None: TCP_IP = config['ip']
+		if config['port'] is not None: TCP_PORT = config['port']
+		if config['status'] is not None: STATUS = config['status']
+		return config
 	return {"error": "Loading table [" + RF_MATRIX_TABLE_NAME + "] with ID [" + str(rid) + "] Failed"}
 
 
@@ -267,11 +270,190 @@ def connectRFMatrix(command, portA = "", portB = "", daemon = False, atten = 15)
 
 
 
+## \brief Persistent SSH session to a QRB server in qrb_command_mode
+#
+# The ssh process is spawned with pexpect by the first command, logged in and
+# left in qrb_command_mode between the commands.   A keepalive (an empty line,
+# plus the ssh ServerAliveInterval) is sent every KEEPALIVE seconds while the
+# session is idle.   If the session is lost, it is re-opened and the remaining
+# commands are sent again once
+##
+class QRBSession:
+	## \brief QRBSession constructor, the session is opened by the first command
+	#
+	# \param host String of the IP address of the remote QRB server
+	# \param username String of the SSH login username of the remote QRB server
+	# \param password String of the SSH login password of the remote QRB server
+	# \param daemon Boolean. Print out the info message if set False, default is True
+	##
+	def __init__(self, host, username = "prime", password = "prime123", daemon = True):
+		self.host = str(host)
+		self.username = username
+		self.password = password
+		self.daemon = daemon
+		self.lock = threading.RLock()
+		self.__client = None
+		self.__last = 0
+		self.__keeper = None
+		self.__stopped = threading.Event()
+
+
+
+	## \brief Spawn ssh, log in and enter qrb_command_mode
+	##
+	def connect(self):
+		with self.lock:
+			self.close()
+			if not self.daemon: utility.info("...SSH Connect to " + self.host)
+			options = '-o StrictHostKeyChecking=no'
+			if KEEPALIVE: options += ' -o ServerAliveInterval=' + str(KEEPALIVE) + ' -o ServerAliveCountMax=3'
+			client = pexpect.spawn('ssh ' + options + ' ' + self.username + '@' + self.host)
+			client.delaybeforesend = None ## the prompt is awaited after every line, no need for the 50 ms send delay
+			try:
+				client.expect("Password: ", timeout = LOGIN_TIMEOUT)
+				client.sendline(self.password)
+				client.expect(self.username + ":.*", timeout = LOGIN_TIMEOUT)
+				client.sendline("qrb_command_mode")
+				client.expect("#", timeout = LOGIN_TIMEOUT)
+			except (pexpect.EOF, pexpect.TIMEOUT):
+				client.close(force = True)
+				raise
+			if not self.daemon:
+				if "Entered Into QRB Command Mode" in client.before.decode('utf-8'):
+					utility.info("Entered Into QRB Command Mode")
+			self.__client = client
+			self.__last = time.time()
+			if KEEPALIVE and (self.__keeper is None or not self.__keeper.is_alive()):
+				self.__keeper = threading.Thread(target = self.__keepAlive, name = 'qrb-keepalive-' + self.host)
+				self.__keeper.daemon = True
+				self.__keeper.start()
+
+
+
+	## \brief Exit the QRB CLI and the ssh session
+	##
+	def close(self):
+		with self.lock:
+			client = self.__client
+			self.__client = None
+			if client is None: return
+			try:
+				if client.isalive():
+					client.sendline("exit")
+					client.sendline("exit")
+					client.expect(pexpect.EOF, timeout = 1)
+			except (pexpect.EOF, pexpect.TIMEOUT, OSError):
+				pass
+			client.close(force = True)
+
+
+
+	## \brief Close the session and stop the keepalive thread
+	##
+	def stop(self):
+		self.__stopped.set()
+		self.close()
+
+
+
+	## \brief Check if the ssh session is open
+	##
+	def isConnected(self):
+		return self.__client is not None and self.__client.isalive()
+
+
+
+	## \brief Execute the commands in qrb_command_mode
+	#
+	# \param commands A list of the string command to be executed on qrb_command_mode
+	# \param daemon Boolean. Print out the info message if set False, default is False
+	# \return True if execution all pass, otherwise False
+	##
+	def execute(self, commands, daemon = False):
+		result = True
+		done = 0
+		with self.lock:
+			for attempt in range(2):
+				try:
+					if not self.isConnected(): self.connect()
+					while done < len(commands):
+						command = commands[done]
+						self.__client.sendline(command)
+						self.__client.expect("#", timeout = COMMAND_TIMEOUT)
+						done += 1
+						self.__last = time.time()
+						if "S\r" in self.__client.before.decode('utf-8'):
+							if not daemon: utility.info('Command [' + command + '] execution successful on host [' + self.host + ']')
+						else:
+							if not daemon: utility.warn('Command [' + command + '] execution FAIL on host [' + self.host + ']', track = False)
+							result = False
+					return result
+				except (pexpect.EOF, pexpect.TIMEOUT, OSError) as e:
+					self.close()
+					if attempt:
+						utility.error('QRB session to [' + self.host + '] failed: ' + str(e).split('\n')[0], False)
+						return False
+					utility.warn('QRB session to [' + self.host + '] lost, reconnecting', False)
+
+
+
+	## \brief The keepalive thread, send an empty line when the session is idle
+	##
+	def __keepAlive(self):
+		while not self.__stopped.wait(KEEPALIVE):
+			if not self.lock.acquire(False): continue ## a command is running
+			try:
+				if self.__client is None or time.time() - self.__last < KEEPALIVE: continue
+				try:
+					self.__client.sendline("")
+					self.__client.expect("#", timeout = COMMAND_TIMEOUT)
+					self.__last = time.time()
+				except (pexpect.EOF, pexpect.TIMEOUT, OSError):
+					utility.warn('QRB session to [' + self.host + '] keepalive failed, it is re-opened by the next command', False)
+					self.close()
+			finally:
+				self.lock.release()
+
+
+
+## \brief Get the shared QRB session of a host
+#
+# One session is kept per (host, username), shared by connectRFMatrix, connectSSH and resetQRBAtten
+#
+# \param host String of the IP address of the remote QRB server
+# \param username String of the SSH login username of the remote QRB server, default is prime
+# \param password String of the SSH login password of the remote QRB server, default is prime123
+# \param daemon Boolean. Print out the info message if set False, default is True
+# \return the QRBSession object
+##
+def getQRBSession(host, username = "prime", password = "prime123", daemon = True):
+	key = (str(host), username)
+	with __sessionsLock:
+		session = __sessions.get(key)
+		if session is None or session.password != password:
+			if session is not None: session.stop()
+			session = QRBSession(host, username, password, daemon)
+			__sessions[key] = session
+	return session
+
+
+
+## \brief Close all the QRB sessions, registered with atexit
+##
+def closeQRBSessions():
+	with __sessionsLock:
+		sessions = list(__sessions.values())
+		__sessions.clear()
+	for session in sessions:
+		session.stop()
+
+
+
 ## \brief Connect to remote QRB server using interact ssh
 #
-# Using pexpect package to start an expect like ssh connection with remote QRB server
-# Logging into QRB and enter qrb_command_mode
-# Execute each command in commands list and then exit QRB CLI
+# Execute each command in commands list in qrb_command_mode on the persistent
+# ssh session of the QRB server (see QRBSession), the session is opened by the
+# first call and reused by the next ones
 #
 # \param commands A list of the string command to be executed on qrb_command_mode
 # \param host String of the IP address of the remote QRB server, default is 10.155.208.121
@@ -281,30 +463,7 @@ def connectRFMatrix(command, portA = "", portB = "", daemon = False, atten = 15)
 # \return True if execution all pass, otherwise False
 ##
 def connectSSH(commands, host = "10.155.208.121", username = "prime", password = "prime123", daemon = False):
-	result = True
-	if not daemon: utility.info("...SSH Connect to " + host)
-	sshClient = pexpect.spawn('ssh -o StrictHostKeyChecking=no ' + username + '@' + host)
-	sshClient.expect("Password: ", timeout = 20)
-	sshClient.sendline(password)
-	sshClient.expect(username + ":.*")
-	sshClient.sendline("qrb_command_mode")
-	sshClient.expect("#")
-	if not daemon:
-		if "Entered Into QRB Command Mode" in sshClient.before.decode('utf-8'):
-			utility.info("Entered Into QRB Command Mode")
-	for command in commands:
-		sshClient.sendline(command)
-		sshClient.expect("#")
-		if not daemon:
-			if "S\r" in sshClient.before.decode('utf-8'):
-				utility.info('Command [' + command + '] execution successful on host [' + host + ']')
-			else:
-				utility.warn('Command [' + command + '] execution FAIL on host [' + host + ']', track = False)
-				result = False
-	sshClient.sendline("exit")
-	utility.sleep(1, daemon = True)
-	sshClient.sendline("exit")
-	return result
+	return getQRBSession(host, username, password, daemon).execute(commands, daemon)
 
 
 
@@ -349,7 +508,7 @@ def resetQRBAtten(portA = None, portB = None, username = "prime", password = "pr
 	elif (not portA) and portB:
 		for i in range (1,33):
 			command.append('SA' + getQRBPort(i) + 'B' + getQRBPort(portB) + '999.9')
-	connectSSH(command, username = username, password = password, daemon = daemon)
+	connectSSH(command, host = TCP_IP, username = username, password = password, daemon = daemon)
 
 
 
@@ -476,12 +635,11 @@ class RFMatrix:
 	# \return True if no error found, else False
 	##
 	def loadSQLite(self, rid, table_name = None, db_path = None):
-		try:
-			if table_name: config = sql.getSQLite('SELECT * FROM ' + str(table_name) + ' WHERE id=' + str(rid), db_path)[0]
-			else: config = sql.getSQLite('SELECT * FROM ' + self.MY_RF_MATRIX_TABLE_NAME + ' WHERE id=' + str(rid), db_path)[0]
-		except Exception as e:
-			utility.warn("RF Matirx loadSQLite failed: " + str(e), track = False)
-			config = {"error" : str(e)}
+		if table_name: config = sql.getDeviceConfig(str(table_name), rid, db_path)
+		else: config = sql.getDeviceConfig(self.MY_RF_MATRIX_TABLE_NAME, rid, db_path)
+		if not config:
+			utility.warn("RF Matirx loadSQLite failed: ID [" + str(rid) + "] not found", track = False)
+			config = {"error" : "ID [" + str(rid) + "] not found"}
 		return self.__loadConfig(json = config)
 
 
@@ -543,6 +701,9 @@ def main():
 # \param TCP_IP the ip address of the remote device
 # \param TCP_PORT the port of the remote device
 # \param BUFFER_SIZE a default buffer size when read result from remote device
+# \param KEEPALIVE the seconds of idle time between two keepalives of a QRB session, 0 to disable
+# \param LOGIN_TIMEOUT the seconds to wait for each step of the QRB login
+# \param COMMAND_TIMEOUT the seconds to wait for the prompt after a QRB command
 # \function loadConfig() load the default configuration when loading this module
 ##
 ###################### Load Config File #########################
@@ -553,7 +714,13 @@ TCP_PORT = 9100									# Default Value #
 BUFFER_SIZE = 1024								# Default Value #
 STATUS = 0										# Default Value #
 RF_MATRIX_TABLE_NAME = "rf_matrix"				# Default Value #
+KEEPALIVE = 30									# Default Value #
+LOGIN_TIMEOUT = 20								# Default Value #
+COMMAND_TIMEOUT = 30							# Default Value #
 #################################################################
+__sessions = {}
+__sessionsLock = threading.Lock()
+atexit.register(closeQRBSessions)
 
 
 ## \brief Load the default configuration from SAuto framework
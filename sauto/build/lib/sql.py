@@ -13,11 +13,15 @@
 ##
 
 import utility
+import sql_migration
 import sqlite3
-import json
 import argparse
 import sys
-from colorama import Fore,Style
+import threading
+import atexit
+import itertools
+import collections
+import time
 
 ## \brief Load the device configuration from the given config file path
 #
@@ -41,15 +45,17 @@ def loadConfig(confPath = 'this_device_conf.json'):
 #
 # __init is Calling internally to initilize a connection object to the sqlite
 # database.    If the database path is None, it will use the default path
+# When pooling is enabled (default), the long-lived connection of the current
+# thread is returned instead of opening a new one
 #
 # \param da_path string path to  the sqlite database file
 # \param daemon print out the info message if set False, the default is False
-# \return calling connectSQLite function and return the connction object
+# \return the pooled connection, or calling connectSQLite function and return the connction object
 ##
 def __init(db_path = None, daemon = False):
     global sqlite_file
-    if db_path is None:
-        return connectSQLite(sqlite_file, daemon)
+    if db_path is None: db_path = sqlite_file
+    if POOL_ENABLED: return getConnection(db_path, daemon)
     return connectSQLite(db_path, daemon)
 
 
@@ -78,6 +84,130 @@ def connectSQLite(db_path, daemon = False):
 
 
 
+## \brief Get the pooled connection of the current thread for the given database
+#
+# Every thread keeps one long-lived connection per database path.   The connection
+# is opened on first use in WAL journal mode with a busy timeout, so readers do not
+# block the writer, and with a statement cache of STATEMENT_CACHE_SIZE, so the
+# parameterized queries (see query) are only parsed once.   It is reused by all
+# the sql.* helpers until closeSQLite or closePool is called.   Connections left behind by finished threads are closed
+# whenever a new pooled connection is opened
+#
+# \param db_path string value contains the path of the SQLite database, default is sqlite_file
+# \param daemon print out the info message if set False, the default is False
+# \return conn the pooled connection object from sqlite3 module
+##
+def getConnection(db_path = None, daemon = False):
+    global sqlite_file
+    if db_path is None: db_path = sqlite_file
+    key = (threading.get_ident(), db_path)
+    conn = __pool.get(key)
+    if conn is None:
+        __prunePool(daemon)
+        try:
+            if not daemon: utility.info("Opening pooled connection to DB: " + db_path)
+            conn = sqlite3.connect(db_path, timeout = BUSY_TIMEOUT, check_same_thread = False, cached_statements = STATEMENT_CACHE_SIZE)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=' + str(int(BUSY_TIMEOUT * 1000)))
+        except sqlite3.Error as e:
+            utility.error(str(e) + "\n    Connection to " + db_path + " failed")
+            exit(1)
+        with __poolLock:
+            __pool[key] = conn
+            __pooledIds.add(id(conn))
+    return conn
+
+
+
+## \brief Check if the connection object is owned by the connection pool
+#
+# The ids of the pooled connections are kept in a set, the check does not scan the pool
+#
+# \param conn the connection object from sqlite3 module
+# \return True if conn is a pooled connection, otherwise False
+##
+def isPooled(conn):
+    return id(conn) in __pooledIds
+
+
+
+## \brief Close the pooled connections of threads which are no longer alive
+#
+# \param daemon print out the info message if set False, the default is False
+##
+def __prunePool(daemon = False):
+    alive = set(thread.ident for thread in threading.enumerate())
+    with __poolLock:
+        dead = [key for key in __pool if key[0] not in alive]
+        conns = [__pool.pop(key) for key in dead]
+        __pooledIds.difference_update(id(conn) for conn in conns)
+    with __cacheLock:
+        for key in dead:
+            __versions.pop(key, None)
+    for conn in conns:
+        conn.close()
+    if conns and not daemon: utility.info("Closed " + str(len(conns)) + " pooled connection(s) of finished threads")
+
+
+
+## \brief Close the pooled connection of the current thread
+#
+# The next sql.* call from this thread will open a new pooled connection
+#
+# \param db_path string value contains the path of the SQLite database, default is sqlite_file
+# \param daemon print out the info message if set False, the default is False
+##
+def closeSQLite(db_path = None, daemon = False):
+    global sqlite_file
+    if db_path is None: db_path = sqlite_file
+    with __poolLock:
+        conn = __pool.pop((threading.get_ident(), db_path), None)
+        __pooledIds.discard(id(conn))
+    with __cacheLock:
+        __versions.pop((threading.get_ident(), db_path), None)
+    if conn is not None:
+        if not daemon: utility.info("Closing pooled connection to DB: " + db_path)
+        conn.close()
+
+
+
+## \brief Close all the pooled connections of all threads
+#
+# closePool is registered with atexit, it can also be called explictly, for example
+# before replacing or moving the database file
+#
+# \param daemon print out the info message if set False, the default is False
+##
+def closePool(daemon = False):
+    with __poolLock:
+        conns = list(__pool.values())
+        __pool.clear()
+        __pooledIds.clear()
+    with __cacheLock:
+        __versions.clear()
+    for conn in conns:
+        conn.close()
+    if not daemon: utility.info("Closed " + str(len(conns)) + " pooled connection(s)")
+
+
+
+## \brief Enable or disable the connection pool
+#
+# With pooling disabled, every sql.* call opens and closes its own connection
+# NOTE: disabling the pool does not close the connections already pooled, call closePool
+#
+# \param enabled set True to use the pooled connections, False to connect per query
+# \param daemon print out the info message if set False, the default is False
+##
+def setPooling(enabled, daemon = False):
+    global POOL_ENABLED
+    if isinstance(enabled, bool):
+        if not daemon: utility.info('Setting SQLite connection pooling to [' + str(enabled) + ']')
+        POOL_ENABLED = enabled
+
+
+
 ## \brief set the global variable sqlite_file value
 #
 # Set the default global variable sqlite_file with the given database path value (db_path)
@@ -93,63 +223,218 @@ def setDBPath(db_path, daemon = False):
 
 
 
+## \brief Set the logger used by the sql.* query helpers
+#
+# The logger is any object with a log(level, message, *args) method, for example
+# a logging.Logger (the levels DEBUG, INFO, WARN, ERROR are the logging levels).
+# The message is a %-format string, it is only formatted by the logger when the
+# record is emitted.   The default UtilityLogger prints with the utility module
+# Example: setLogger(logging.getLogger('sql'), DEBUG) or setLogger(None) to disable
+#
+# \param logger the logger object, None to disable the logging (even the errors)
+# \param level (Optional) the minimum level logged, default is unchanged
+##
+def setLogger(logger, level = None):
+    global __logger, LOG_LEVEL
+    __logger = logger
+    if level is not None: LOG_LEVEL = level
+
+
+
+## \brief Default logger of sql.py, print the records with the utility module
+class UtilityLogger:
+    ## \brief Format the message with args and print it with the utility function of the level
+    #
+    # \param level the level of the record, DEBUG, INFO, WARN or ERROR
+    # \param message the %-format string of the record
+    # \param args the values formatted into the message
+    ##
+    def log(self, level, message, *args):
+        if args: message = message % args
+        if level >= ERROR: utility.error(message)
+        elif level >= WARN: utility.warn(message, False)
+        elif level >= INFO: utility.info(message)
+        else: utility.info('[DEBUG] ' + message)
+
+
+
 ## \brief Execute the database query and return the result in JSON
 #
 # Execute the given SQLite query and return the result in JSON format
 # If the connection is not provided, load the default database by calling __init()
+# A pooled connection is kept open after the query, any other connection is closed
+# The rows are built directly by the cursor row_factory, see rowFactory for the
+# row types.   The query is logged at INFO and every row at DEBUG through the
+# logger set with setLogger, nothing is formatted when daemon is True or the
+# level is disabled
 #
-# \param command the SQLite query string to be executed
+# \param command the SQLite query string to be executed, may contain '?' placeholders
 # \param conn the connection object from sqlite3 module which connecting to a database
 # \param daemon print out the info message if set False, the default is False
-# \return calling buildJson to return the JSON result, or None if error
+# \param params the values bound to the '?' placeholders of the command, default is ()
+# \param rowType the type of the returned rows, ROW_JSON (default), ROW_SQLITE or ROW_TUPLE
+# \return the list of rows, or None if error or no row found
 ##
-def executeSQLite(command, conn = None, daemon = False):
-    if not daemon: utility.info("############### " + Fore.YELLOW + "Connecting and Executing SQLite Query" + Style.RESET_ALL+ " ###############")
+def executeSQLite(command, conn = None, daemon = False, params = (), rowType = None):
+    log = not daemon and __logger is not None
     if conn is None: conn = __init(None, daemon)
     try:
         c = conn.cursor()
-        if not daemon: utility.info("Executing query: " + command)
-        result = c.execute(command).fetchall()
-        if not daemon:
-            for row in result:
-                i = 0
-                utility.info("======= Entry " + str(i+1) + " =======")
-                for name in names:
-                    utility.info(name + ': ' + str(row[i]))
-                    i += 1
-
+        if log and LOG_LEVEL <= INFO: __logger.log(INFO, 'Executing query: %s %s', command, params)
+        c.execute(command, params)
+        if c.description is not None: c.row_factory = rowFactory(c.description, rowType)
+        result = c.fetchall()
+        if log and LOG_LEVEL <= DEBUG:
+            for index, row in enumerate(result):
+                __logger.log(DEBUG, '======= Entry %d ======= %s', index + 1, row)
         conn.commit()
-        conn.close()
+        if not isPooled(conn): conn.close()
     except sqlite3.Error as e:
-        utility.error(str(e) + "\n    Query " + command + " executeion failed")
+        if __logger is not None: __logger.log(ERROR, '%s\n    Query %s executeion failed', e, command)
+        if isPooled(conn): conn.rollback()
         return None
     if not result:
         return None
-    else:
-        names = list(map(lambda x:x[0], c.description))
-        return buildJson(names, result)
+    return result
+
+
+
+## \brief Get the cursor row_factory building the rows of the given row type
+#
+# ROW_JSON - a dictionary of {column: value} per row, the default
+# ROW_SQLITE - sqlite3.Row, a C implemented row indexed by column name or position
+# ROW_TUPLE - a namedtuple (no per row __dict__) of the columns, the class is built once per column set
+#
+# \param description The cursor description of the executed query
+# \param rowType The type of the rows, default is ROW_JSON
+# \return the row_factory function for sqlite3 cursor
+##
+def rowFactory(description, rowType = None):
+    if rowType == ROW_SQLITE: return sqlite3.Row
+    names = tuple(column[0] for column in description)
+    if rowType == ROW_TUPLE:
+        make = rowClass(names)._make
+        return lambda cursor, row: make(row)
+    return lambda cursor, row: dict(zip(names, row))
+
+
+
+## \brief Get the namedtuple class for the given column names
+#
+# The classes are cached, so every query on the same table (same columns) shares one class
+# Column names which are not valid identifiers are renamed to _<position>
+#
+# \param names The tuple of the column names
+# \return the namedtuple class
+##
+def rowClass(names):
+    cls = __rowClasses.get(names)
+    if cls is None:
+        cls = collections.namedtuple('Row', names, rename = True)
+        __rowClasses[names] = cls
+    return cls
+
+
+
+## \brief Execute the query and stream the rows one by one
+#
+# Rows are fetched from the cursor in chunks of size rows instead of loading the
+# whole result set, useful to walk large tables with constant memory
+#
+# Example: for row in iterSQLite('SELECT * FROM rf_matrix_db', rowType = ROW_TUPLE): ...
+#
+# \param command The SQLite query, may contain '?' placeholders
+# \param params The values bound to the placeholders, default is ()
+# \param db_path (Optional) the SQLite database path
+# \param rowType The type of the rows, see rowFactory, default is ROW_JSON
+# \param size The number of rows fetched from the cursor at a time, default is ITER_SIZE
+# \param daemon print out the info message if set False, the default is True
+# \return a generator of the rows
+##
+def iterSQLite(command, params = (), db_path = None, rowType = None, size = None, daemon = True):
+    conn = __init(db_path, daemon)
+    c = conn.cursor()
+    try:
+        if not daemon and __logger is not None and LOG_LEVEL <= INFO: __logger.log(INFO, 'Streaming query: %s %s', command, params)
+        c.execute(command, params)
+        if c.description is None: return
+        c.row_factory = rowFactory(c.description, rowType)
+        while True:
+            rows = c.fetchmany(size or ITER_SIZE)
+            if not rows: break
+            for row in rows:
+                yield row
+    except sqlite3.Error as e:
+        if __logger is not None: __logger.log(ERROR, '%s\n    Query %s executeion failed', e, command)
+    finally:
+        c.close()
+        if not isPooled(conn): conn.close()
+
+
+
+## \brief Execute a parameterized query and return the rows in JSON
+#
+# The SQL text stays constant and the values are bound to the '?' placeholders,
+# so the statement is parsed once and then served from the statement cache of the
+# pooled connection no matter how often it is executed with different values
+#
+# Example: query('SELECT * FROM mxa WHERE id=?', (1,))
+#
+# \param command The SQLite query with '?' placeholders
+# \param params The sequence of values bound to the placeholders, default is ()
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is True
+# \param rowType the type of the returned rows, see rowFactory, default is ROW_JSON
+# \return list of rows, empty list if no row is found or the query failed
+##
+def query(command, params = (), db_path = None, daemon = True, rowType = None):
+    return executeSQLite(command, __init(db_path, daemon), daemon, params, rowType) or []
+
+
+
+## \brief Execute a parameterized statement once for every row of values
+#
+# All rows are executed with sqlite3 executemany inside a single transaction,
+# the transaction is rolled back if any of the rows fails
+#
+# Example: executeMany('UPDATE vendor SET status=? WHERE id=?', [('Done', 1), ('Done', 2)])
+#
+# \param command The SQLite statement with '?' (or ':name') placeholders
+# \param rows An iterable of value sequences (or dictionaries for ':name' placeholders)
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is False
+# \param table (Optional) the table written by the statement, only its cached rows are dropped, default is all tables
+# \return the number of rows affected, or None if error
+##
+def executeMany(command, rows, db_path = None, daemon = False, table = None):
+    conn = __init(db_path, daemon)
+    try:
+        if not daemon and __logger is not None and LOG_LEVEL <= INFO: __logger.log(INFO, 'Executing query for many rows: %s', command)
+        c = conn.cursor()
+        c.executemany(command, rows)
+        conn.commit()
+        if not isPooled(conn): conn.close()
+    except sqlite3.Error as e:
+        if __logger is not None: __logger.log(ERROR, '%s\n    Query %s executeion failed', e, command)
+        conn.rollback()
+        if not isPooled(conn): conn.close()
+        return None
+    invalidateCache(table)
+    return c.rowcount
 
 
 
 ## \brief Build and return the JSON object with given keys and values
 #
-# Read the SQLite query result from executeSQLite command, read the result
-# build the json object based on column name and rows
+# Build the list of {column: value} dictionaries from the column names and rows
+# NOTE: executeSQLite builds the rows with rowFactory, this is kept for rows fetched elsewhere
 #
 # \param name The name list of each column
 # \param results each result is a row in the SQLite query response
 # \return the JSON object of the SQLite query result
 ##
 def buildJson(names, results):
-    result = []
-    for row in results:
-        dic = {}
-        column = 0
-        for name in names:
-            dic[name] = row[column]
-            column += 1
-        result.append(dic)
-    return json.loads(json.dumps(result))
+    return [dict(zip(names, row)) for row in results]
 
 
 
@@ -160,42 +445,185 @@ def buildJson(names, results):
 #
 # \param command The command will be execute as SQLite query. Example: SELECT * FROM vendor
 # \param db_path The database path for SQLite
+# \param rowType the type of the returned rows, see rowFactory, default is ROW_JSON
 # \return JSON result from execute SQLite query command
 ##
-def getSQLite(command, db_path = None, daemon = True):
-    return executeSQLite(command, __init(db_path, daemon), daemon)
+def getSQLite(command, db_path = None, daemon = True, rowType = None):
+    return executeSQLite(command, __init(db_path, daemon), daemon, rowType = rowType)
            
 
 
+## \brief Get a device configuration row by id through the in-process cache
+#
+# The device tables (jfw, mxa, rf_matrix, ...) rarely change during a run, so the
+# rows are kept in a TTL + LRU cache keyed by (table, id, db_path).   An entry is
+# dropped when it is older than CACHE_TTL seconds, when updateSQLite/insertSQLite/
+# deleteSQLite (or the batch helpers) write its table, or when the database is
+# written by another process (see checkExternalChange), the writes of this process
+# only drop the rows of the written table.   The least recently used entry is
+# evicted above CACHE_SIZE entries
+#
+# \param table The device table name
+# \param device_id The id of the row in the table
+# \param db_path (Optional) the SQLite database path
+# \return a copy of the row dictionary, or None if the id is not found
+##
+def getDeviceConfig(table, device_id, db_path = None):
+    global sqlite_file, cacheHits, cacheMisses, cacheEvictions
+    if db_path is None: db_path = sqlite_file
+    if not CACHE_ENABLED:
+        rows = query('SELECT * FROM ' + table + ' WHERE id=?', (device_id,), db_path)
+        return rows[0] if rows else None
+    key = (table, str(device_id), db_path)
+    checkExternalChange(db_path)
+    with __cacheLock:
+        entry = __cache.get(key)
+        if entry is not None and entry[1] > time.time():
+            __cache.move_to_end(key)
+            cacheHits += 1
+            return dict(entry[0])
+        cacheMisses += 1
+    rows = query('SELECT * FROM ' + table + ' WHERE id=?', (device_id,), db_path)
+    if not rows: return None
+    with __cacheLock:
+        __cache[key] = (rows[0], time.time() + CACHE_TTL)
+        __cache.move_to_end(key)
+        while len(__cache) > CACHE_SIZE:
+            __cache.popitem(last = False)
+            cacheEvictions += 1
+    return dict(rows[0])
+
+
+
+## \brief Drop the cached rows of the database if it was written by another process
+#
+# PRAGMA data_version of the pooled connection of the current thread changes when
+# the database is committed by any other connection.   The writes of this process
+# go through invalidateCache, which counts them, so a data_version change without
+# any write counted since the last check comes from another process (or a
+# connection outside sql.py): all the cached rows of the database are dropped and
+# the listeners are called with (None, db_path).   An external write landing
+# together with a write of this process is only seen after CACHE_TTL
+# The check runs at most once every interval seconds per thread and database, and
+# not at all when pooling is disabled (a new connection has no previous
+# data_version to compare), the cached rows then expire after CACHE_TTL
+#
+# \param db_path (Optional) the SQLite database path, default is sqlite_file
+# \param interval (Optional) the seconds since the last check before checking again, default is CHECK_INTERVAL
+# \return True if an external change was found, otherwise False
+##
+def checkExternalChange(db_path = None, interval = None):
+    global sqlite_file
+    if db_path is None: db_path = sqlite_file
+    if not POOL_ENABLED: return False
+    if interval is None: interval = CHECK_INTERVAL
+    key = (threading.get_ident(), db_path)
+    now = time.time()
+    with __cacheLock:
+        last = __versions.get(key)
+    if last is not None and now - last[2] < interval: return False
+    try:
+        version = getConnection(db_path, True).execute('PRAGMA data_version').fetchone()[0]
+    except sqlite3.Error:
+        return False
+    with __cacheLock:
+        __versions[key] = (version, cacheWrites, now)
+    if last is None or last[0] == version or last[1] != cacheWrites: return False
+    invalidateCache(None, db_path)
+    return True
+
+
+
+## \brief Drop the cached device configuration rows and notify the listeners
+#
+# Called by the sql.* write helpers, must be called explictly after writing the
+# database with executeSQLite or outside of sql.py.   Every listener added with
+# addListener is called with (table, db_path) after the rows are dropped
+#
+# \param table (Optional) only drop the rows of this table, default is all tables
+# \param db_path (Optional) only drop the rows of this database, default is all databases
+##
+def invalidateCache(table = None, db_path = None):
+    global cacheWrites
+    with __cacheLock:
+        cacheWrites += 1
+        for key in [key for key in __cache if (table is None or key[0] == table) and (db_path is None or key[2] == db_path)]:
+            del __cache[key]
+    for listener in list(__listeners):
+        listener(table, db_path)
+
+
+
+## \brief Add a listener called when a table is written through the sql.* helpers
+#
+# The listener is called as listener(table, db_path), table (or db_path) is None
+# when the written table (or database) is not known, e.g. after executeMany without table
+# NOTE: the listener runs in the writing thread, it should only mark its data stale
+#
+# \param listener the function called with (table, db_path)
+##
+def addListener(listener):
+    if listener not in __listeners: __listeners.append(listener)
+
+
+
+## \brief Remove a listener added with addListener
+#
+# \param listener the function to remove
+##
+def removeListener(listener):
+    if listener in __listeners: __listeners.remove(listener)
+
+
+
+## \brief Get the device configuration cache counters
+#
+# \param daemon print out the counters if set False, the default is True
+# \return dictionary of hits, misses, evictions and the current size
+##
+def cacheStats(daemon = True):
+    with __cacheLock:
+        stats = {'hits': cacheHits, 'misses': cacheMisses, 'evictions': cacheEvictions, 'size': len(__cache)}
+    if not daemon: utility.pp(stats)
+    return stats
+
+
+
+## \brief Drop all cached rows and reset the cache counters
+##
+def clearCache():
+    global cacheHits, cacheMisses, cacheEvictions
+    with __cacheLock:
+        __cache.clear()
+        cacheHits = 0
+        cacheMisses = 0
+        cacheEvictions = 0
+
+
+
 ## \brief Execute the UPDATE query to modify a SQLite table
 #
 # A warper function for Execute UPDATE query in the SQLite database
 # Update the table in the give database path with the key and value
-# Using the query argument to add extra filter
+# Using the query argument to add extra filter, the value and params are bound
+# to '?' placeholders
 #
-# Example: updataSQLite('vendor', id, 2, 'id=1') == UPDATE vendor SET id=2 WHERE id=1;
+# Example: updataSQLite('vendor', 'id', 2, 'id=?', params = (1,)) == UPDATE vendor SET id=2 WHERE id=1;
 #
 # \param table The table in the given SQLite database
 # \param key The key in the given SQLite database
 # \param value The change value to set for the key
-# \param query (Optional) a filter to select which row(s)
+# \param query (Optional) a filter to select which row(s), may contain '?' placeholders
 # \param db_path (Optional) the SQLite database path
 # \param daemon print out the info message if set False, the default is False
+# \param params (Optional) the values bound to the placeholders of query
 ##
-def updateSQLite(table, key, value, query = None, db_path = None, daemon = False):
-	command = 'UPDATE ' + table + ' SET '
-	if str(value).isdigit(): command += (key + '=' + str(value) + ' ')
-	else: command += (key + '="' + str(value) + '" ')
-	if query is not None: command += ('WHERE ' + query)
-	executeSQLite(command, __init(db_path, daemon), daemon)
+def updateSQLite(table, key, value, query = None, db_path = None, daemon = False, params = ()):
+	command = 'UPDATE ' + table + ' SET ' + key + '=?'
+	if query is not None: command += (' WHERE ' + query)
+	executeSQLite(command, __init(db_path, daemon), daemon, (value,) + tuple(params))
+	invalidateCache(table)
 	## For multiple Keys/values, using create a new update function or call multiple times updateSQLite
-	'''
-	for key, value in zip(keys.items(), values.items()):
-		if str(value).isdigit(): command += (key + '=' + str(value) + ' ')
-		else: command += (key + '="' + str(value) + '" ')
-	if query is not None: command += ('WHERE ' + query)
-	executeSQLite(command, __init(db_path, daemon), daemon)
-	'''
 
 
 
@@ -203,17 +631,24 @@ def updateSQLite(table, key, value, query = None, db_path = None, daemon = False
 #
 # A warper function for execute INSERT query in the SQLite database
 # insert a row into the given table with given query
+# If values is a list or tuple, the values are bound to '?' placeholders
 #
 # \param table The table in the given database
-# \param keys The column names of the table - Key example: 'column_1_int, column_2_int, column_3_string, ...'
-# \param values The value of the columns coresponding to the keys sequence - Values example: '1, 2, "a value", ...'
+# \param keys The column names of the table - Key example: 'column_1_int, column_2_int, column_3_string, ...' or ['column_1_int', ...]
+# \param values The value of the columns coresponding to the keys sequence - Values example: [1, 2, 'a value', ...] or (legacy) '1, 2, "a value", ...'
 # \param db_path (Optional) the SQLite database path
 # \param daemon print out the info message if set False, the default is False
 # NOTE for further usage, modify this function
 ##
 def insertSQLite(table, keys, values, db_path = None, daemon = False):
-    command = 'INSERT INTO ' + table + ' (' + keys + ') VALUES (' + values + ')'
-    executeSQLite(command, __init(db_path, daemon), daemon)
+    if isinstance(keys, (list, tuple)): keys = ', '.join(keys)
+    if isinstance(values, (list, tuple)):
+        command = 'INSERT INTO ' + table + ' (' + keys + ') VALUES (' + ', '.join(['?'] * len(values)) + ')'
+        executeSQLite(command, __init(db_path, daemon), daemon, values)
+    else:
+        command = 'INSERT INTO ' + table + ' (' + keys + ') VALUES (' + values + ')'
+        executeSQLite(command, __init(db_path, daemon), daemon)
+    invalidateCache(table)
 
 
 
@@ -222,17 +657,74 @@ def insertSQLite(table, keys, values, db_path = None, daemon = False):
 # A warper function for execute DELETE query in the SQLite database
 # delete a row in the given table with given query
 #
-# Example: deleteSQLite('vendor', 'name="someName"')
+# Example: deleteSQLite('vendor', 'name=?', params = ('someName',))
 # The above command will execute: DELETE FROM vendor WHERE name="someName";
 #
 # \param table The table name in the given SQLite database
-# \param query The filter to select row(s) in the table
+# \param query The filter to select row(s) in the table, may contain '?' placeholders
 # \param db_path (Optional) The SQLite database path to use a specific database
 # \param daemon Print out the info message if set False, the default value is False
+# \param params (Optional) the values bound to the placeholders of query
 ##
-def deleteSQLite(table, query, db_path = None, daeamon = False):
+def deleteSQLite(table, query, db_path = None, daemon = False, params = ()):
 	command = 'DELETE FROM ' + table + ' WHERE ' + query
-	executeSQLite(command, __init(db_path, daemon, daemon))
+	executeSQLite(command, __init(db_path, daemon), daemon, params)
+	invalidateCache(table)
+
+
+
+## \brief Execute the INSERT query for many rows in a single transaction
+#
+# The column names are taken from the keys of the first row and every row is
+# bound by name, so all rows must provide the same keys.   The rows are consumed
+# lazily, a generator can be passed without building the whole list in memory
+#
+# Example: insertMany('vendor', ({'name': name, 'pci': pci} for name, pci in cells))
+#
+# \param table The table in the given database
+# \param rows An iterable (or generator) of dictionaries of {column: value}
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is False
+# \return the number of rows inserted, or None if error (nothing is inserted)
+##
+def insertMany(table, rows, db_path = None, daemon = False):
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return 0
+    keys = list(first)
+    command = 'INSERT INTO ' + table + ' (' + ', '.join(keys) + ') VALUES (' + ', '.join(':' + key for key in keys) + ')'
+    return executeMany(command, itertools.chain([first], rows), db_path, daemon, table)
+
+
+
+## \brief Execute the UPDATE query for many rows in a single transaction
+#
+# Each row is a dictionary holding the filter column(s) given by where and the
+# columns to be updated, all rows must provide the same keys.   The rows are
+# consumed lazily, a generator can be passed
+#
+# Example: updateMany('vendor', [{'id': 1, 'status': 'Done'}, {'id': 2, 'status': 'Fail'}])
+# The above command will execute: UPDATE vendor SET status=:status WHERE id=:id; for each row
+#
+# \param table The table in the given database
+# \param rows An iterable (or generator) of dictionaries of {column: value}
+# \param where The column name (or list of column names) used to select the row, default is 'id'
+# \param db_path (Optional) the SQLite database path
+# \param daemon print out the info message if set False, the default is False
+# \return the number of rows updated, or None if error (nothing is updated)
+##
+def updateMany(table, rows, where = 'id', db_path = None, daemon = False):
+    if isinstance(where, str): where = [where]
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return 0
+    keys = [key for key in first if key not in where]
+    command = 'UPDATE ' + table + ' SET ' + ', '.join(key + '=:' + key for key in keys) + ' WHERE ' + ' AND '.join(key + '=:' + key for key in where)
+    return executeMany(command, itertools.chain([first], rows), db_path, daemon, table)
 
 
 
@@ -247,9 +739,11 @@ def main():
     parser = argparse.ArgumentParser(description='SQLite CLI tools')
     parser.add_argument('-e', '--execute', metavar='Command', nargs='+', help='Execute the SQLite query command')
     parser.add_argument('-s', '--sql', metavar='SQLite_Path', help='Define the path of the SQLite DB file')
+    parser.add_argument('-m', '--migrate', dest='MIGRATE', action='store_true', help='Migrate the SQLite DB schema to the latest version (indexes, foreign keys)')
     if len(sys.argv) < 2: parser.print_help()
     args = parser.parse_args()
     if args.sql: sqlite_file = args.sql
+    if args.MIGRATE: sql_migration.migrate(sqlite_file)
     if args.execute: executeSQLite(' '.join(args.execute))
 
 
@@ -257,10 +751,51 @@ def main():
 ## \brief Global shared variables
 #
 # \param sqlite_file the default SQLite database file path
+# \param POOL_ENABLED reuse one long-lived connection per thread and database
+# \param BUSY_TIMEOUT seconds to wait on a locked database before failing
+# \param STATEMENT_CACHE_SIZE number of parsed statements cached per pooled connection
+# \param ITER_SIZE number of rows fetched at a time by iterSQLite
+# \param CACHE_ENABLED cache the device configuration rows, see getDeviceConfig
+# \param CACHE_TTL seconds a cached device configuration row stays valid
+# \param CACHE_SIZE maximum number of cached device configuration rows
+# \param CHECK_INTERVAL seconds between two checks of the writes of other processes, see checkExternalChange
+# \param LOG_LEVEL the minimum level of the records logged by the query helpers, see setLogger
+# \param ROW_JSON, ROW_SQLITE, ROW_TUPLE the row types, see rowFactory
+# \param DEBUG, INFO, WARN, ERROR the log levels, same values as the logging module
 ##
 ########################### Load Config File ############################
 sqlite_file = 'default.sqlite'        # Default Value #
+POOL_ENABLED = True                   # Default Value #
+BUSY_TIMEOUT = 30                     # Default Value #
+STATEMENT_CACHE_SIZE = 256            # Default Value #
+ITER_SIZE = 256                       # Default Value #
+CACHE_ENABLED = True                  # Default Value #
+CACHE_TTL = 60                        # Default Value #
+CACHE_SIZE = 256                      # Default Value #
+CHECK_INTERVAL = 1                    # Default Value #
+LOG_LEVEL = 20                        # Default Value #
 #########################################################################
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+ROW_JSON = 'json'
+ROW_SQLITE = 'row'
+ROW_TUPLE = 'tuple'
+__rowClasses = {}
+__pool = {}
+__pooledIds = set()
+__poolLock = threading.Lock()
+__cache = collections.OrderedDict()
+__cacheLock = threading.Lock()
+cacheHits = 0
+cacheMisses = 0
+cacheEvictions = 0
+cacheWrites = 0
+__versions = {}
+__logger = UtilityLogger()
+__listeners = []
+atexit.register(closePool, True)
 
 
 ## \brief Load the default configuration from SAuto Framework
@@ -0,0 +1,302 @@
+#!/usr/bin/python3
+
+## \file sql_async.py
+# \brief Thread and asyncio friendly access layer on top of sql.py
+#
+# This modules serializes all the writes to a SQLite database through one
+# dedicated writer thread and serves the reads from a small pool of reader
+# threads.   Every thread uses its own pooled connection from sql.py (WAL mode),
+# so concurrent command handlers never compete for the write lock and readers
+# are not blocked by the writer.   Every call returns a concurrent.futures.Future,
+# the a* methods return an awaitable for asyncio code
+#
+# Example:
+#     db = sql_async.getInstance()
+#     rows = db.query('SELECT * FROM mxa WHERE id=?', (1,)).result()
+#     db.updateSQLite('vendor', 'status', 'Done', 'id=?', params = (2,))
+#     rows = await db.aquery('SELECT * FROM rf_matrix_db WHERE output_device=?', ('MXA1',))
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import sql
+import utility
+import threading
+import queue
+import asyncio
+import atexit
+import concurrent.futures
+
+
+
+## \brief Async SQLite class, one writer thread and a pool of reader threads per database
+class AsyncSQLite:
+    ## \brief Start the writer thread and the reader pool
+    #
+    # \param db_path (Optional) the SQLite database path, default is sql.sqlite_file
+    # \param readers the number of reader threads, default is READERS
+    # \param daemon print out the info message if set False, the default is True
+    ##
+    def __init__(self, db_path = None, readers = None, daemon = True):
+        self.db_path = db_path
+        self.daemon = daemon
+        self.__writes = queue.Queue(WRITE_QUEUE_SIZE)
+        self.__readers = concurrent.futures.ThreadPoolExecutor(max_workers = readers or READERS, thread_name_prefix = 'sql-reader')
+        self.__writer = threading.Thread(target = self.__writeLoop, name = 'sql-writer')
+        self.__writer.daemon = True
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__writer.start()
+        if not daemon: utility.info('Started async SQLite access for DB [' + str(db_path or sql.sqlite_file) + '] with ' + str(readers or READERS) + ' reader(s)')
+
+
+
+    ## \brief The writer thread, execute the queued writes one by one
+    #
+    # The writes run in the order they are queued on the single pooled connection
+    # of this thread, the pooled connection is closed when the writer stops.   A
+    # write still queued after the stop sentinel fails with RuntimeError
+    ##
+    def __writeLoop(self):
+        while True:
+            item = self.__writes.get()
+            if item is None: break
+            future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel(): continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        while True:
+            try:
+                item = self.__writes.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[0].set_running_or_notify_cancel(): item[0].set_exception(RuntimeError('AsyncSQLite is closed'))
+        sql.closeSQLite(self.db_path, True)
+
+
+
+    ## \brief Queue a write function to the writer thread
+    #
+    # The closed check and the put are done under the lock of close, so no write
+    # is queued behind the stop sentinel
+    #
+    # \param function the function executed by the writer thread
+    # \param args, kwargs the arguments of the function
+    # \return concurrent.futures.Future of the function result
+    ##
+    def write(self, function, *args, **kwargs):
+        future = concurrent.futures.Future()
+        with self.__lock:
+            if self.__closed: raise RuntimeError('AsyncSQLite is closed')
+            self.__writes.put((future, function, args, kwargs))
+        return future
+
+
+
+    ## \brief Submit a read function to the reader pool
+    #
+    # \param function the function executed by a reader thread
+    # \param args, kwargs the arguments of the function
+    # \return concurrent.futures.Future of the function result
+    ##
+    def read(self, function, *args, **kwargs):
+        if self.__closed: raise RuntimeError('AsyncSQLite is closed')
+        return self.__readers.submit(function, *args, **kwargs)
+
+
+
+    ## \brief Run a parameterized SELECT query on the reader pool, see sql.query
+    #
+    # \param command The SQLite query with '?' placeholders
+    # \param params The values bound to the placeholders, default is ()
+    # \param rowType the type of the returned rows, see sql.rowFactory
+    # \return Future of the list of rows, empty list if no row is found
+    ##
+    def query(self, command, params = (), rowType = None):
+        return self.read(sql.query, command, params, self.db_path, self.daemon, rowType)
+
+
+
+    ## \brief Get a device configuration row on the reader pool, see sql.getDeviceConfig
+    #
+    # \param table The device table name
+    # \param device_id The id of the row in the table
+    # \return Future of the row dictionary, or None if the id is not found
+    ##
+    def getDeviceConfig(self, table, device_id):
+        return self.read(sql.getDeviceConfig, table, device_id, self.db_path)
+
+
+
+    ## \brief Execute a statement (INSERT, UPDATE, DELETE, ...) on the writer thread
+    #
+    # The cached rows are not dropped by a raw statement, give the written table
+    # to drop its rows and notify the listeners (see sql.invalidateCache)
+    #
+    # \param command The SQLite statement with '?' placeholders
+    # \param params The values bound to the placeholders, default is ()
+    # \param table (Optional) the table written by the statement
+    # \return Future of the rows returned by the statement, None if no row or error
+    ##
+    def execute(self, command, params = (), table = None):
+        return self.write(self.__execute, command, params, table)
+
+
+
+    ## \brief Execute the statement on the pooled connection of the writer thread
+    ##
+    def __execute(self, command, params, table):
+        rows = sql.executeSQLite(command, sql.getConnection(self.db_path, self.daemon), self.daemon, params)
+        if table is not None: sql.invalidateCache(table, self.db_path or sql.sqlite_file)
+        return rows
+
+
+
+    ## \brief Execute a statement for many rows on the writer thread, see sql.executeMany
+    #
+    # \return Future of the number of rows affected, None if error
+    ##
+    def executeMany(self, command, rows, table = None):
+        return self.write(sql.executeMany, command, rows, self.db_path, self.daemon, table)
+
+
+
+    ## \brief Insert many rows on the writer thread, see sql.insertMany
+    #
+    # \return Future of the number of rows inserted, None if error
+    ##
+    def insertMany(self, table, rows):
+        return self.write(sql.insertMany, table, rows, self.db_path, self.daemon)
+
+
+
+    ## \brief Update many rows on the writer thread, see sql.updateMany
+    #
+    # \return Future of the number of rows updated, None if error
+    ##
+    def updateMany(self, table, rows, where = 'id'):
+        return self.write(sql.updateMany, table, rows, where, self.db_path, self.daemon)
+
+
+
+    ## \brief Update a table on the writer thread, see sql.updateSQLite
+    #
+    # \return Future of None, resolved once the update is done
+    ##
+    def updateSQLite(self, table, key, value, query = None, params = ()):
+        return self.write(sql.updateSQLite, table, key, value, query, self.db_path, self.daemon, params)
+
+
+
+    ## \brief Insert a row on the writer thread, see sql.insertSQLite
+    #
+    # \return Future of None, resolved once the insert is done
+    ##
+    def insertSQLite(self, table, keys, values):
+        return self.write(sql.insertSQLite, table, keys, values, self.db_path, self.daemon)
+
+
+
+    ## \brief Delete row(s) on the writer thread, see sql.deleteSQLite
+    #
+    # \return Future of None, resolved once the delete is done
+    ##
+    def deleteSQLite(self, table, query, params = ()):
+        return self.write(sql.deleteSQLite, table, query, self.db_path, self.daemon, params)
+
+
+
+    ## \brief asyncio version of query, must be awaited inside a running event loop
+    ##
+    def aquery(self, command, params = (), rowType = None):
+        return asyncio.wrap_future(self.query(command, params, rowType))
+
+
+
+    ## \brief asyncio version of getDeviceConfig, must be awaited inside a running event loop
+    ##
+    def agetDeviceConfig(self, table, device_id):
+        return asyncio.wrap_future(self.getDeviceConfig(table, device_id))
+
+
+
+    ## \brief asyncio version of execute, must be awaited inside a running event loop
+    ##
+    def aexecute(self, command, params = (), table = None):
+        return asyncio.wrap_future(self.execute(command, params, table))
+
+
+
+    ## \brief asyncio version of executeMany, must be awaited inside a running event loop
+    ##
+    def aexecuteMany(self, command, rows, table = None):
+        return asyncio.wrap_future(self.executeMany(command, rows, table))
+
+
+
+    ## \brief Wait for the queued writes to finish and stop the threads
+    #
+    # The pooled connections of the reader threads are closed by sql.py once the
+    # threads are gone (or at exit)
+    #
+    # \param wait block until the queued writes and the running reads are done, default is True
+    ##
+    def close(self, wait = True):
+        with self.__lock:
+            if self.__closed: return
+            self.__closed = True
+            self.__writes.put(None)
+        if wait: self.__writer.join()
+        self.__readers.shutdown(wait = wait)
+        if not self.daemon: utility.info('Stopped async SQLite access for DB [' + str(self.db_path or sql.sqlite_file) + ']')
+
+
+
+## \brief Get the shared AsyncSQLite instance of the given database
+#
+# All the threads of the process must share one instance per database, so that
+# every write goes through the same writer thread
+#
+# \param db_path (Optional) the SQLite database path, default is sql.sqlite_file
+# \param daemon print out the info message if set False, the default is True
+# \return the AsyncSQLite instance
+##
+def getInstance(db_path = None, daemon = True):
+    if db_path is None: db_path = sql.sqlite_file
+    with __instancesLock:
+        instance = __instances.get(db_path)
+        if instance is None:
+            instance = AsyncSQLite(db_path, daemon = daemon)
+            __instances[db_path] = instance
+    return instance
+
+
+
+## \brief Close all the shared AsyncSQLite instances, registered with atexit
+#
+# \param wait block until the queued writes are done, default is True
+##
+def closeAll(wait = True):
+    with __instancesLock:
+        instances = list(__instances.values())
+        __instances.clear()
+    for instance in instances:
+        instance.close(wait)
+
+
+
+## \brief Global shared variables
+#
+# \param READERS the default number of reader threads per database
+# \param WRITE_QUEUE_SIZE the maximum number of pending writes, put blocks when full, 0 is unlimited
+##
+########################### Load Config File ############################
+READERS = 4                           # Default Value #
+WRITE_QUEUE_SIZE = 0                  # Default Value #
+#########################################################################
+__instances = {}
+__instancesLock = threading.Lock()
+atexit.register(closeAll)
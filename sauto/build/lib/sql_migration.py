@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+
+## \file sql_migration.py
+# \brief Versioned schema migrations for the SAuto SQLite database
+#
+# This modules contains the list of schema migrations applied to the SAuto
+# SQLite database (simple.sqlite).   The schema version is recorded in the
+# database header with PRAGMA user_version, every migration is applied once,
+# in order, inside its own transaction and is safe to run again
+# Run from the sql.py CLI: ./sql.py -m [-s SQLite_Path]
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import re
+import sqlite3
+import utility
+
+
+
+## \brief Migration 1, index the columns used by the device lookups
+#
+# rf_matrix_db(output_device) - mxa.resetMXA / MXA.reset
+# rf_matrix_db(rf_matrix_id, port) - RF Matrix port lookups
+# pre_config_vendor(vendor_id) and vendor(rf_matrix_id) - vendor workflows
+#
+# \param conn the connection object from sqlite3 module
+# \param daemon print out the info message if set False, the default is False
+##
+def __createIndexes(conn, daemon = False):
+    for name, table, columns in INDEXES:
+        if not __hasColumns(conn, table, columns):
+            utility.warn('Skip index [' + name + '], table [' + table + '] has no column(s) ' + str(columns), False)
+            continue
+        if not daemon: utility.info('Creating index [' + name + '] on ' + table + '(' + ', '.join(columns) + ')')
+        conn.execute('CREATE INDEX IF NOT EXISTS ' + name + ' ON ' + table + ' (' + ', '.join(columns) + ')')
+
+
+
+## \brief Migration 2, declare the foreign keys between the device tables
+#
+# SQLite can not add a constraint to an existing table, each table is rebuilt
+# following the SQLite ALTER TABLE procedure: create the new table with the
+# FOREIGN KEY clauses, copy the rows, drop the old table, rename the new one and
+# re-create its indexes and triggers.   A table which already declares foreign
+# keys is left untouched.   The rows are copied as they are, the rows without a
+# parent (e.g. an empty string id) are reported as foreign key violations and
+# have to be fixed by hand, a schema migration does not change the data
+# NOTE: SQLite only enforces the foreign keys on connections with PRAGMA foreign_keys=ON
+#
+# \param conn the connection object from sqlite3 module
+# \param daemon print out the info message if set False, the default is False
+##
+def __createForeignKeys(conn, daemon = False):
+    for table, keys in FOREIGN_KEYS:
+        if conn.execute('PRAGMA foreign_key_list(' + table + ')').fetchall(): continue
+        keys = [key for key in keys if __hasColumns(conn, table, [key[0]])]
+        if not keys:
+            utility.warn('Skip foreign keys of table [' + table + '], columns not found', False)
+            continue
+        if not daemon: utility.info('Rebuilding table [' + table + '] with foreign keys ' + str(keys))
+        schema = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+        extras = [row[0] for row in conn.execute("SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name=? AND sql IS NOT NULL", (table,))]
+        constraints = ''.join(', FOREIGN KEY(' + column + ') REFERENCES ' + parent + '(' + parentColumn + ')' for column, parent, parentColumn in keys)
+        schema = __CREATE_TABLE.sub('CREATE TABLE migrate_' + table + ' (', schema, 1)
+        schema = schema[:schema.rindex(')')] + constraints + ')'
+        conn.execute(schema)
+        conn.execute('INSERT INTO migrate_' + table + ' SELECT * FROM ' + table)
+        conn.execute('DROP TABLE ' + table)
+        conn.execute('ALTER TABLE migrate_' + table + ' RENAME TO ' + table)
+        for extra in extras:
+            conn.execute(extra)
+    for violation in conn.execute('PRAGMA foreign_key_check').fetchall():
+        utility.warn('Foreign key violation: table [' + str(violation[0]) + '] rowid [' + str(violation[1]) + '] has no parent in [' + str(violation[2]) + '], fix the row by hand', False)
+
+
+
+## \brief Migration 3, create the measurement table of the EVM/RSRP results
+#
+# One row per reading, the (device_id, vendor_id, timestamp) index serves the
+# time window lookups of measurement.py
+#
+# \param conn the connection object from sqlite3 module
+# \param daemon print out the info message if set False, the default is False
+##
+def __createMeasurement(conn, daemon = False):
+    if not daemon: utility.info('Creating table [measurement]')
+    conn.execute('CREATE TABLE IF NOT EXISTS measurement ('
+                 'id INTEGER PRIMARY KEY, '
+                 'timestamp REAL NOT NULL, '
+                 'device_id INTEGER, '
+                 'vendor_id INTEGER, '
+                 'pci INTEGER, '
+                 'evm REAL, '
+                 'rsrp REAL, '
+                 'FOREIGN KEY(device_id) REFERENCES mxa(id), '
+                 'FOREIGN KEY(vendor_id) REFERENCES vendor(id))')
+    conn.execute('CREATE INDEX IF NOT EXISTS measurement_device_vendor_time ON measurement (device_id, vendor_id, timestamp)')
+
+
+
+## \brief Check if the table exists and has all the given columns
+#
+# \param conn the connection object from sqlite3 module
+# \param table the table name
+# \param columns the list of column names
+# \return True if all columns are found, otherwise False
+##
+def __hasColumns(conn, table, columns):
+    names = [row[1] for row in conn.execute('PRAGMA table_info(' + table + ')')]
+    return all(column in names for column in columns)
+
+
+
+## \brief Get the schema version recorded in the SQLite database
+#
+# \param db_path the path of the SQLite database file
+# \return the integer schema version, 0 for a database never migrated
+##
+def getVersion(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+
+
+## \brief Apply the pending migrations to the SQLite database
+#
+# Each migration newer than the recorded schema version is applied in its own
+# transaction together with the new version number, so a failed migration leaves
+# the database at the previous version.   Running it on an up to date database
+# does nothing
+#
+# \param db_path the path of the SQLite database file
+# \param target the schema version to migrate to, default is the latest SCHEMA_VERSION
+# \param daemon print out the info message if set False, the default is False
+# \return the schema version of the database after migration
+##
+def migrate(db_path, target = None, daemon = False):
+    if target is None: target = SCHEMA_VERSION
+    conn = sqlite3.connect(db_path, isolation_level = None)
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if not daemon: utility.info('SQLite DB [' + db_path + '] schema version [' + str(version) + '], target [' + str(target) + ']')
+        conn.execute('PRAGMA foreign_keys=OFF')
+        for number, description, function in MIGRATIONS:
+            if number <= version or number > target: continue
+            if not daemon: utility.info('Applying migration [' + str(number) + '] ' + description)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                function(conn, daemon)
+                conn.execute('PRAGMA user_version=' + str(number))
+                conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK')
+                utility.error(str(e) + '\n    Migration [' + str(number) + '] failed, schema version stays [' + str(version) + ']', False)
+                break
+            version = number
+        return version
+    finally:
+        conn.close()
+
+
+
+## \brief Global shared variables
+#
+# \param INDEXES the (name, table, columns) of the indexes created by migration 1
+# \param FOREIGN_KEYS the (table, [(column, parent table, parent column)]) declared by migration 2
+# \param MIGRATIONS the ordered list of (version, description, function)
+# \param SCHEMA_VERSION the latest schema version
+##
+INDEXES = [
+    ('rf_matrix_db_output_device', 'rf_matrix_db', ['output_device']),
+    ('rf_matrix_db_matrix_port', 'rf_matrix_db', ['rf_matrix_id', 'port']),
+    ('pre_config_vendor_vendor_id', 'pre_config_vendor', ['vendor_id']),
+    ('vendor_rf_matrix_id', 'vendor', ['rf_matrix_id']),
+]
+FOREIGN_KEYS = [
+    ('vendor', [('rf_matrix_id', 'rf_matrix', 'id')]),
+    ('rf_matrix_db', [('rf_matrix_id', 'rf_matrix', 'id'), ('jfw_id', 'jfw', 'id')]),
+    ('pre_config_vendor', [('vendor_id', 'vendor', 'id'), ('mxa_id', 'mxa', 'id'), ('lsu_id', 'lsu', 'id')]),
+]
+MIGRATIONS = [
+    (1, 'Create indexes for device lookups', __createIndexes),
+    (2, 'Declare foreign keys between device tables', __createForeignKeys),
+    (3, 'Create measurement table', __createMeasurement),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+__CREATE_TABLE = re.compile(r'^\s*CREATE\s+TABLE\s+[^(]+\(', re.I)
@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+
+## \file topology.py
+# \brief In-memory RF routing topology of the SAuto test bed
+#
+# This modules keeps a materialized view of the RF routing built from the
+# rf_matrix_db, rf_matrix, jfw, mxa and pre_config_vendor tables:
+#     device (input_device) -> RF Matrix port -> JFW attenuator port -> analyzer (output_device)
+# The tables are loaded once and indexed in dictionaries, so the routing lookups
+# are answered in O(1) without any SQLite query.   A table is reloaded when it is
+# written through the sql.* helpers (see sql.addListener), and all the tables are
+# reloaded when the database is written by another process (see
+# sql.checkExternalChange, checked every CHECK_INTERVAL seconds)
+#
+# Example:
+#     for route in topology.getTopology().routesTo('MXASpecAn'):
+#         print(route['input_device'], route['port'], route['jfw_id'], route['jfw_port'], route['matrix']['name'])
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import sql
+import utility
+import threading
+import time
+
+
+
+## \brief Topology class, the routing view of one SQLite database
+#
+# Every route is a rf_matrix_db row (dictionary) with three extra keys:
+# 'matrix' the rf_matrix row of rf_matrix_id, 'jfw' the jfw row of jfw_id and
+# 'mxa' the list of mxa rows named output_device (None / [] if not found)
+# NOTE: the returned rows are shared by all the callers, do not modify them
+##
+class Topology:
+    ## \brief Create the topology view, the tables are loaded on the first lookup
+    #
+    # \param db_path (Optional) the SQLite database path, default is sql.sqlite_file
+    # \param daemon print out the info message if set False, the default is True
+    ##
+    def __init__(self, db_path = None, daemon = True):
+        self.db_path = db_path or sql.sqlite_file
+        self.daemon = daemon
+        self.__lock = threading.Lock()
+        self.__tables = dict((table, []) for table in TABLES)
+        self.__dirty = set(TABLES)
+        self.__checked = 0
+        self.__index = self.__buildIndex()
+        sql.addListener(self.__changed)
+
+
+
+    ## \brief sql.py listener, mark the written table stale
+    #
+    # \param table the written table, None if unknown
+    # \param db_path the written database, None if unknown
+    ##
+    def __changed(self, table, db_path):
+        if db_path is not None and db_path != self.db_path: return
+        if table is None: self.__dirty.update(TABLES)
+        elif table in TABLES: self.__dirty.add(table)
+
+
+
+    ## \brief Reload the stale tables and rebuild the indexes
+    #
+    # Called by every lookup, it is a no-op unless a table was written by this
+    # process (only that table is reloaded) or the database was written by another
+    # process since the last refresh
+    #
+    # \param force reload all the tables if set True, default is False
+    ##
+    def refresh(self, force = False):
+        now = time.time()
+        if force: self.__dirty.update(TABLES)
+        if now - self.__checked >= CHECK_INTERVAL:
+            self.__checked = now
+            sql.checkExternalChange(self.db_path, 0)
+        if not self.__dirty: return
+        with self.__lock:
+            dirty = set(self.__dirty)
+            self.__dirty.difference_update(dirty)
+            if not dirty: return
+            if not self.daemon: utility.info('Reloading topology table(s) ' + str(sorted(dirty)) + ' from [' + self.db_path + ']')
+            for table in dirty:
+                self.__tables[table] = sql.query('SELECT * FROM ' + table, (), self.db_path)
+            self.__index = self.__buildIndex()
+
+
+
+    ## \brief Build the lookup dictionaries from the loaded tables
+    #
+    # The ids are keyed and joined as strings, so an id stored as TEXT (e.g. the
+    # jfw_id of rf_matrix_db) matches the INTEGER id of its table, and the lookups
+    # accept an id of either type
+    #
+    # \return the dictionary of indexes, replaced as a whole so the lookups never see a partial build
+    ##
+    def __buildIndex(self):
+        index = {
+            'matrix': dict((str(row['id']), row) for row in self.__tables['rf_matrix']),
+            'jfw': dict((str(row['id']), row) for row in self.__tables['jfw']),
+            'mxa': dict((str(row['id']), row) for row in self.__tables['mxa']),
+            'mxaName': {},
+            'output': {},
+            'input': {},
+            'port': {},
+            'attenuator': {},
+            'vendor': {},
+        }
+        for row in self.__tables['mxa']:
+            index['mxaName'].setdefault(row['name'], []).append(row)
+        for row in self.__tables['rf_matrix_db']:
+            route = dict(row)
+            route['matrix'] = index['matrix'].get(str(row['rf_matrix_id']))
+            route['jfw'] = index['jfw'].get(str(row['jfw_id']))
+            route['mxa'] = index['mxaName'].get(row['output_device'], [])
+            index['output'].setdefault(row['output_device'], []).append(route)
+            index['input'].setdefault(row['input_device'], []).append(route)
+            index['port'][(str(row['rf_matrix_id']), str(row['port']))] = route
+            if row['jfw_id'] and row['jfw_port']: index['attenuator'][(str(row['jfw_id']), str(row['jfw_port']))] = route
+        for row in self.__tables['pre_config_vendor']:
+            config = dict(row)
+            config['mxa'] = index['mxa'].get(str(row['mxa_id']))
+            index['vendor'].setdefault(str(row['vendor_id']), []).append(config)
+        return index
+
+
+
+    ## \brief Get the routes feeding the given output device (e.g. the MXA name)
+    #
+    # \param output_device the output_device name in rf_matrix_db
+    # \return list of routes, empty list if not found
+    ##
+    def routesTo(self, output_device):
+        self.refresh()
+        return self.__index['output'].get(output_device, [])
+
+
+
+    ## \brief Get the routes fed by the given input device (e.g. the eNB name)
+    #
+    # \param input_device the input_device name in rf_matrix_db
+    # \return list of routes, empty list if not found
+    ##
+    def routesFrom(self, input_device):
+        self.refresh()
+        return self.__index['input'].get(input_device, [])
+
+
+
+    ## \brief Get the route of the given RF Matrix port
+    #
+    # \param rf_matrix_id the id of the RF Matrix
+    # \param port the port number of the RF Matrix
+    # \return the route, or None if not found
+    ##
+    def route(self, rf_matrix_id, port):
+        self.refresh()
+        return self.__index['port'].get((str(rf_matrix_id), str(port)))
+
+
+
+    ## \brief Get the route going through the given JFW attenuator port
+    #
+    # \param jfw_id the id of the JFW
+    # \param jfw_port the attenuator port number of the JFW
+    # \return the route, or None if not found
+    ##
+    def routeByAttenuator(self, jfw_id, jfw_port):
+        self.refresh()
+        return self.__index['attenuator'].get((str(jfw_id), str(jfw_port)))
+
+
+
+    ## \brief Get the pre-configured vendor rows of the given vendor, with the 'mxa' row attached
+    #
+    # \param vendor_id the id of the vendor
+    # \return list of pre_config_vendor rows, empty list if not found
+    ##
+    def vendorConfig(self, vendor_id):
+        self.refresh()
+        return self.__index['vendor'].get(str(vendor_id), [])
+
+
+
+    ## \brief Get the rf_matrix row of the given id, None if not found
+    ##
+    def matrix(self, rf_matrix_id):
+        self.refresh()
+        return self.__index['matrix'].get(str(rf_matrix_id))
+
+
+
+    ## \brief Get the jfw row of the given id, None if not found
+    ##
+    def jfw(self, jfw_id):
+        self.refresh()
+        return self.__index['jfw'].get(str(jfw_id))
+
+
+
+    ## \brief Get the mxa row of the given id, None if not found
+    ##
+    def mxa(self, mxa_id):
+        self.refresh()
+        return self.__index['mxa'].get(str(mxa_id))
+
+
+
+    ## \brief Get the mxa rows of the given name, empty list if not found
+    ##
+    def mxaByName(self, name):
+        self.refresh()
+        return self.__index['mxaName'].get(name, [])
+
+
+
+    ## \brief Stop listening to the sql.py writes
+    ##
+    def close(self):
+        sql.removeListener(self.__changed)
+
+
+
+## \brief Get the shared Topology of the given database
+#
+# \param db_path (Optional) the SQLite database path, default is sql.sqlite_file
+# \return the Topology instance
+##
+def getTopology(db_path = None):
+    if db_path is None: db_path = sql.sqlite_file
+    with __topologiesLock:
+        instance = __topologies.get(db_path)
+        if instance is None:
+            instance = Topology(db_path)
+            __topologies[db_path] = instance
+    return instance
+
+
+
+## \brief Global shared variables
+#
+# \param CHECK_INTERVAL seconds between two checks of the writes of other processes
+# \param TABLES the tables loaded in the topology
+##
+########################### Load Config File ############################
+CHECK_INTERVAL = 1                    # Default Value #
+#########################################################################
+TABLES = ['rf_matrix_db', 'rf_matrix', 'jfw', 'mxa', 'pre_config_vendor']
+__topologies = {}
+__topologiesLock = threading.Lock()
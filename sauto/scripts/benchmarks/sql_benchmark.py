@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+## \file sql_benchmark.py
+# \brief Benchmark for the sql.py library
+#
+# Measure the queries per second of sql.getSQLite with and without the
+# per-thread connection pool, and the query latency of sql.executeSQLite with
+# the logging on and off, using the default SQLite database from
+# this_device_conf.json or the database given with -s
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'build', 'lib'))
+import utility
+import sql
+
+
+
+## \brief Run the same query repeatedly and return the queries per second
+#
+# \param command The SQLite query to be executed
+# \param counter The number of times the query is executed
+# \param pooled Use the connection pool if set True, otherwise connect per query
+# \param db_path The SQLite database path, default is sqlite_file
+# \return the number of queries per second
+##
+def queriesPerSecond(command, counter, pooled, db_path = None):
+	sql.setPooling(pooled, daemon = True)
+	sql.getSQLite(command, db_path) ## warm up, the pooled connection is opened here
+	start = time.perf_counter()
+	for i in range(counter):
+		sql.getSQLite(command, db_path)
+	elapsed = time.perf_counter() - start
+	sql.closePool(daemon = True)
+	return counter / elapsed
+
+
+
+## \brief Run the same query repeatedly and return the mean latency in microseconds
+#
+# With logging on, every query and row is logged at DEBUG through a logging.Logger
+# writing to os.devnull, so the cost of formatting the records is measured without
+# flooding the terminal.   With logging off the query runs with daemon = True
+#
+# \param command The SQLite query to be executed
+# \param counter The number of times the query is executed
+# \param logged Log the query and the rows if set True
+# \param db_path The SQLite database path, default is sqlite_file
+# \return the mean latency of a query in microseconds
+##
+def queryLatency(command, counter, logged, db_path = None):
+	with open(os.devnull, 'w') as devnull:
+		logger = logging.getLogger('sql_benchmark')
+		logger.propagate = False
+		logger.handlers = [logging.StreamHandler(devnull)]
+		logger.setLevel(logging.DEBUG)
+		sql.setLogger(logger, sql.DEBUG)
+		conn = sql.getConnection(db_path, daemon = True)
+		sql.executeSQLite(command, conn, not logged) ## warm up
+		start = time.perf_counter()
+		for i in range(counter):
+			sql.executeSQLite(command, conn, not logged)
+		elapsed = time.perf_counter() - start
+		sql.setLogger(sql.UtilityLogger(), sql.INFO)
+	sql.closePool(daemon = True)
+	return elapsed / counter * 1000000
+
+
+
+## \brief Main function for provide the CLI tool
+#
+# run the command:
+# ./sql_benchmark.py -h or --help for instructions
+##
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the sql.py queries per second with and without connection pool, and the query latency with and without logging')
+	parser.add_argument('-s', '--sql', metavar='SQLite_Path', help='Define the path of the SQLite DB file')
+	parser.add_argument('-n', '--number', metavar='Counter', type=int, default=2000, help='The number of queries to execute for each run, default is 2000')
+	parser.add_argument('-q', '--query', metavar='Query', default='SELECT * FROM rf_matrix_db WHERE output_device = "MXASpecAn"', help='The SELECT query to execute')
+	args = parser.parse_args()
+	if args.sql: sql.setDBPath(args.sql, daemon = True)
+	utility.info('Benchmarking [' + args.query + '] x ' + str(args.number) + ' on [' + sql.sqlite_file + ']')
+	unpooled = queriesPerSecond(args.query, args.number, False)
+	pooled = queriesPerSecond(args.query, args.number, True)
+	utility.info('Connect per query: ' + str(round(unpooled, 1)) + ' queries/s')
+	utility.info('Pooled connection: ' + str(round(pooled, 1)) + ' queries/s')
+	utility.info('Speed up: ' + str(round(pooled / unpooled, 2)) + 'x')
+	logged = queryLatency(args.query, args.number, True)
+	quiet = queryLatency(args.query, args.number, False)
+	utility.info('Logging on: ' + str(round(logged, 1)) + ' us/query')
+	utility.info('Logging off: ' + str(round(quiet, 1)) + ' us/query')
+	utility.info('Logging overhead: ' + str(round(logged / quiet, 2)) + 'x')
+	sql.setPooling(True, daemon = True)
+
+
+
+## \brief give the entry for main when execute from command line
+if __name__ == "__main__":
+	main()
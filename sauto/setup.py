@@ -113,7 +113,7 @@ setup(
 	keywords = 'Simple Automation Framework & Libraries',
 	packages = find_packages(),
 	package_dir = {'lib': 'build'},
-        install_requires = ['colorama', 'requests', 'python-jenkins', 'json2html', 'django_logtail', 'django-cors-headers', 'humanize', 'pexpect'],
+        install_requires = ['colorama', 'requests', 'python-jenkins', 'json2html', 'django_logtail', 'django-cors-headers', 'humanize', 'pexpect', 'numpy'],
 )
 
 
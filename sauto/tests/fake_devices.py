@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+
+## \file fake_devices.py
+# \brief Fake SCPI (MXA) and Telnet (JFW) servers for the unit tests
+#
+# The servers listen on 127.0.0.1 with a free port picked by the system and
+# serve every client in its own thread.   They implement just enough of the
+# instruments to exercise the sessions of mxa.py and jfw.py: the received
+# command lines are recorded, so a test can count the round trips
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import socketserver
+import struct
+import threading
+import time
+
+
+
+## \brief Base class of the fake servers, a threaded TCP server on a free port
+class FakeServer(socketserver.ThreadingTCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+	def __init__(self, handler):
+		socketserver.ThreadingTCPServer.__init__(self, ('127.0.0.1', 0), handler)
+		self.ip, self.port = self.server_address
+		self.lines = []
+		self.connections = 0
+		self.lock = threading.Lock()
+		self.__thread = threading.Thread(target = self.serve_forever, daemon = True)
+
+
+
+	## \brief Start serving in a background thread
+	#
+	# \return the server itself
+	##
+	def start(self):
+		self.__thread.start()
+		return self
+
+
+
+	## \brief Stop serving and close the listening socket
+	##
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+
+
+	## \brief Record a received command line
+	##
+	def record(self, line):
+		with self.lock:
+			self.lines.append(line)
+
+
+
+	## \brief Count a new client connection
+	##
+	def connected(self):
+		with self.lock:
+			self.connections += 1
+
+
+
+## \brief Fake MXA on the raw SCPI socket transport
+#
+# Every newline terminated line is split on ';', the setters are stored in
+# state by upper case header, the queries return the stored value, '*OPC?'
+# returns 1 and 'TRAC:DATA?' returns TRACE_POINTS floats, as an IEEE 488.2
+# block when 'FORM REAL,32' is set (little-endian with 'FORM:BORD SWAP')
+##
+class FakeMXA(FakeServer):
+	def __init__(self, points = 1001):
+		FakeServer.__init__(self, FakeMXAHandler)
+		self.state = {'FORM': 'ASC'}
+		self.points = points
+
+
+
+	## \brief Handle one command line, return the response bytes (None if no query)
+	##
+	def handle(self, line):
+		replies = []
+		for command in line.split(';'):
+			header, _, value = command.strip().partition(' ')
+			header = header.lstrip(':').upper()
+			if not header: continue
+			if header == '*OPC?': replies.append(b'1')
+			elif header.startswith('TRAC:DATA?'): replies.append(self.trace())
+			elif header.endswith('?'): replies.append(self.state.get(header[:-1], '0').encode('ascii'))
+			else: self.state[header] = value
+		return b';'.join(replies) if replies else None
+
+
+
+	## \brief Build the trace response in the current format
+	##
+	def trace(self):
+		values = [float(i) for i in range(self.points)]
+		if 'REAL' not in self.state['FORM'].upper(): return ','.join(str(value) for value in values).encode('ascii')
+		order = '<' if self.state.get('FORM:BORD', '').upper().startswith('SWAP') else '>'
+		data = struct.pack(order + str(self.points) + 'f', *values)
+		length = str(len(data)).encode('ascii')
+		return b'#' + str(len(length)).encode('ascii') + length + data
+
+
+
+class FakeMXAHandler(socketserver.StreamRequestHandler):
+	def handle(self):
+		self.server.connected()
+		for line in self.rfile:
+			line = line.decode('ascii').strip()
+			self.server.record(line)
+			response = self.server.handle(line)
+			if response is not None: self.wfile.write(response + b'\n')
+
+
+
+## \brief Fake JFW attenuator box on Telnet
+#
+# 'SAR<port> <value>' sets an attenuator, 'RAA' reads all of them and
+# 'RA<port>' reads one, each read back line is 'Atten #<port> = <value>dB'.
+# The ports listed in stuck keep their value, as a failed attenuator would
+##
+class FakeJFW(FakeServer):
+	def __init__(self, ports = 8):
+		FakeServer.__init__(self, FakeJFWHandler)
+		self.atten = dict((port, 0) for port in range(1, ports + 1))
+		self.stuck = set()
+		self.pause = 0
+
+
+
+	## \brief Handle one command line, return the response text
+	##
+	def handle(self, line):
+		command = line.strip().upper()
+		if command.startswith('SAR'):
+			port, value = command[3:].split()
+			if int(port) not in self.stuck: self.atten[int(port)] = int(value)
+			return self.line(int(port))
+		if command == 'RAA': return ''.join(self.line(port) for port in sorted(self.atten))
+		if command.startswith('RA'): return self.line(int(command[2:]))
+		return 'Invalid Command\r\n'
+
+
+
+	def line(self, port):
+		return 'Atten #' + str(port) + ' = ' + str(self.atten[port]) + 'dB\r\n'
+
+
+
+class FakeJFWHandler(socketserver.StreamRequestHandler):
+	def handle(self):
+		self.server.connected()
+		self.wfile.write(b'JFW 50PA ready\r\n')
+		for line in self.rfile:
+			line = line.decode('ascii').strip()
+			if not line: continue
+			self.server.record(line)
+			for reply in self.server.handle(line).splitlines(True):
+				self.wfile.write(reply.encode('ascii'))
+				if self.server.pause: time.sleep(self.server.pause)
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+
+## \file test_jfw.py
+# \brief Unit tests of the JFW Telnet session
+#
+# The session talks to a fake JFW box on Telnet (see fake_devices.FakeJFW)
+# Run command: python3 -m unittest discover -s tests (from the sauto directory)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'build', 'lib'))
+import fake_devices
+import jfw
+
+
+
+class ParseTest(unittest.TestCase):
+	def testParseAttenuations(self):
+		self.assertEqual(jfw.parseAttenuations('Atten #1 = 12dB\r\nAtten #2 = 127 dB\r\n'), {'1': '12', '2': '127'})
+
+	def testTruncatedValueIsNotParsed(self):
+		self.assertEqual(jfw.parseAttenuations('Atten #1 = 12dB\r\nAtten #2 = 12'), {'1': '12'})
+
+
+
+class SessionTest(unittest.TestCase):
+	def setUp(self):
+		self.quietTime = jfw.QUIET_TIME
+		jfw.QUIET_TIME = 0.05
+		self.server = fake_devices.FakeJFW().start()
+		self.session = jfw.getSession(self.server.ip, self.server.port)
+
+	def tearDown(self):
+		self.session.close()
+		self.server.stop()
+		jfw.QUIET_TIME = self.quietTime
+
+	def testSessionIsReused(self):
+		self.assertIs(jfw.getSession(self.server.ip, self.server.port), self.session)
+		self.assertIn('Atten #1 = 30dB', self.session.execute('SAR1 30'))
+		self.assertIn('Atten #1 = 30dB', self.session.execute('RA1'))
+		self.assertEqual(self.server.connections, 1)
+		self.assertEqual(self.server.lines, ['SAR1 30', 'RA1'])
+
+	def testReconnect(self):
+		self.session.execute('RA1')
+		self.session.close()
+		self.assertIn('Atten #2 = 0dB', self.session.execute('RA2'))
+		self.assertEqual(self.server.connections, 2)
+
+
+	def testPipelinedSet(self):
+		self.assertEqual(jfw.setAttenuations(dict((port, 20) for port in range(1, 9)), self.server.ip, self.server.port, daemon = True), {})
+		self.assertEqual(self.server.atten, dict((port, 20) for port in range(1, 9)))
+		self.assertEqual(self.server.lines[-1], 'RAA')
+
+	def testStuckAttenuator(self):
+		self.server.stuck.add(2)
+		self.assertEqual(jfw.setAttenuations({1: 10, 2: 40}, self.server.ip, self.server.port, daemon = True), {'2': '0'})
+		self.assertEqual(self.session.diff(), {'2': {'EXPECTED': 40, 'ACTUAL': 0}})
+		self.assertEqual(self.session.diff([1]), {})
+
+	def testSlowReadBack(self):
+		self.server.pause = 0.1
+		self.assertEqual(jfw.setAttenuations({1: 10, 8: 20}, self.server.ip, self.server.port, daemon = True), {})
+		self.assertEqual(self.session.diff(), {})
+
+	def testResetAll(self):
+		self.server.atten[5] = 30
+		self.assertEqual(jfw.resetAll(ip = self.server.ip, port = self.server.port, daemon = True), {})
+		self.assertEqual(set(self.server.atten.values()), set([jfw.RESET_VALUE]))
+
+
+	def testTrackSetAndReadBack(self):
+		self.session.execute('SAR1 30')
+		self.assertEqual(self.session.expected, {1: 30})
+		self.assertEqual(self.session.actual, {1: 30})
+		self.assertEqual(self.session.diff(), {})
+
+	def testHealthCheckReportsOnlyDifferences(self):
+		self.assertEqual(jfw.healthCheck(daemon = True, ip = self.server.ip, port = self.server.port), {})
+		self.session.execute('SAR3 60')
+		self.server.atten[3] = 50
+		self.assertEqual(jfw.healthCheck(daemon = True, ip = self.server.ip, port = self.server.port), {'3': {'EXPECTED': 60, 'ACTUAL': 50}})
+
+	def testHealthCheckFix(self):
+		self.session.execute('SAR3 60')
+		self.server.atten[3] = 50
+		self.assertEqual(jfw.healthCheck(daemon = True, fix = True, ip = self.server.ip, port = self.server.port), {})
+		self.assertEqual(self.server.atten[3], 60)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+## \file test_mxa.py
+# \brief Unit tests of the MXA SCPI session
+#
+# The session talks to a fake MXA on the raw socket transport (see fake_devices.FakeMXA)
+# Run command: python3 -m unittest discover -s tests (from the sauto directory)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'build', 'lib'))
+import fake_devices
+import mxa
+
+
+
+class HeaderTest(unittest.TestCase):
+	def testJoinCommands(self):
+		self.assertEqual(mxa.joinCommands(['FREQ:CENT 1 GHz', '*OPC?', ':POW:ATT?']), [':FREQ:CENT 1 GHz;*OPC?;:POW:ATT?'])
+		self.assertEqual(mxa.joinCommands(['POW:ATT 10', 'POW:ATT 12'], 12), [':POW:ATT 10', ':POW:ATT 12'])
+
+	def testSplitResponse(self):
+		self.assertEqual(mxa.splitResponse('1;"a;b";2'), ['1', '"a;b"', '2'])
+
+	def testStateKeyShortForm(self):
+		self.assertEqual(mxa.stateKey('EVM:DLINk:SYNC:ANTenna:NUMBer ANT2'), 'EVM:DLIN:SYNC:ANT:NUMB')
+		self.assertEqual(mxa.stateKey(':EVM:DLIN:SYNC:ANT:NUMB ANT4'), 'EVM:DLIN:SYNC:ANT:NUMB')
+		self.assertEqual(mxa.stateKey('FREQuency:CENTer 2110 MHz'), 'FREQ:CENT')
+		self.assertEqual(mxa.stateKey('CALC:EVM:DATA4:TABL:STR?'), 'CALC:EVM:DATA4:TABL:STR?')
+
+	def testStateKeyIgnoresCase(self):
+		for command in ('pow:att 20', 'Pow:Att 20', 'POWer:ATTenuation 20', 'power:attenuation 20'):
+			self.assertEqual(mxa.stateKey(command), 'POW:ATT')
+
+	def testModeCommand(self):
+		self.assertTrue(mxa.isModeCommand('INSTrument:SELect LTE'))
+		self.assertTrue(mxa.isModeCommand('FREQ:CENT 1 GHz;inst:sel lte'))
+		self.assertTrue(mxa.isModeCommand('*RST'))
+		self.assertFalse(mxa.isModeCommand('MMEM:STOR:STAT "INST_A.state"'))
+		self.assertFalse(mxa.isModeCommand('POW:ATT 10'))
+
+	def testSameValue(self):
+		self.assertTrue(mxa.sameValue('2110 MHZ', '+2.11000000E+009'))
+		self.assertTrue(mxa.sameValue('ON', '1'))
+		self.assertFalse(mxa.sameValue('10', '12'))
+
+
+
+class EVMResultTest(unittest.TestCase):
+	def testSampleOfEachReading(self):
+		result = mxa.EVMResult(['RSEVM', 'RSRP', 'RSTP', 'CellId'])
+		sample = result.append('"1.5","-80.25","---","101"')
+		self.assertEqual((sample['EVM'], sample['RSPW'], sample['PCI']), (1.5, -80.25, 101))
+		sample = result.append(['2.5', '---', '-90', '101'])
+		self.assertEqual((sample['EVM'], sample['RSPW'], sample['PCI']), (2.5, -90.0, 101))
+		self.assertTrue(mxa.isFailedSample(result.append(['---', 'bad', '---', '---'])))
+		info = result.getInfo()
+		self.assertEqual(info['EVM_LIST'], [1.5, 2.5, None])
+		self.assertEqual(info['RSPW_LIST'], [-80.25, -90.0, None])
+		self.assertEqual(len(info['TIME_LIST']), 3)
+		self.assertEqual(result.table().shape, (3, 4))
+
+	def testOtherColumns(self):
+		result = mxa.EVMResult(['RSEVM', 'CellId'])
+		sample = result.append(['7', '3.5'], ['CellId', 'RSEVM'])
+		self.assertEqual((sample['EVM'], sample['RSPW'], sample['PCI']), (3.5, None, 7))
+
+
+
+class SessionTestCase(unittest.TestCase):
+	def setUp(self):
+		self.server = fake_devices.FakeMXA().start()
+		self.session = mxa.Session(self.server.ip, self.server.port, 'socket')
+
+	def tearDown(self):
+		self.session.close()
+		self.server.stop()
+
+
+
+class BatchTest(SessionTestCase):
+	def testOneRoundTrip(self):
+		replies = self.session.executeBatch(['FREQ:CENT 1 GHz', 'POW:ATT 10', 'FREQ:CENT?', 'POW:ATT?'])
+		self.assertEqual(replies, ['1 GHz', '10'])
+		self.assertEqual(len(self.server.lines), 1)
+
+	def testBatchLength(self):
+		length = mxa.BATCH_LENGTH
+		mxa.BATCH_LENGTH = 16
+		try:
+			replies = self.session.executeBatch(['POW:ATT 10', 'POW:ATT?', 'FREQ:CENT 2 GHz', 'FREQ:CENT?'])
+		finally:
+			mxa.BATCH_LENGTH = length
+		self.assertEqual(replies, ['10', '2 GHz'])
+		self.assertEqual(len(self.server.lines), 4)
+
+	def testBatchObject(self):
+		self.assertEqual(mxa.Batch(self.session).add('POW:ATT 12').add('POW:ATT?').execute(), ['12'])
+
+
+
+class BlockTest(SessionTestCase):
+	def testTrace(self):
+		trace = mxa.readTrace(self.session)
+		self.assertEqual(trace.dtype, np.float32)
+		np.testing.assert_array_equal(trace, np.arange(1001, dtype = np.float32))
+		self.assertEqual(self.server.state['FORM'], 'ASC')
+
+	def testTraceLargerThanReceiveSize(self):
+		self.server.points = 50000
+		size = mxa.RECV_SIZE
+		mxa.RECV_SIZE = 4096
+		try:
+			trace = mxa.readTrace(self.session)
+		finally:
+			mxa.RECV_SIZE = size
+		np.testing.assert_array_equal(trace, np.arange(50000, dtype = np.float32))
+		self.assertEqual(self.session.executeBatch(['POW:ATT 5', 'POW:ATT?']), ['5'])
+
+	def testNotABlock(self):
+		with self.assertRaises(ValueError):
+			self.session.queryBlock('POW:ATT?')
+
+	def testTelnetHasNoBlock(self):
+		with self.assertRaises(ValueError):
+			mxa.Session(self.server.ip, self.server.port, 'telnet').queryBlock('TRAC:DATA? TRACE1')
+
+
+
+class ShadowStateTest(SessionTestCase):
+	def testSkipUnchangedValue(self):
+		self.assertEqual(self.session.write(['POW:ATT 10', 'FREQ:CENT 2110 MHz'], verify = False), 2)
+		sent = len(self.server.lines)
+		self.assertEqual(self.session.write(['POWer:ATTenuation 10', 'freq:cent 2110 mhz'], verify = False), 0)
+		self.assertEqual(len(self.server.lines), sent)
+		self.assertEqual(self.session.write(['POW:ATT 12'], verify = False), 1)
+
+	def testModeCommandDropsTheState(self):
+		self.session.write(['POW:ATT 10'], verify = False)
+		self.session.execute('inst:sel LTE')
+		self.assertEqual(self.session.state, {})
+
+	def testRawCommandDropsItsHeader(self):
+		self.session.write(['POW:ATT 10'], verify = False)
+		self.session.execute('pow:att 20')
+		self.assertNotIn('POW:ATT', self.session.state)
+		self.assertEqual(self.session.write(['POW:ATT 10'], verify = False), 1)
+		self.assertEqual(self.server.state['POW:ATT'], '10')
+
+	def testReconnectDropsTheState(self):
+		self.session.write(['POW:ATT 10'], verify = False)
+		self.session.connect()
+		self.assertEqual(self.session.state, {})
+
+	def testVerify(self):
+		self.session.write(['POW:ATT 10', 'FREQ:CENT 2110 MHz'], verify = False)
+		self.server.state['POW:ATT'] = '14'
+		self.server.state['FREQ:CENT'] = '+2.11000000E+009'
+		self.assertEqual(self.session.verify(), ['POW:ATT'])
+		self.assertEqual(list(self.session.state), ['FREQ:CENT'])
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+
+## \file test_sql.py
+# \brief Unit tests of the connection pool, the device configuration cache and the schema migrations
+#
+# Every test runs on its own temporary SQLite database
+# Run command: python3 -m unittest discover -s tests (from the sauto directory)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'build', 'lib'))
+import sql
+import sql_migration
+
+
+
+## \brief Create a small copy of the device tables in a new database file
+#
+# \param path the path of the database file
+##
+def createDatabase(path):
+	conn = sqlite3.connect(path)
+	conn.executescript('''
+		CREATE TABLE rf_matrix (id INTEGER PRIMARY KEY, name TEXT);
+		CREATE TABLE jfw (id INTEGER PRIMARY KEY, name TEXT);
+		CREATE TABLE mxa (id INTEGER PRIMARY KEY, name TEXT);
+		CREATE TABLE lsu (id INTEGER PRIMARY KEY, name TEXT);
+		CREATE TABLE vendor (id INTEGER PRIMARY KEY, name TEXT, rf_matrix_id INTEGER);
+		CREATE TABLE rf_matrix_db (id INTEGER PRIMARY KEY, rf_matrix_id INTEGER, port INTEGER, input_device TEXT, output_device TEXT, jfw_id TEXT, jfw_port TEXT);
+		CREATE TABLE pre_config_vendor (id INTEGER PRIMARY KEY, vendor_id INTEGER, mxa_id INTEGER, lsu_id INTEGER);
+		INSERT INTO rf_matrix VALUES (1, 'QRB1');
+		INSERT INTO jfw VALUES (1, 'JFW1');
+		INSERT INTO mxa VALUES (1, 'MXASpecAn'), (2, 'MXA2');
+		INSERT INTO vendor VALUES (1, 'eNB1', 1);
+		INSERT INTO rf_matrix_db VALUES (1, 1, 1, 'eNB1', 'MXASpecAn', '1', '3'), (2, 1, 2, 'eNB2', 'MXASpecAn', '', '');
+		INSERT INTO pre_config_vendor VALUES (1, 1, 1, NULL);
+	''')
+	conn.commit()
+	conn.close()
+
+
+
+class SQLiteTestCase(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.db_path = os.path.join(self.directory, 'test.sqlite')
+		createDatabase(self.db_path)
+		sql.clearCache()
+
+	def tearDown(self):
+		sql.closePool(True)
+		sql.clearCache()
+		shutil.rmtree(self.directory)
+
+
+
+class PoolTest(SQLiteTestCase):
+	def testSameThreadReusesConnection(self):
+		conn = sql.getConnection(self.db_path, True)
+		self.assertIs(conn, sql.getConnection(self.db_path, True))
+		self.assertTrue(sql.isPooled(conn))
+		self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+	def testThreadsGetTheirOwnConnection(self):
+		conns = []
+		opened = threading.Event()
+		done = threading.Event()
+		def worker():
+			conns.append(sql.getConnection(self.db_path, True))
+			opened.set()
+			done.wait(5)
+		thread = threading.Thread(target = worker)
+		thread.start()
+		opened.wait(5)
+		self.assertIsNot(conns[0], sql.getConnection(self.db_path, True))
+		self.assertTrue(sql.isPooled(conns[0]))
+		done.set()
+		thread.join()
+
+	def testCloseSQLite(self):
+		conn = sql.getConnection(self.db_path, True)
+		sql.closeSQLite(self.db_path, True)
+		self.assertFalse(sql.isPooled(conn))
+		self.assertIsNot(conn, sql.getConnection(self.db_path, True))
+
+	def testFinishedThreadConnectionIsPruned(self):
+		conns = []
+		thread = threading.Thread(target = lambda: conns.append(sql.getConnection(self.db_path, True)))
+		thread.start()
+		thread.join()
+		sql.getConnection(os.path.join(self.directory, 'other.sqlite'), True)
+		self.assertFalse(sql.isPooled(conns[0]))
+
+	def testUnpooledConnection(self):
+		conn = sql.connectSQLite(self.db_path, True)
+		self.assertFalse(sql.isPooled(conn))
+		conn.close()
+
+	def testQueryWithoutPool(self):
+		sql.setPooling(False, True)
+		try:
+			self.assertEqual(sql.query('SELECT name FROM mxa WHERE id=?', (2,), self.db_path), [{'name': 'MXA2'}])
+		finally:
+			sql.setPooling(True, True)
+
+
+
+class CacheTest(SQLiteTestCase):
+	def setUp(self):
+		SQLiteTestCase.setUp(self)
+		self.checkInterval = sql.CHECK_INTERVAL
+		sql.CHECK_INTERVAL = 0
+		self.changes = []
+		self.listener = lambda table, db_path: self.changes.append(table)
+		sql.addListener(self.listener)
+
+	def tearDown(self):
+		sql.removeListener(self.listener)
+		sql.CHECK_INTERVAL = self.checkInterval
+		SQLiteTestCase.tearDown(self)
+
+	def writeExternally(self):
+		conn = sqlite3.connect(self.db_path)
+		conn.execute("UPDATE mxa SET name='External' WHERE id=1")
+		conn.commit()
+		conn.close()
+
+	def testHit(self):
+		self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'MXASpecAn')
+		self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'MXASpecAn')
+		self.assertEqual(sql.cacheStats()['hits'], 1)
+		self.assertIsNone(sql.getDeviceConfig('mxa', 99, self.db_path))
+
+	def testWriteDropsOnlyTheWrittenTable(self):
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		sql.getDeviceConfig('jfw', 1, self.db_path)
+		sql.updateMany('mxa', [{'id': 1, 'name': 'Renamed'}], db_path = self.db_path, daemon = True)
+		self.assertEqual(self.changes, ['mxa'])
+		self.assertEqual(sql.cacheStats()['size'], 1)
+		self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'Renamed')
+		sql.getDeviceConfig('jfw', 1, self.db_path)
+		self.assertEqual(sql.cacheStats()['hits'], 1)
+
+	def testInsertManyNotifiesItsTable(self):
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		self.assertEqual(sql.insertMany('vendor', [{'name': 'eNB2', 'rf_matrix_id': 1}], self.db_path, True), 1)
+		self.assertEqual(self.changes, ['vendor'])
+		self.assertEqual(sql.cacheStats()['size'], 1)
+
+	def testWriteOfAnotherThreadIsNotExternal(self):
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		thread = threading.Thread(target = sql.updateMany, args = ('vendor', [{'id': 1, 'name': 'eNB3'}], 'id', self.db_path, True))
+		thread.start()
+		thread.join()
+		self.assertEqual(self.changes, ['vendor'])
+		self.assertFalse(sql.checkExternalChange(self.db_path))
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		self.assertEqual(sql.cacheStats()['hits'], 1)
+
+	def testExternalWriteDropsTheDatabase(self):
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		self.writeExternally()
+		self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'External')
+		self.assertEqual(self.changes, [None])
+
+	def testCheckOncePerInterval(self):
+		sql.CHECK_INTERVAL = 60
+		sql.getDeviceConfig('mxa', 1, self.db_path)
+		self.writeExternally()
+		self.assertFalse(sql.checkExternalChange(self.db_path))
+		self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'MXASpecAn')
+		self.assertTrue(sql.checkExternalChange(self.db_path, 0))
+
+	def testNoCheckWithoutPool(self):
+		sql.setPooling(False, True)
+		try:
+			sql.getDeviceConfig('mxa', 1, self.db_path)
+			self.writeExternally()
+			self.assertFalse(sql.checkExternalChange(self.db_path))
+			self.assertEqual(sql.getDeviceConfig('mxa', 1, self.db_path)['name'], 'MXASpecAn')
+		finally:
+			sql.setPooling(True, True)
+
+
+
+class MigrationTest(SQLiteTestCase):
+	def testMigrateToLatest(self):
+		self.assertEqual(sql_migration.getVersion(self.db_path), 0)
+		self.assertEqual(sql_migration.migrate(self.db_path, daemon = True), sql_migration.SCHEMA_VERSION)
+		self.assertEqual(sql_migration.getVersion(self.db_path), sql_migration.SCHEMA_VERSION)
+		conn = sqlite3.connect(self.db_path)
+		indexes = set(row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'"))
+		self.assertTrue(set(name for name, table, columns in sql_migration.INDEXES) <= indexes)
+		self.assertEqual(len(conn.execute('PRAGMA foreign_key_list(rf_matrix_db)').fetchall()), 2)
+		self.assertIsNotNone(conn.execute("SELECT name FROM sqlite_master WHERE name='measurement'").fetchone())
+		conn.close()
+
+	def testMigrationKeepsTheData(self):
+		sql_migration.migrate(self.db_path, daemon = True)
+		conn = sqlite3.connect(self.db_path)
+		self.assertEqual(conn.execute('SELECT * FROM rf_matrix_db ORDER BY id').fetchall(),
+			[(1, 1, 1, 'eNB1', 'MXASpecAn', '1', '3'), (2, 1, 2, 'eNB2', 'MXASpecAn', '', '')])
+		self.assertEqual(len(conn.execute('PRAGMA foreign_key_check(rf_matrix_db)').fetchall()), 1)
+		conn.close()
+
+	def testMigrateAgainDoesNothing(self):
+		sql_migration.migrate(self.db_path, daemon = True)
+		conn = sqlite3.connect(self.db_path)
+		schema = conn.execute('SELECT sql FROM sqlite_master ORDER BY name').fetchall()
+		conn.close()
+		self.assertEqual(sql_migration.migrate(self.db_path, daemon = True), sql_migration.SCHEMA_VERSION)
+		conn = sqlite3.connect(self.db_path)
+		self.assertEqual(conn.execute('SELECT sql FROM sqlite_master ORDER BY name').fetchall(), schema)
+		conn.close()
+
+	def testMigrateToTarget(self):
+		self.assertEqual(sql_migration.migrate(self.db_path, 1, True), 1)
+		conn = sqlite3.connect(self.db_path)
+		self.assertEqual(conn.execute('PRAGMA foreign_key_list(rf_matrix_db)').fetchall(), [])
+		conn.close()
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+## \file test_sql_async.py
+# \brief Unit tests of the writer thread and the reader pool of sql_async.py
+#
+# Every test runs on its own temporary SQLite database (see test_sql.createDatabase)
+# Run command: python3 -m unittest discover -s tests (from the sauto directory)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import threading
+import unittest
+
+import test_sql
+import sql
+import sql_async
+
+
+
+class AsyncSQLiteTest(test_sql.SQLiteTestCase):
+	def setUp(self):
+		test_sql.SQLiteTestCase.setUp(self)
+		self.db = sql_async.AsyncSQLite(self.db_path, 2)
+
+	def tearDown(self):
+		self.db.close()
+		test_sql.SQLiteTestCase.tearDown(self)
+
+	def testExecuteDropsTheWrittenTable(self):
+		self.assertEqual(self.db.getDeviceConfig('mxa', 1).result(5)['name'], 'MXASpecAn')
+		self.db.execute("UPDATE mxa SET name='Renamed' WHERE id=?", (1,), 'mxa').result(5)
+		self.assertEqual(self.db.getDeviceConfig('mxa', 1).result(5)['name'], 'Renamed')
+
+	def testQueuedWritesRunBeforeClose(self):
+		futures = [self.db.execute('INSERT INTO lsu (name) VALUES (?)', ('LSU' + str(i),), 'lsu') for i in range(20)]
+		self.db.close()
+		self.assertEqual([future.result(5) for future in futures], [None] * 20)
+		self.assertEqual(len(sql.query('SELECT * FROM lsu', (), self.db_path)), 20)
+
+	def testWriteAfterClose(self):
+		self.db.close()
+		with self.assertRaises(RuntimeError):
+			self.db.execute('DELETE FROM lsu')
+
+	def testWriteRacingClose(self):
+		futures = []
+		def writer():
+			for i in range(200):
+				try:
+					futures.append(self.db.execute('INSERT INTO lsu (name) VALUES (?)', ('LSU',)))
+				except RuntimeError:
+					return
+		thread = threading.Thread(target = writer)
+		thread.start()
+		self.db.close()
+		thread.join()
+		for future in futures:
+			future.result(5)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
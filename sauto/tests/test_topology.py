@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+## \file test_topology.py
+# \brief Unit tests of the RF routing topology view and its reloading
+#
+# Every test runs on its own temporary SQLite database (see test_sql.createDatabase)
+# Run command: python3 -m unittest discover -s tests (from the sauto directory)
+#
+# \author Liyu Ying
+# \email lying0401@gmail.com
+##
+
+import sqlite3
+import unittest
+
+import test_sql
+import sql
+import topology
+
+
+
+class TopologyTest(test_sql.SQLiteTestCase):
+	def setUp(self):
+		test_sql.SQLiteTestCase.setUp(self)
+		self.checkInterval = topology.CHECK_INTERVAL
+		topology.CHECK_INTERVAL = 0
+		self.topology = topology.Topology(self.db_path)
+
+	def tearDown(self):
+		self.topology.close()
+		topology.CHECK_INTERVAL = self.checkInterval
+		test_sql.SQLiteTestCase.tearDown(self)
+
+	def testRoutes(self):
+		self.assertEqual([route['input_device'] for route in self.topology.routesTo('MXASpecAn')], ['eNB1', 'eNB2'])
+		self.assertEqual(self.topology.route(1, 2)['input_device'], 'eNB2')
+		self.assertEqual(self.topology.route(1, 1)['matrix']['name'], 'QRB1')
+		self.assertEqual(self.topology.routeByAttenuator(1, 3)['input_device'], 'eNB1')
+		self.assertEqual(self.topology.vendorConfig(1)[0]['mxa']['name'], 'MXASpecAn')
+
+	def testIdOfEitherType(self):
+		self.assertEqual(self.topology.route(1, 1)['jfw']['name'], 'JFW1')
+		self.assertEqual(self.topology.jfw('1')['name'], 'JFW1')
+		self.assertEqual(self.topology.matrix('1')['name'], 'QRB1')
+		self.assertEqual(self.topology.mxa('2')['name'], 'MXA2')
+		self.assertEqual(len(self.topology.vendorConfig('1')), 1)
+		self.assertIsNone(self.topology.route(1, 2)['jfw'])
+
+	def testOwnWriteReloadsOnlyThatTable(self):
+		matrix = self.topology.matrix(1)
+		sql.updateSQLite('mxa', 'name', 'Renamed', 'id=?', self.db_path, True, (1,))
+		self.assertEqual(self.topology.mxa(1)['name'], 'Renamed')
+		self.assertIs(self.topology.matrix(1), matrix)
+
+	def testExternalWriteReloads(self):
+		self.assertEqual(self.topology.matrix(1)['name'], 'QRB1')
+		conn = sqlite3.connect(self.db_path)
+		conn.execute("UPDATE rf_matrix SET name='QRB2' WHERE id=1")
+		conn.commit()
+		conn.close()
+		self.assertEqual(self.topology.matrix(1)['name'], 'QRB2')
+
+
+
+if __name__ == '__main__':
+	unittest.main()